@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Adaptive Inference Report for Virtual Therapist Analysis Service
+
+Runs a file of texts (one per line) through the early-exit path with every
+early exit audited against the full hybrid path, then prints the escalation
+rate and label agreement so EARLY_EXIT_MARGIN can be tuned.
+"""
+
+import argparse
+import json
+import time
+
+from hybrid_model import HybridMentalHealthModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure early-exit escalation rate and agreement")
+    parser.add_argument("texts", help="Text file with one input per line")
+    parser.add_argument("--margin", type=float, default=0.5, help="Classifier-head margin required to exit early")
+    parser.add_argument("--max-length", type=int, default=64, help="Token length of the truncated pass")
+    parser.add_argument("--model-path", default="models/hybrid_model.pth")
+    parser.add_argument("--xgb-path", default="models/xgboost_classifier.json")
+    args = parser.parse_args()
+
+    with open(args.texts) as f:
+        texts = [line.strip() for line in f if line.strip()]
+
+    model = HybridMentalHealthModel(
+        transformer_model_path=args.model_path,
+        xgboost_model_path=args.xgb_path,
+        early_exit_margin=args.margin,
+        early_exit_max_length=args.max_length,
+        early_exit_audit_rate=1.0,
+    )
+
+    start = time.time()
+    for text in texts:
+        model.predict(text)
+    elapsed = time.time() - start
+
+    stats = model.get_adaptive_stats()
+    stats["margin"] = args.margin
+    stats["max_length"] = args.max_length
+    stats["texts"] = len(texts)
+    stats["seconds"] = round(elapsed, 3)
+
+    print("\n📊 Adaptive inference report")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Admission control and degradation tiers for the analysis service.
+
+At most ``max_concurrent`` inferences run at once and at most ``max_queued``
+requests wait behind them. A request that finds the queue full, or that waits
+longer than ``queue_timeout``, is rejected with Overloaded, which the API maps
+to 503 with a Retry-After estimate, instead of sitting in a worker until the
+server times it out.
+
+As the queue fills, new requests are served by cheaper tiers. ``tiers`` is an
+ordered list of (tier, queue_fill) pairs. The last tier whose threshold the
+current fill has reached is used, and "full" is used below the first threshold.
+
+Requests belong to a priority lane, "interactive" (chat, the default) or
+"bulk" (re-analysis, backfills). Each lane has its own FIFO queue, and a
+freed slot always goes to a waiting interactive request before any bulk one,
+so bulk work only fills idle capacity; callers split bulk batches into small
+admissions so queued bulk work never sits in front of a chat turn. Bulk may
+hold at most ``bulk_share`` of the slots and of the token budget. Work is
+measured by its estimated token cost (padded tokens it will run); with a
+``token_budget`` a request waits until its tokens fit beside those running,
+and Retry-After is estimated from the tokens ahead of it.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Highest priority first
+LANES = ("interactive", "bulk")
+
+
+class Overloaded(RuntimeError):
+    """Request rejected by admission control."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_tiers(spec: str) -> List[Tuple[str, float]]:
+    """Parse "quantized:0.25,short:0.5,head:0.75" into [(tier, threshold), ...]."""
+    tiers = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, threshold = item.partition(":")
+        tiers.append((name.strip(), float(threshold)))
+    if [t for _, t in tiers] != sorted(t for _, t in tiers):
+        raise ValueError(f"Degradation tier thresholds must be increasing: {spec}")
+    return tiers
+
+
+class _Waiter:
+    __slots__ = ("lane", "cost")
+
+    def __init__(self, lane: str, cost: int):
+        self.lane = lane
+        self.cost = cost
+
+
+class AdmissionController:
+    """Bounded per-lane queues in front of a fixed number of inference slots and tokens."""
+
+    def __init__(
+        self,
+        max_concurrent: int = 1,
+        max_queued: int = 32,
+        queue_timeout: float = 10.0,
+        tiers: Optional[List[Tuple[str, float]]] = None,
+        token_budget: int = 0,
+        bulk_share: float = 1.0,
+        bulk_max_queued: Optional[int] = None,
+        bulk_queue_timeout: Optional[float] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.tiers = tiers or []
+        # 0 = admit by slots only
+        self.token_budget = token_budget
+        self.bulk_share = bulk_share
+        self.max_queued = {"interactive": max_queued, "bulk": max_queued if bulk_max_queued is None else bulk_max_queued}
+        self.queue_timeout = {"interactive": queue_timeout, "bulk": queue_timeout if bulk_queue_timeout is None else bulk_queue_timeout}
+        self._bulk_slots = max(1, math.floor(bulk_share * max_concurrent))
+
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[_Waiter]] = {lane: deque() for lane in LANES}
+        self._running = {lane: 0 for lane in LANES}
+        self._running_tokens = {lane: 0 for lane in LANES}
+        # Exponentially weighted mean service time per token, for Retry-After
+        self._seconds_per_token = 0.0
+        self.stats: Dict[str, Dict[str, int]] = {
+            lane: {"admitted": 0, "tokens": 0, "rejected_full": 0, "rejected_timeout": 0} for lane in LANES
+        }
+        self.tier_counts: Dict[str, int] = {}
+
+    def queue_fill(self, lane: str = "interactive") -> float:
+        with self._cond:
+            return len(self._queues[lane]) / self.max_queued[lane] if self.max_queued[lane] else 0.0
+
+    def select_tier(self, lane: str = "interactive") -> str:
+        """Tier for a request arriving now. Bulk work waits for capacity instead of degrading."""
+        if lane != "interactive":
+            return "full"
+        fill = self.queue_fill(lane)
+        tier = "full"
+        for name, threshold in self.tiers:
+            if fill >= threshold:
+                tier = name
+        return tier
+
+    def _fits(self, waiter: _Waiter) -> bool:
+        running = sum(self._running.values())
+        if running == 0:
+            # Nothing else is running, so even a request over the token budget goes ahead
+            return True
+        if running >= self.max_concurrent:
+            return False
+        if self.token_budget and sum(self._running_tokens.values()) + waiter.cost > self.token_budget:
+            return False
+        if waiter.lane == "bulk":
+            if self._running["bulk"] >= self._bulk_slots:
+                return False
+            if self.token_budget and self._running_tokens["bulk"] + waiter.cost > self.bulk_share * self.token_budget:
+                return False
+        return True
+
+    def _can_run(self, waiter: _Waiter) -> bool:
+        """First in its lane's queue (or the queue is empty), no higher lane waiting, and it fits."""
+        for lane in LANES:
+            queue = self._queues[lane]
+            if lane == waiter.lane:
+                return (not queue or queue[0] is waiter) and self._fits(waiter)
+            if queue:
+                return False
+        return False
+
+    def _retry_after(self, lane: str) -> int:
+        ahead = sum(self._running_tokens.values())
+        for name in LANES[:LANES.index(lane) + 1]:
+            ahead += sum(w.cost for w in self._queues[name])
+        seconds = ahead * (self._seconds_per_token or 1.0 / 256) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(seconds))
+
+    @contextmanager
+    def admit(self, tier: str = "full", cost: int = 1, lane: str = "interactive"):
+        """
+        Hold an inference slot and ``cost`` tokens of the budget for the
+        duration of the block, or raise Overloaded.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+        waiter = _Waiter(lane, cost)
+        stats = self.stats[lane]
+        with self._cond:
+            if not self._can_run(waiter):
+                queue = self._queues[lane]
+                if len(queue) >= self.max_queued[lane]:
+                    stats["rejected_full"] += 1
+                    raise Overloaded("Analysis queue is full", self._retry_after(lane))
+                queue.append(waiter)
+                try:
+                    deadline = time.monotonic() + self.queue_timeout[lane]
+                    while not self._can_run(waiter):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            stats["rejected_timeout"] += 1
+                            raise Overloaded("Timed out waiting for an inference slot", self._retry_after(lane))
+                        self._cond.wait(remaining)
+                finally:
+                    queue.remove(waiter)
+                    # The next waiter in this lane (or a lower one) may now be able to run
+                    self._cond.notify_all()
+            self._running[lane] += 1
+            self._running_tokens[lane] += cost
+            stats["admitted"] += 1
+            stats["tokens"] += cost
+            self.tier_counts[tier] = self.tier_counts.get(tier, 0) + 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            per_token = (time.perf_counter() - start) / max(cost, 1)
+            with self._cond:
+                self._running[lane] -= 1
+                self._running_tokens[lane] -= cost
+                spt = self._seconds_per_token
+                self._seconds_per_token = per_token if not spt else 0.9 * spt + 0.1 * per_token
+                self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._cond:
+            lanes = {
+                lane: {
+                    **self.stats[lane],
+                    "running": self._running[lane],
+                    "running_tokens": self._running_tokens[lane],
+                    "waiting": len(self._queues[lane]),
+                    "waiting_tokens": sum(w.cost for w in self._queues[lane]),
+                    "max_queued": self.max_queued[lane],
+                }
+                for lane in LANES
+            }
+            return {
+                "admitted": sum(s["admitted"] for s in self.stats.values()),
+                "running": sum(self._running.values()),
+                "waiting": sum(len(q) for q in self._queues.values()),
+                "max_concurrent": self.max_concurrent,
+                "token_budget": self.token_budget,
+                "bulk_share": self.bulk_share,
+                "mean_seconds_per_token": round(self._seconds_per_token, 7),
+                "lanes": lanes,
+                "tiers": dict(self.tier_counts),
+            }
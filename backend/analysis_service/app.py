@@ -1,11 +1,33 @@
 import os
-import requests
+import atexit
+import hashlib
+import hmac
 import logging
-from dotenv import load_dotenv
-os.environ["OMP_NUM_THREADS"] = "1"
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from hybrid_model import HybridMentalHealthModel
+import math
+import time
+from datetime import datetime, timezone
+from startup_profile import StartupProfiler
+
+# Cold-start phases are reported at boot and by /model-info
+startup = StartupProfiler()
+
+with startup.phase("import_flask"):
+    from dotenv import load_dotenv
+    os.environ["OMP_NUM_THREADS"] = "1"
+    from flask import Flask, Response, request, jsonify, send_from_directory
+    from flask_cors import CORS
+
+import numpy as np
+
+from coalescing import RequestCoalescer, text_key
+from artifacts import artifact_version, check_artifacts
+from audit_log import AuditLog
+from explanations import EXPLAIN_PERTURBATIONS
+from compact_format import MIME_TYPE as COMPACT_MIME_TYPE, encode_scores
+from admission import AdmissionController, Overloaded, parse_tiers
+from session_store import MissingTurns, SessionStore
+from trend_log import BUCKETS, PATIENT_ID_RE, PredictionLog
+from profiling import ProfilerBusy, wait_for_summary
 
 app = Flask(__name__)
 CORS(app)
@@ -22,6 +44,104 @@ load_dotenv(os.path.join(BASE_DIR, "..", "..", ".env"))
 CONFIDENCE_HIGH = 0.7
 CONFIDENCE_LOW = 0.4
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+# Point at a local stand-in (see load_test.py --groq-stub) for load tests
+GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+# Adaptive inference: unset EARLY_EXIT_MARGIN to always run the full hybrid path
+EARLY_EXIT_MARGIN = float(os.environ["EARLY_EXIT_MARGIN"]) if os.environ.get("EARLY_EXIT_MARGIN") else None
+EARLY_EXIT_MAX_LENGTH = int(os.environ.get("EARLY_EXIT_MAX_LENGTH", 64))
+EARLY_EXIT_AUDIT_RATE = float(os.environ.get("EARLY_EXIT_AUDIT_RATE", 0.0))
+
+# Model variant: "full" (six transformer layers) or "fast" (layer-truncated, see distill_fast_model.py)
+HYBRID_VARIANT = os.environ.get("HYBRID_VARIANT", "full")
+HYBRID_FAST_LAYERS = int(os.environ.get("HYBRID_FAST_LAYERS", 3))
+
+# XGBoost scorer: "xgboost" (library) or "compiled" (NumPy forest, no xgboost import)
+XGB_BACKEND = os.environ.get("XGB_BACKEND", "xgboost")
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "1") == "1"
+
+# Accelerated inference: "bf16" precision and/or torch.compile graphs for the
+# COMPILE_BATCH_BUCKETS batch sizes; each must pass a startup parity check
+# against fp32 on data/samples.jsonl or the model serves fp32 eager
+INFERENCE_PRECISION = os.environ.get("INFERENCE_PRECISION", "fp32")
+TORCH_COMPILE = os.environ.get("TORCH_COMPILE", "0") == "1"
+COMPILE_BATCH_BUCKETS = tuple(int(b) for b in os.environ.get("COMPILE_BATCH_BUCKETS", "1,4,16").split(",") if b.strip())
+PARITY_MIN_AGREEMENT = float(os.environ.get("PARITY_MIN_AGREEMENT", 0.95))
+
+# Token-id cache (MB) shared by every model on the same vocabulary in a process (0 = off)
+TOKEN_CACHE_MB = float(os.environ.get("TOKEN_CACHE_MB", 32))
+
+# Extra classifier heads on the shared DistilBERT backbone, selected per request with "heads":
+# "name=kind:path[:xgb_path],..." with kind bilstm or linear, paths relative to this directory
+EXTRA_HEADS = os.environ.get("EXTRA_HEADS", "")
+
+# Near-duplicate short-circuit: "sketch" or "truncated" keys (empty = off). Hit rate and
+# label agreement by similarity band are under near_duplicates in /model-info.
+# NEAR_DUPLICATE_AUDIT_RATE re-runs that fraction of hits on the full path to measure
+# agreement; off (0) by default, as in HybridModelInference, since each audit is a full inference.
+NEAR_DUPLICATE_KEY = os.environ.get("NEAR_DUPLICATE_KEY") or None
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", 0.95))
+NEAR_DUPLICATE_CAPACITY = int(os.environ.get("NEAR_DUPLICATE_CAPACITY", 10000))
+NEAR_DUPLICATE_BACKEND = os.environ.get("NEAR_DUPLICATE_BACKEND", "auto")
+NEAR_DUPLICATE_AUDIT_RATE = float(os.environ.get("NEAR_DUPLICATE_AUDIT_RATE", 0.0))
+
+# Inference worker processes (0 = run the model inside the HTTP process)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 0))
+WORKER_MAX_REQUESTS = int(os.environ.get("WORKER_MAX_REQUESTS", 0)) or None
+WORKER_MAX_RSS_MB = float(os.environ.get("WORKER_MAX_RSS_MB", 0)) or None
+# Watchdog: recycle a worker (warmed replacement first) when its RSS or p95 latency over the
+# last WORKER_LATENCY_WINDOW requests crosses these thresholds (0 = off); see /model-info worker_pool
+WORKER_RECYCLE_RSS_MB = float(os.environ.get("WORKER_RECYCLE_RSS_MB", 0)) or None
+WORKER_RECYCLE_P95_MS = float(os.environ.get("WORKER_RECYCLE_P95_MS", 0)) or None
+WORKER_LATENCY_WINDOW = int(os.environ.get("WORKER_LATENCY_WINDOW", 100))
+WORKER_WATCHDOG_INTERVAL = float(os.environ.get("WORKER_WATCHDOG_INTERVAL", 10))
+
+# Admission control: requests beyond MAX_CONCURRENT_INFERENCES wait in a queue of
+# MAX_QUEUED_REQUESTS; beyond that (or after ADMISSION_TIMEOUT seconds) they get 503.
+MAX_CONCURRENT_INFERENCES = int(os.environ.get("MAX_CONCURRENT_INFERENCES", 0)) or max(INFERENCE_WORKERS, 1)
+MAX_QUEUED_REQUESTS = int(os.environ.get("MAX_QUEUED_REQUESTS", 32))
+ADMISSION_TIMEOUT = float(os.environ.get("ADMISSION_TIMEOUT", 10))
+# Degradation tiers by queue fill, e.g. "quantized:0.25,short:0.5,head:0.75" (empty = always full)
+DEGRADATION_TIERS = parse_tiers(os.environ.get("DEGRADATION_TIERS", ""))
+DEGRADED_MAX_LENGTH = int(os.environ.get("DEGRADED_MAX_LENGTH", 64))
+# Priority lanes: "X-Priority: bulk" requests (re-analysis, backfills) only get capacity that
+# interactive traffic leaves idle, at most BULK_SHARE of it, and batches are admitted
+# BULK_CHUNK_TEXTS texts at a time. INFERENCE_TOKEN_BUDGET caps padded tokens in flight (0 = off).
+INFERENCE_TOKEN_BUDGET = int(os.environ.get("INFERENCE_TOKEN_BUDGET", 0))
+BULK_SHARE = float(os.environ.get("BULK_SHARE", 0.75))
+BULK_MAX_QUEUED = int(os.environ.get("BULK_MAX_QUEUED", 256))
+BULK_QUEUE_TIMEOUT = float(os.environ.get("BULK_QUEUE_TIMEOUT", 120))
+BULK_CHUNK_TEXTS = int(os.environ.get("BULK_CHUNK_TEXTS", 8))
+
+# /api/explain compute budget: at most EXPLAIN_MAX_PERTURBATIONS perturbed copies of a text
+# (longer texts are explained in runs of words), scored EXPLAIN_BATCH_SIZE copies per forward pass
+EXPLAIN_MAX_PERTURBATIONS = int(os.environ.get("EXPLAIN_MAX_PERTURBATIONS", 64))
+EXPLAIN_BATCH_SIZE = int(os.environ.get("EXPLAIN_BATCH_SIZE", 32))
+
+# Incremental session analysis state (in memory; TTL matches the UserSession expiry)
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", 10000))
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", 3600))
+SESSION_MAX_TURNS = int(os.environ.get("SESSION_MAX_TURNS", 200))
+
+# Per-patient prediction log behind the trend endpoints (empty = in memory only; trend
+# data is then lost on restart and once a patient falls out of the 1000-patient cache)
+PREDICTION_LOG_DIR = os.environ.get("PREDICTION_LOG_DIR", os.path.join(BASE_DIR, "prediction_log"))
+
+# Write-behind prediction audit trail (JSONL, rotated at AUDIT_LOG_MAX_MB; empty = off).
+# At most AUDIT_FLUSH_INTERVAL seconds of records are lost on a crash.
+AUDIT_LOG_DIR = os.environ.get("AUDIT_LOG_DIR", os.path.join(BASE_DIR, "audit_log"))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", 1.0))
+AUDIT_LOG_MAX_MB = float(os.environ.get("AUDIT_LOG_MAX_MB", 64))
+AUDIT_LOG_BACKUPS = int(os.environ.get("AUDIT_LOG_BACKUPS", 10))
+
+# Admin profiling endpoint: off unless PROFILING_ENABLED=1 and ADMIN_TOKEN is set
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 60))
+
+# Refuse to start unless every model artifact matches artifact_manifest.json
+ARTIFACT_STRICT = os.environ.get("ARTIFACT_STRICT", "0") == "1"
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,7 +156,10 @@ def call_groq_api(system_prompt: str, user_input: str) -> str:
         return None
 
     try:
-        url = "https://api.groq.com/openai/v1/chat/completions"
+        # Imported on first use so it stays off the startup path
+        import requests
+
+        url = GROQ_API_URL
         
         payload = {
             "model": "llama3-70b-8192",
@@ -66,24 +189,626 @@ def call_groq_api(system_prompt: str, user_input: str) -> str:
     
     return None
 
-model = HybridMentalHealthModel(
-    transformer_model_path=os.path.join(MODELS_DIR, "hybrid_model.pth"),
-    xgboost_model_path=os.path.join(MODELS_DIR, "xgboost_classifier.json")
+def resolve_model_paths():
+    """Return (pytorch_path, xgboost_path, transformer_layers) for HYBRID_VARIANT."""
+    if HYBRID_VARIANT == "fast":
+        xgb_path = os.path.join(MODELS_DIR, "xgboost_classifier_fast.json")
+        if not os.path.exists(xgb_path):
+            # The fast model is distilled against final_state, so the original booster still applies
+            xgb_path = os.path.join(MODELS_DIR, "xgboost_classifier.json")
+        return os.path.join(MODELS_DIR, "hybrid_model_fast.pth"), xgb_path, HYBRID_FAST_LAYERS
+    return os.path.join(MODELS_DIR, "hybrid_model.pth"), os.path.join(MODELS_DIR, "xgboost_classifier.json"), None
+
+PYTORCH_MODEL_PATH, XGB_MODEL_PATH, TRANSFORMER_LAYERS = resolve_model_paths()
+
+MODEL_KWARGS = dict(
+    transformer_model_path=PYTORCH_MODEL_PATH,
+    xgboost_model_path=XGB_MODEL_PATH,
+    num_transformer_layers=TRANSFORMER_LAYERS,
+    xgb_backend=XGB_BACKEND,
+    early_exit_margin=EARLY_EXIT_MARGIN,
+    early_exit_max_length=EARLY_EXIT_MAX_LENGTH,
+    early_exit_audit_rate=EARLY_EXIT_AUDIT_RATE,
+    strict=ARTIFACT_STRICT,
+    degradation_tiers=[tier for tier, _ in DEGRADATION_TIERS],
+    degraded_max_length=DEGRADED_MAX_LENGTH,
+    precision=INFERENCE_PRECISION,
+    compile=TORCH_COMPILE,
+    compile_batch_buckets=COMPILE_BATCH_BUCKETS,
+    parity_min_agreement=PARITY_MIN_AGREEMENT,
+    near_duplicate_key=NEAR_DUPLICATE_KEY,
+    near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD,
+    near_duplicate_capacity=NEAR_DUPLICATE_CAPACITY,
+    near_duplicate_backend=NEAR_DUPLICATE_BACKEND,
+    near_duplicate_audit_rate=NEAR_DUPLICATE_AUDIT_RATE,
+    extra_heads=EXTRA_HEADS or None,
+    token_cache_mb=TOKEN_CACHE_MB,
 )
 
+def build_model():
+    """Load the model in this process, or start the worker pool that holds it."""
+    if INFERENCE_WORKERS > 0:
+        from worker_pool import InferencePool
+        with startup.phase("worker_pool_start"):
+            return InferencePool(
+                MODEL_KWARGS,
+                num_workers=INFERENCE_WORKERS,
+                max_requests=WORKER_MAX_REQUESTS,
+                max_rss_mb=WORKER_MAX_RSS_MB,
+                recycle_rss_mb=WORKER_RECYCLE_RSS_MB,
+                recycle_p95_ms=WORKER_RECYCLE_P95_MS,
+                latency_window=WORKER_LATENCY_WINDOW,
+                watchdog_interval=WORKER_WATCHDOG_INTERVAL,
+            )
+
+    # torch is imported here; transformers and the XGBoost backend load with the model
+    with startup.phase("import_hybrid_model"):
+        from hybrid_model import HybridMentalHealthModel
+    local_model = HybridMentalHealthModel(**MODEL_KWARGS, profiler=startup)
+    if MODEL_WARMUP:
+        local_model.warmup()
+    return local_model
+
+# Worker processes are spawned and re-import this module as __mp_main__ when the
+# service runs as `python app.py`; only the HTTP process checks artifacts and builds the model.
+if __name__ != "__mp_main__":
+    # Checked before the model is built so a bad deploy fails in seconds, not after a full cold start
+    artifact_digests = {}
+    with startup.phase("artifact_check"):
+        ARTIFACT_PROBLEMS = check_artifacts(
+            [PYTORCH_MODEL_PATH, XGB_MODEL_PATH], strict=ARTIFACT_STRICT, digests=artifact_digests
+        )
+    # Recorded with every audit entry; defaults to the hashes of the files just checked, so a
+    # file that does not match the manifest is never attributed to the manifest's version
+    MODEL_VERSION = os.environ.get("MODEL_VERSION") or artifact_version(
+        [PYTORCH_MODEL_PATH, XGB_MODEL_PATH], artifact_digests
+    )
+    model = build_model()
+    prediction_log = PredictionLog(model.labels, PREDICTION_LOG_DIR or None)
+    if not PREDICTION_LOG_DIR:
+        print("⚠️ PREDICTION_LOG_DIR is empty: trend data is lost on restart and for patients evicted from memory")
+    audit_log = AuditLog(
+        AUDIT_LOG_DIR,
+        flush_interval=AUDIT_FLUSH_INTERVAL,
+        max_bytes=int(AUDIT_LOG_MAX_MB * 1024 * 1024),
+        backup_count=AUDIT_LOG_BACKUPS,
+    ) if AUDIT_LOG_DIR else None
+    if audit_log:
+        atexit.register(audit_log.close)
+    served_heads = list(model.get_model_info()["heads"])
+    logger.info(f"Startup profile: {startup.report()}")
+
+coalescer = RequestCoalescer()
+admission = AdmissionController(
+    max_concurrent=MAX_CONCURRENT_INFERENCES,
+    max_queued=MAX_QUEUED_REQUESTS,
+    queue_timeout=ADMISSION_TIMEOUT,
+    tiers=DEGRADATION_TIERS,
+    token_budget=INFERENCE_TOKEN_BUDGET,
+    bulk_share=BULK_SHARE,
+    bulk_max_queued=BULK_MAX_QUEUED,
+    bulk_queue_timeout=BULK_QUEUE_TIMEOUT,
+)
+sessions = SessionStore(
+    max_sessions=SESSION_MAX_SESSIONS,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_turns=SESSION_MAX_TURNS,
+)
+
+MAX_BATCH_TEXTS = int(os.environ.get("MAX_BATCH_TEXTS", 256))
+
+def wants_compact() -> bool:
+    """True if the caller asked for the binary format (see compact_format.py) over JSON."""
+    if request.args.get("format") == "binary":
+        return True
+    accept = request.accept_mimetypes
+    return accept.quality(COMPACT_MIME_TYPE) > accept.quality("application/json")
+
+def chunked_scores(texts, include_features: bool, tier: str, lane: str):
+    """(probabilities, features or None) for texts, admitted in lane-sized chunks."""
+    parts = admitted_chunks(
+        texts, tier, lane, lambda chunk: model.predict_scores(chunk, include_features=include_features, tier=tier)
+    )
+    proba = np.concatenate([p for p, _ in parts])
+    features = np.concatenate([f for _, f in parts]) if include_features else None
+    return proba, features
+
+def audit(texts, scores, tier: str, lane: str, started: float, **extra):
+    """
+    Queue one audit record per scored text. ``scores`` are result dicts or
+    probability rows in model.labels order. Texts are stored as SHA-256 only.
+    """
+    if audit_log is None:
+        return
+    now = time.time()
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    for text, score in zip(texts, scores):
+        if isinstance(score, dict):
+            probabilities = {item["label"]: item["score"] for item in score["confidenceScores"]}
+        else:
+            probabilities = dict(zip(model.labels, map(float, score)))
+        audit_log.record({
+            "ts": now,
+            "endpoint": request.url_rule.rule,
+            "model_version": MODEL_VERSION,
+            "input_sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            "tier": score.get("tier", tier) if isinstance(score, dict) else tier,
+            "lane": lane,
+            "top_pattern": max(probabilities, key=probabilities.get),
+            "probabilities": probabilities,
+            "latency_ms": latency_ms,
+            "batch_size": len(texts),
+            **extra,
+        })
+
+def request_body():
+    """The JSON body as a dict ({} when empty), or None if it is not a JSON object."""
+    data = request.get_json(silent=True)
+    if data is None:
+        return {}
+    return data if isinstance(data, dict) else None
+
+def body_text(data) -> str:
+    """The stripped "text" field of a request body, or "" if it is missing or not a string."""
+    text = data.get("text", "")
+    return text.strip() if isinstance(text, str) else ""
+
+BODY_ERROR = "Request body must be a JSON object"
+
+def requested_heads(data) -> list:
+    """The "heads" list of a request body ([] when absent); raises ValueError if malformed."""
+    heads = data.get("heads") or []
+    if not isinstance(heads, list) or not all(isinstance(h, str) and h for h in heads):
+        raise ValueError("heads must be a list of head names")
+    unknown = [h for h in heads if h not in served_heads]
+    if unknown:
+        raise ValueError(f"Unknown heads {unknown}; available: {served_heads}")
+    return list(dict.fromkeys(heads))
+
+def request_lane() -> str:
+    """Priority lane of the current request: "bulk" if it sent X-Priority: bulk, else interactive."""
+    return "bulk" if request.headers.get("X-Priority", "").strip().lower() == "bulk" else "interactive"
+
+def token_cost(count: int, tier: str) -> int:
+    """Padded tokens the model runs for ``count`` texts on a tier."""
+    return count * (DEGRADED_MAX_LENGTH if tier in ("short", "head") else 256)
+
+def admitted(tier: str, fn, count: int = 1, lane: str = "interactive"):
+    """Run fn (scoring ``count`` texts) in an inference slot; raises Overloaded if none frees up in time."""
+    with admission.admit(tier, token_cost(count, tier), lane):
+        return fn()
+
+def admitted_chunks(texts, tier: str, lane: str, fn) -> list:
+    """
+    [fn(chunk), ...] over consecutive chunks of texts, each admitted on its
+    own. Bulk batches are cut into BULK_CHUNK_TEXTS chunks so interactive
+    requests are served between them; interactive batches run as one chunk.
+    """
+    size = BULK_CHUNK_TEXTS if lane == "bulk" else len(texts)
+    chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+    return [admitted(tier, lambda chunk=chunk: fn(chunk), len(chunk), lane) for chunk in chunks]
+
+def coalesced_predict(text: str, tier: str, lane: str) -> dict:
+    """
+    model.predict() shared with identical concurrent requests. The lane is part
+    of the key so an interactive request never waits behind a queued bulk leader.
+    """
+    return coalescer.run(
+        text_key(text, tier, lane), lambda: admitted(tier, lambda: model.predict(text, tier=tier), lane=lane)
+    )
+
+def overloaded_response(e: Overloaded):
+    response = jsonify({"error": str(e), "retryAfter": e.retry_after})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
 @app.route("/api/analyze", methods=["POST"])
 def analyze():
-    data = request.json or {}
-    text = data.get("text", "").strip()
+    data = request_body()
+    if data is None:
+        return jsonify({"error": BODY_ERROR}), 400
+    text = body_text(data)
     if not text:
         return jsonify({"error": "Text required"}), 400
 
     try:
-        result = model.predict(text)
+        heads = requested_heads(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    lane = request_lane()
+    tier = admission.select_tier(lane)
+    started = time.perf_counter()
+    try:
+        if heads:
+            # One backbone pass for every requested head; the first head's result is the top level.
+            # predict_heads always runs the full 256-token path, so it is admitted at full cost
+            results = coalescer.run(
+                text_key(text, "heads", heads, lane),
+                lambda: admitted("full", lambda: model.predict_heads([text], heads), lane=lane),
+            )
+            audit([text], results[heads[0]], "full", lane, started, heads=heads)
+            return jsonify({**results[heads[0]][0], "heads": {name: r[0] for name, r in results.items()}})
+
+        if wants_compact():
+            include_features = bool(data.get("includeFeatures"))
+            proba, features = coalescer.run(
+                text_key(text, "compact", include_features, tier, lane),
+                lambda: chunked_scores([text], include_features, tier, lane),
+            )
+            audit([text], proba, tier, lane, started)
+            payload = encode_scores(model.labels, proba, features)
+            return Response(payload, mimetype=COMPACT_MIME_TYPE, headers={"X-Analysis-Tier": tier})
+
+        # Identical texts arriving together (retries, several clinicians on one patient) share one computation
+        result = coalesced_predict(text, tier, lane)
+        audit([text], [result], tier, lane, started)
         return jsonify(result)
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/analyze/batch", methods=["POST"])
+def analyze_batch():
+    data = request_body()
+    if data is None:
+        return jsonify({"error": BODY_ERROR}), 400
+    texts = data.get("texts")
+    if not isinstance(texts, list) or not texts:
+        return jsonify({"error": "texts must be a non-empty list"}), 400
+    if len(texts) > MAX_BATCH_TEXTS:
+        return jsonify({"error": f"At most {MAX_BATCH_TEXTS} texts per batch"}), 400
+    if not all(isinstance(t, str) for t in texts):
+        return jsonify({"error": "texts must be strings"}), 400
+    texts = [t.strip() for t in texts]
+    if not all(texts):
+        return jsonify({"error": "Text required"}), 400
+
+    try:
+        heads = requested_heads(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    lane = request_lane()
+    tier = admission.select_tier(lane)
+    started = time.perf_counter()
+    try:
+        if heads:
+            # Full 256-token path regardless of the degradation tier (see /api/analyze)
+            parts = admitted_chunks(texts, "full", lane, lambda chunk: model.predict_heads(chunk, heads))
+            results = {name: [r for part in parts for r in part[name]] for name in heads}
+            audit(texts, results[heads[0]], "full", lane, started, heads=heads)
+            return jsonify({
+                "results": [
+                    {**results[heads[0]][i], "heads": {name: r[i] for name, r in results.items()}}
+                    for i in range(len(texts))
+                ],
+                "tier": "full",
+            })
+        if wants_compact():
+            proba, features = chunked_scores(texts, bool(data.get("includeFeatures")), tier, lane)
+            audit(texts, proba, tier, lane, started)
+            payload = encode_scores(model.labels, proba, features)
+            return Response(payload, mimetype=COMPACT_MIME_TYPE, headers={"X-Analysis-Tier": tier})
+        parts = admitted_chunks(texts, tier, lane, lambda chunk: model.predict_batch(chunk, tier=tier))
+        results = [r for part in parts for r in part]
+        audit(texts, results, tier, lane, started)
+        return jsonify({"results": results, "tier": tier})
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/explain", methods=["POST"])
+def explain():
+    """Word attributions for why a text got its label (occlusion or leave_one_out)."""
+    data = request_body()
+    if data is None:
+        return jsonify({"error": BODY_ERROR}), 400
+    text = body_text(data)
+    if not text:
+        return jsonify({"error": "Text required"}), 400
+    label = data.get("label")
+    if label is not None and label not in model.labels:
+        return jsonify({"error": f"Unknown label {label!r}; available: {model.labels}"}), 400
+    method = data.get("method", "occlusion")
+    if not isinstance(method, str) or method not in EXPLAIN_PERTURBATIONS:
+        return jsonify({"error": f"method must be one of {list(EXPLAIN_PERTURBATIONS)}"}), 400
+    try:
+        budget = min(int(data.get("maxPerturbations", EXPLAIN_MAX_PERTURBATIONS)), EXPLAIN_MAX_PERTURBATIONS)
+    except (TypeError, ValueError):
+        return jsonify({"error": "maxPerturbations must be an integer"}), 400
+    if budget < 1:
+        return jsonify({"error": "maxPerturbations must be at least 1"}), 400
+
+    lane = request_lane()
+    options = dict(label=label, perturbation=method, max_perturbations=budget, batch_size=EXPLAIN_BATCH_SIZE)
+    try:
+        # Explanations always use the full hybrid path; admitted at the cost of the original plus every copy
+        result = coalescer.run(
+            text_key(text, "explain", label, method, budget, lane),
+            lambda: admitted("full", lambda: model.explain(text, **options), count=budget + 1, lane=lane),
+        )
+        return jsonify(result)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def format_scores(proba) -> dict:
+    """{topPattern, confidenceScores} for one probability vector in model.labels order."""
+    scores = sorted(
+        ({"label": label, "score": float(p)} for label, p in zip(model.labels, proba)),
+        key=lambda x: x["score"],
+        reverse=True,
+    )
+    return {"topPattern": scores[0]["label"], "confidenceScores": scores}
+
+def result_proba(result) -> list:
+    """Probabilities of a predict() result in model.labels order."""
+    scores = {item["label"]: item["score"] for item in result["confidenceScores"]}
+    return [scores[label] for label in model.labels]
+
+def session_summary(state) -> dict:
+    proba, _ = state.aggregate()
+    summary = format_scores(proba) if proba is not None else None
+    last_turn = format_scores(state.proba[-1]) if state.proba else None
+    return {"turns": state.turns_seen, "retainedTurns": len(state.proba), "session": summary, "lastTurn": last_turn}
+
+def score_turns(texts, tier: str, lane: str, started: float):
+    """
+    (probabilities, features or None, tier per turn) for new session turns.
+    A single turn takes the /api/analyze path (coalesced with identical
+    requests, early exit, near-duplicates) and carries no features; several
+    turns are scored as one batch with features.
+    """
+    if len(texts) == 1:
+        text = texts[0]
+        result = coalesced_predict(text, tier, lane)
+        audit(texts, [result], tier, lane, started)
+        return np.array([result_proba(result)], dtype=np.float32), None, [result["tier"]]
+    proba, features = chunked_scores(texts, True, tier, lane)
+    audit(texts, proba, tier, lane, started)
+    return proba, features, [tier] * len(texts)
+
+@app.route("/api/sessions/<session_id>/analyze", methods=["POST"])
+def analyze_session(session_id):
+    """
+    Append turns to a session and score only the new ones.
+    Body: {"turns": [...], "start": n} carries the session's turns from index n
+    (default 0) onwards, normally just the turn being added; turns already
+    seen are not rescored, so retries are idempotent. If this process lost the
+    state it answers 409 with "resumeFrom", the turn to resend from.
+    {"text": "..."} appends one turn unconditionally.
+    """
+    data = request_body()
+    if data is None:
+        return jsonify({"error": BODY_ERROR}), 400
+    if "turns" in data:
+        turns, start = data["turns"], data.get("start", 0)
+        if not isinstance(turns, list) or not all(isinstance(t, str) and t.strip() for t in turns):
+            return jsonify({"error": "turns must be a list of non-empty strings"}), 400
+        if isinstance(start, bool) or not isinstance(start, int) or start < 0:
+            return jsonify({"error": "start must be a non-negative integer"}), 400
+        turns = [t.strip() for t in turns]
+    else:
+        text = body_text(data)
+        if not text:
+            return jsonify({"error": "Text required"}), 400
+        turns = None
+
+    state = sessions.get(session_id)
+    lane = request_lane()
+    tier = admission.select_tier(lane)
+    started = time.perf_counter()
+    try:
+        # The admission wait and inference run outside state.lock; the plan is re-checked
+        # before it is applied and redone if another call changed the session meanwhile
+        while True:
+            if turns is None:
+                texts, reset = [text], False
+            else:
+                with state.lock:
+                    texts, reset = state.pending(turns, start)
+            proba, features, tiers = score_turns(texts, tier, lane, started) if texts else (None, None, [])
+            with state.lock:
+                if turns is not None and state.pending(turns, start) != (texts, reset):
+                    continue
+                reused = 0 if reset else len(state.proba)
+                if turns is None:
+                    state.append(texts, proba, features)
+                else:
+                    state.extend(start + len(turns), texts, reset, proba, features)
+                result = session_summary(state)
+            break
+        sessions.record(len(texts), reused, reset)
+        new_turns = [{**format_scores(p), "tier": t} for p, t in zip(proba if texts else [], tiers)]
+        return jsonify({"sessionId": session_id, "newTurns": new_turns, "scored": len(texts), **result})
+    except MissingTurns as e:
+        return jsonify({"error": str(e), "resumeFrom": e.start}), 409
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/sessions/<session_id>", methods=["GET"])
+def get_session(session_id):
+    state = sessions.peek(session_id)
+    if state is None:
+        return jsonify({"error": "Session not found"}), 404
+    with state.lock:
+        return jsonify({"sessionId": session_id, **session_summary(state)})
+
+@app.route("/api/sessions/<session_id>", methods=["DELETE"])
+def delete_session(session_id):
+    return jsonify({"deleted": sessions.delete(session_id)})
+
+def parse_timestamp(value, default=None):
+    """
+    Epoch seconds from a number or an ISO 8601 string (e.g. a JS Date); naive
+    datetimes are taken as UTC. Raises ValueError for anything else.
+    """
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    try:
+        timestamp = float(value)
+    except ValueError:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"Invalid timestamp: {value!r}") from None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        timestamp = parsed.timestamp()
+    if not math.isfinite(timestamp):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    return timestamp
+
+@app.route("/api/patients/<patient_id>/analyze", methods=["POST"])
+def analyze_patient_note(patient_id):
+    """Analyze a note and append the prediction to the patient's trend log."""
+    data = request_body()
+    if data is None:
+        return jsonify({"error": BODY_ERROR}), 400
+    text = body_text(data)
+    if not text:
+        return jsonify({"error": "Text required"}), 400
+    if not PATIENT_ID_RE.match(patient_id):
+        return jsonify({"error": f"Invalid patient id: {patient_id!r}"}), 400
+    try:
+        timestamp = parse_timestamp(data.get("timestamp"), time.time())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    lane = request_lane()
+    tier = admission.select_tier(lane)
+    started = time.perf_counter()
+    try:
+        # Same coalesced path as /api/analyze (early exit, near-duplicates)
+        result = coalesced_predict(text, tier, lane)
+        audit([text], [result], tier, lane, started)
+        prediction_log.record(patient_id, [result_proba(result)], [timestamp])
+        return jsonify({**result, "timestamp": timestamp})
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/patients/<patient_id>/predictions", methods=["POST"])
+def import_patient_predictions(patient_id):
+    """
+    Backfill the trend log with existing predictions, e.g. a patient's stored
+    history: {"records": [{"createdAt": ..., "confidenceScores": [...]}]}.
+    """
+    data = request_body()
+    if data is None:
+        return jsonify({"error": BODY_ERROR}), 400
+    records = data.get("records")
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "records must be a non-empty list"}), 400
+    try:
+        column = {label: i for i, label in enumerate(model.labels)}
+        proba = [[0.0] * len(model.labels) for _ in records]
+        for row, record in zip(proba, records):
+            for item in record["confidenceScores"]:
+                row[column[item["label"]]] = float(item["score"])
+        timestamps = [parse_timestamp(record.get("createdAt"), time.time()) for record in records]
+        prediction_log.record(patient_id, proba, timestamps)
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid record: {e}"}), 400
+    return jsonify({"imported": len(records)})
+
+@app.route("/api/patients/<patient_id>/trends", methods=["GET"])
+def patient_trends(patient_id):
+    """Rolling means, time buckets and label transitions for the dashboard charts."""
+    args = request.args
+    try:
+        bucket = args.get("bucket", "day")
+        bucket_seconds = BUCKETS[bucket] if bucket in BUCKETS else int(bucket)
+        result = prediction_log.trends(
+            patient_id,
+            window=max(1, int(args.get("window", 10))),
+            bucket_seconds=max(1, bucket_seconds),
+            start=parse_timestamp(args.get("start")),
+            end=parse_timestamp(args.get("end")),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"patientId": patient_id, **result})
+
+@app.route("/api/patients/<patient_id>/predictions", methods=["DELETE"])
+def delete_patient_predictions(patient_id):
+    try:
+        return jsonify({"deleted": prediction_log.delete(patient_id)})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def admin_authorized() -> bool:
+    """Bearer ADMIN_TOKEN check; the admin endpoints 404 when profiling is disabled."""
+    header = request.headers.get("Authorization", "")
+    token = header[len("Bearer "):] if header.startswith("Bearer ") else ""
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+@app.route("/admin/profile", methods=["POST"])
+def admin_profile():
+    """
+    Profile the live service for N seconds: {"seconds": 10, "mode": "torch" | "sampling"}.
+    Blocks for the capture and returns its summary; the trace is saved under
+    PROFILE_DIR and can be fetched from /admin/profile/<file>.
+    """
+    if not (PROFILING_ENABLED and ADMIN_TOKEN):
+        return jsonify({"error": "Not found"}), 404
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request_body()
+    if data is None:
+        return jsonify({"error": BODY_ERROR}), 400
+    mode = data.get("mode", "torch")
+    try:
+        seconds = float(data.get("seconds", 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "seconds must be a number"}), 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return jsonify({"error": f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}]"}), 400
+
+    try:
+        capture = model.start_profile(mode, seconds, PROFILE_DIR)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    logger.info(f"Profiling pid {capture['pid']} ({mode}) for {seconds:g}s")
+    summary = wait_for_summary(PROFILE_DIR, capture["summary"], timeout=seconds + 60)
+    if summary is None:
+        return jsonify({"error": "Profile did not finish", **capture}), 504
+    return jsonify(summary), (500 if "error" in summary else 200)
+
+@app.route("/admin/profile/<path:name>", methods=["GET"])
+def admin_profile_file(name):
+    if not (PROFILING_ENABLED and ADMIN_TOKEN):
+        return jsonify({"error": "Not found"}), 404
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
+@app.route("/model-info", methods=["GET"])
+def model_info():
+    info = model.get_model_info()
+    info["coalescing"] = coalescer.get_stats()
+    info["admission"] = admission.get_stats()
+    info["sessions"] = sessions.get_stats()
+    info["artifact_problems"] = ARTIFACT_PROBLEMS
+    info["model_version"] = MODEL_VERSION
+    info["audit_log"] = audit_log.get_stats() if audit_log else None
+    return jsonify(info)
+
 @app.route("/", methods=["GET"])
 def home():
     return "Analysis Service Running", 200
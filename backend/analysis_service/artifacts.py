@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Model artifact integrity checks for the analysis service.
+
+artifact_manifest.json records the expected size and SHA-256 of every model
+file under models/. Sizes are compared first, so a Git LFS pointer deployed
+in place of the real file fails immediately; hashes are then computed in a
+single streaming pass.
+
+    python artifacts.py build            # record the files currently in models/
+    python artifacts.py record models/hybrid_model_fast.pth   # add or update one entry
+    python artifacts.py verify [--strict]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+MANIFEST_PATH = os.path.join(BASE_DIR, "artifact_manifest.json")
+
+LFS_POINTER_PREFIX = b"version https://git-lfs.github.com/spec/"
+LFS_POINTER_MAX_SIZE = 1024
+
+
+class ArtifactError(RuntimeError):
+    """A model artifact is missing, is an LFS pointer, or does not match the manifest."""
+
+
+def is_lfs_pointer(path: str) -> bool:
+    """True if path is a Git LFS pointer file rather than the object it points to."""
+    if os.path.getsize(path) > LFS_POINTER_MAX_SIZE:
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+
+
+def read_lfs_pointer(path: str) -> Dict[str, object]:
+    """Size and SHA-256 of the object an LFS pointer refers to."""
+    fields = {}
+    with open(path) as f:
+        for line in f:
+            key, _, value = line.strip().partition(" ")
+            fields[key] = value
+    return {"size": int(fields["size"]), "sha256": fields["oid"].split(":", 1)[1]}
+
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(models_dir: str = MODELS_DIR) -> Dict[str, object]:
+    """
+    Describe every artifact in models_dir. LFS pointers are recorded with the
+    size and hash of the object they point to, so a manifest can be built
+    from a checkout without the LFS objects.
+    """
+    artifacts = {}
+    for name in sorted(os.listdir(models_dir)):
+        path = os.path.join(models_dir, name)
+        if not os.path.isfile(path) or name.endswith(".md"):
+            continue
+        if is_lfs_pointer(path):
+            artifacts[name] = read_lfs_pointer(path)
+        else:
+            artifacts[name] = {"size": os.path.getsize(path), "sha256": sha256_file(path)}
+    return {"artifacts": artifacts}
+
+
+def load_manifest(manifest_path: str = MANIFEST_PATH) -> Dict[str, object]:
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest: Dict[str, object], manifest_path: str = MANIFEST_PATH):
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+def served_path(name: str, models_dir: str = MODELS_DIR) -> str:
+    """Absolute path the service loads the artifact called name from."""
+    return os.path.join(os.path.abspath(models_dir), name)
+
+
+def record_artifact(path: str, manifest_path: str = MANIFEST_PATH, models_dir: str = MODELS_DIR) -> bool:
+    """
+    Add or update the manifest entry for one file under models_dir, so a newly
+    trained artifact passes the startup check without rebuilding the whole
+    manifest. Returns False (and leaves the manifest alone) for a path outside
+    models_dir, which the service never loads by manifest name.
+    """
+    name = os.path.relpath(os.path.abspath(path), os.path.abspath(models_dir))
+    if name.startswith(os.pardir) or os.path.isabs(name):
+        return False
+    manifest = load_manifest(manifest_path) if os.path.exists(manifest_path) else {"artifacts": {}}
+    manifest["artifacts"][name] = {"size": os.path.getsize(path), "sha256": sha256_file(path)}
+    manifest["artifacts"] = dict(sorted(manifest["artifacts"].items()))
+    write_manifest(manifest, manifest_path)
+    return True
+
+
+def verify_artifacts(
+    paths: Optional[Iterable[str]] = None,
+    manifest_path: str = MANIFEST_PATH,
+    models_dir: str = MODELS_DIR,
+    digests: Optional[Dict[str, str]] = None,
+) -> List[str]:
+    """
+    Check artifacts against the manifest and return a list of problems (empty if all match).
+    ``paths`` limits the check to the files a process will actually load; by
+    default every manifest entry is checked. A path that has no manifest entry
+    is a problem too. If a ``digests`` dict is passed, the SHA-256 of every
+    file that exists and is not an LFS pointer is stored in it by path,
+    including unlisted and mismatched files.
+    """
+    artifacts = load_manifest(manifest_path)["artifacts"]
+    if paths is None:
+        paths = [os.path.join(models_dir, name) for name in artifacts]
+
+    problems = []
+    for path in paths:
+        name = os.path.relpath(path, models_dir)
+        expected = artifacts.get(name)
+        if not os.path.exists(path):
+            problems.append(f"{name}: missing")
+            continue
+        if expected is None:
+            problems.append(f"{name}: not listed in {os.path.basename(manifest_path)}")
+            if digests is not None and not is_lfs_pointer(path):
+                digests[path] = sha256_file(path)
+            continue
+        size = os.path.getsize(path)
+        if size != expected["size"]:
+            if is_lfs_pointer(path):
+                problems.append(f"{name}: is a Git LFS pointer ({size} bytes), run `git lfs pull`")
+                continue
+            problems.append(f"{name}: size {size} != expected {expected['size']}")
+            if digests is not None:
+                digests[path] = sha256_file(path)
+            continue
+        digest = sha256_file(path)
+        if digests is not None:
+            digests[path] = digest
+        if digest != expected["sha256"]:
+            problems.append(f"{name}: sha256 {digest} != expected {expected['sha256']}")
+    return problems
+
+
+def artifact_version(
+    paths: Iterable[str],
+    digests: Dict[str, str],
+    manifest_path: str = MANIFEST_PATH,
+    models_dir: str = MODELS_DIR,
+) -> str:
+    """
+    Short identifier of the model files actually loaded, from the hashes
+    check_artifacts(digests=...) computed, e.g.
+    "hybrid_model.pth@b9150359+xgboost_classifier.json@6a0fb68e". A hash that
+    differs from the manifest is suffixed "-mismatch", one without a manifest
+    entry "-unlisted"; a file that was not hashed (missing, an LFS pointer,
+    or no manifest to check against) is "unverified".
+    """
+    artifacts = load_manifest(manifest_path)["artifacts"] if os.path.exists(manifest_path) else {}
+    parts = []
+    for path in paths:
+        name = os.path.relpath(path, models_dir)
+        digest = digests.get(path)
+        if digest is None:
+            parts.append(f"{name}@unverified")
+            continue
+        entry = artifacts.get(name)
+        suffix = "" if entry and entry["sha256"] == digest else ("-mismatch" if entry else "-unlisted")
+        parts.append(f"{name}@{digest[:8]}{suffix}")
+    return "+".join(parts)
+
+
+def check_artifacts(
+    paths: Optional[Iterable[str]] = None,
+    strict: bool = False,
+    manifest_path: str = MANIFEST_PATH,
+    models_dir: str = MODELS_DIR,
+    digests: Optional[Dict[str, str]] = None,
+) -> List[str]:
+    """
+    Verify artifacts and report problems. In strict mode any problem, or a
+    missing manifest, raises ArtifactError so the service refuses to start.
+    ``digests`` collects the computed hashes (see verify_artifacts).
+    """
+    if not os.path.exists(manifest_path):
+        if strict:
+            raise ArtifactError(f"Artifact manifest not found at {manifest_path}")
+        print(f"⚠️ Artifact manifest not found at {manifest_path}; skipping integrity check")
+        return []
+
+    problems = verify_artifacts(paths, manifest_path, models_dir, digests)
+    for problem in problems:
+        print(f"{'❌' if strict else '⚠️'} Artifact check: {problem}")
+    if problems and strict:
+        raise ArtifactError(f"{len(problems)} model artifact(s) failed verification: " + "; ".join(problems))
+    if not problems:
+        print("✅ Model artifacts match the manifest")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify the model artifact manifest")
+    parser.add_argument("command", choices=["build", "verify", "record"])
+    parser.add_argument("paths", nargs="*", help="Files under --models-dir to record (record only)")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--strict", action="store_true", help="Exit non-zero if any artifact fails")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest = build_manifest(args.models_dir)
+        write_manifest(manifest, args.manifest)
+        print(f"✅ Wrote {len(manifest['artifacts'])} artifact(s) to {args.manifest}")
+        return
+
+    if args.command == "record":
+        if not args.paths:
+            parser.error("record needs at least one path")
+        for path in args.paths:
+            if not record_artifact(path, args.manifest, args.models_dir):
+                print(f"❌ {path} is not under {args.models_dir}")
+                sys.exit(1)
+            print(f"✅ Recorded {path} in {args.manifest}")
+        return
+
+    try:
+        problems = check_artifacts(strict=args.strict, manifest_path=args.manifest, models_dir=args.models_dir)
+    except ArtifactError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    sys.exit(1 if problems and args.strict else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Write-behind prediction audit log for the analysis service.
+
+record() only appends a dict to an in-memory buffer, so request threads
+never wait on disk. A background thread wakes every ``flush_interval``
+seconds, swaps the buffer out, serializes it as JSON lines and writes it to
+``<directory>/audit.jsonl`` in one append followed by an fsync, so a crash
+loses at most the records of one interval. The file is rotated to
+``audit-<UTC timestamp>.jsonl`` once it passes ``max_bytes``; the newest
+``backup_count`` rotated files are kept.
+
+If the disk stalls and the buffer reaches ``max_buffered`` records, the
+oldest are dropped (and counted) rather than blocking requests.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+ACTIVE_NAME = "audit.jsonl"
+
+
+class AuditLog:
+    """Buffered append-only JSONL audit trail with a background flush thread."""
+
+    def __init__(
+        self,
+        directory: str,
+        flush_interval: float = 1.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        backup_count: int = 10,
+        max_buffered: int = 100000,
+    ):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.path = os.path.join(directory, ACTIVE_NAME)
+        os.makedirs(directory, exist_ok=True)
+
+        self._buffer: deque = deque(maxlen=max_buffered)
+        self._lock = threading.Lock()
+        # Serializes flushes (the flush thread and explicit flush()/close() calls)
+        self._flush_lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._closed = threading.Event()
+        self.stats = {"records": 0, "written": 0, "dropped": 0, "flushes": 0, "rotations": 0, "write_errors": 0}
+
+        self._thread = threading.Thread(target=self._run, name="audit-log-flush", daemon=True)
+        self._thread.start()
+
+    def record(self, entry: Dict[str, object]):
+        """Queue one record; never blocks on I/O."""
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.stats["dropped"] += 1
+            self._buffer.append(entry)
+            self.stats["records"] += 1
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[AuditLog] ❌ Flush failed: {e}")
+
+    def flush(self):
+        """Write every buffered record to disk now."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                entries = list(self._buffer)
+                self._buffer.clear()
+            # default=str: an unexpected value type must not kill the flush thread
+            payload = "".join(json.dumps(entry, separators=(",", ":"), default=str) + "\n" for entry in entries)
+            try:
+                self._file.write(payload)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                # Put the records back in front of newer ones and retry next interval
+                with self._lock:
+                    self.stats["write_errors"] += 1
+                    combined = entries + list(self._buffer)
+                    self.stats["dropped"] += max(0, len(combined) - self._buffer.maxlen)
+                    self._buffer = deque(combined, maxlen=self._buffer.maxlen)
+                print(f"[AuditLog] ❌ Failed to write {len(entries)} record(s), will retry: {e}")
+                return
+            with self._lock:
+                self.stats["written"] += len(entries)
+                self.stats["flushes"] += 1
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        """Caller holds self._flush_lock."""
+        self._file.close()
+        stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        os.replace(self.path, self._unique_path(os.path.join(self.directory, f"audit-{stamp}.jsonl")))
+        self._file = open(self.path, "a", encoding="utf-8")
+        for old in self.rotated_files()[:-self.backup_count or None]:
+            os.remove(old)
+        with self._lock:
+            self.stats["rotations"] += 1
+
+    @staticmethod
+    def _unique_path(path: str) -> str:
+        root, ext = os.path.splitext(path)
+        candidate, n = path, 1
+        while os.path.exists(candidate):
+            candidate, n = f"{root}-{n}{ext}", n + 1
+        return candidate
+
+    def rotated_files(self) -> List[str]:
+        """Rotated files, oldest first."""
+        return sorted(glob.glob(os.path.join(self.directory, "audit-*.jsonl")), key=os.path.getmtime)
+
+    def close(self):
+        """Stop the flush thread and write what is left."""
+        self._closed.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        self._file.close()
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats: Dict[str, object] = dict(self.stats)
+            stats["buffered"] = len(self._buffer)
+        stats["path"] = self.path
+        stats["flush_interval"] = self.flush_interval
+        return stats
+
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Allocation Benchmark for Virtual Therapist Analysis Service
+
+Compares the legacy inference path (fresh encode_plus tensors, torch.no_grad,
+.cpu().numpy()) with the pooled path used by HybridModelInference (reused
+input buffers, torch.inference_mode, numpy views) under sustained load.
+Reports tracemalloc block counts and bytes per request, plus latency.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import torch
+
+from hybrid_model import HybridMentalHealthModel
+
+SAMPLE_TEXTS = [
+    "I feel really anxious about my upcoming presentation. My heart is racing.",
+    "I've been feeling really down lately and nothing brings me joy anymore.",
+    "Some days I have endless energy and barely sleep, then I crash for a week.",
+    "Work has been fine, I just worry constantly that something will go wrong.",
+]
+
+
+def legacy_step(model, text):
+    inputs = model.preprocess_text(text)
+    with torch.no_grad():
+        features, logits = model.model(**inputs)
+        features_np = features.cpu().numpy()
+    if model.xgb_model is not None:
+        return model.xgb_model.predict_proba(features_np)[0]
+    return torch.softmax(logits, dim=-1).cpu().numpy()[0]
+
+
+def pooled_step(model, text):
+    with model._encoded([text]) as inputs:
+        features, logits = model._run_model(inputs)
+    return model._score(features, logits)[0]
+
+
+def measure(name, step, model, requests):
+    # Warm up so one-off allocations (pool buffers, lazy init) are not counted
+    for text in SAMPLE_TEXTS:
+        step(model, text)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        step(model, SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)])
+        latencies.append(time.perf_counter() - start)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, "filename")
+    allocated_blocks = sum(max(stat.count_diff, 0) for stat in diff)
+    allocated_bytes = sum(max(stat.size_diff, 0) for stat in diff)
+    latencies.sort()
+    return {
+        "path": name,
+        "requests": requests,
+        "retained_blocks_per_request": round(allocated_blocks / requests, 2),
+        "retained_bytes_per_request": round(allocated_bytes / requests, 1),
+        "peak_traced_bytes": peak,
+        "mean_latency_ms": round(1000 * sum(latencies) / requests, 3),
+        "p95_latency_ms": round(1000 * latencies[int(0.95 * (requests - 1))], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark allocations of the inference path")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--model-path", default="models/hybrid_model.pth")
+    parser.add_argument("--xgb-path", default="models/xgboost_classifier.json")
+    parser.add_argument("--output", help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    model = HybridMentalHealthModel(
+        transformer_model_path=args.model_path,
+        xgboost_model_path=args.xgb_path,
+    )
+
+    report = {
+        "legacy": measure("legacy", legacy_step, model, args.requests),
+        "pooled": measure("pooled", pooled_step, model, args.requests),
+        "input_pool": dict(model.input_pool.stats),
+    }
+
+    print("\n📊 Allocation benchmark")
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
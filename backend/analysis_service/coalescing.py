@@ -0,0 +1,64 @@
+"""
+Request coalescing for the analysis service.
+Concurrent identical requests share one in-flight computation instead of
+each running the model. Nothing is cached: once the computation finishes,
+the next identical request computes again.
+"""
+
+import copy
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+
+def text_key(text: str, *options: Any) -> str:
+    """Stable key for a text and any options that change its result."""
+    digest = hashlib.sha256(text.encode("utf-8"))
+    for option in options:
+        digest.update(b"\0" + repr(option).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RequestCoalescer:
+    """
+    Share one in-flight computation between concurrent callers with the same key.
+    The first caller (the leader) runs the function; followers block on its
+    result and receive their own copy of it, or the leader's exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def run(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._in_flight)
+        return stats
@@ -0,0 +1,87 @@
+"""
+Compact binary response format for analysis results.
+
+An opt-in alternative to the JSON ``confidenceScores`` list for batch and
+internal callers. The probabilities (and optionally the 512-d features the
+XGBoost scorer ran on) are sent as raw little-endian float32 arrays behind
+a small header, so neither side serializes or parses per-label objects.
+
+Layout (all little-endian):
+
+    offset  size  field
+    0       4     magic  b"HMS1"
+    4       1     version (1)
+    5       1     flags  (bit 0: features present)
+    6       2     num_labels      L
+    8       4     num_rows        N
+    12      4     feature_dim     D (0 without features)
+    16      2     labels_bytes    B
+    18      B     labels, UTF-8, comma separated, in column order
+    18+B    ...   zero padding to a multiple of 4
+    ...     4*N*L probabilities, float32, row-major
+    ...     4*N*D features, float32, row-major (only if flag bit 0)
+
+backend/services/analysisScores.js decodes the same layout in Node.
+"""
+
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+MIME_TYPE = "application/x-hybrid-scores"
+MAGIC = b"HMS1"
+VERSION = 1
+FLAG_FEATURES = 0x1
+
+_HEADER = struct.Struct("<4sBBHIIH")
+
+
+def _padding(labels_bytes: int) -> int:
+    return -(_HEADER.size + labels_bytes) % 4
+
+
+def encode_scores(labels: List[str], proba: np.ndarray, features: Optional[np.ndarray] = None) -> bytes:
+    """Pack an (N, L) probability array and optional (N, D) feature array."""
+    proba = np.ascontiguousarray(proba, dtype="<f4")
+    num_rows, num_labels = proba.shape
+    if num_labels != len(labels):
+        raise ValueError(f"{len(labels)} labels for {num_labels} probability columns")
+
+    flags, feature_dim = 0, 0
+    if features is not None:
+        features = np.ascontiguousarray(features, dtype="<f4")
+        if features.shape[0] != num_rows:
+            raise ValueError(f"{features.shape[0]} feature rows for {num_rows} probability rows")
+        flags, feature_dim = FLAG_FEATURES, features.shape[1]
+
+    label_bytes = ",".join(labels).encode("utf-8")
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, flags, num_labels, num_rows, feature_dim, len(label_bytes)),
+        label_bytes,
+        b"\0" * _padding(len(label_bytes)),
+        proba.tobytes(),
+    ]
+    if features is not None:
+        parts.append(features.tobytes())
+    return b"".join(parts)
+
+
+def decode_scores(data: bytes) -> Tuple[List[str], np.ndarray, Optional[np.ndarray]]:
+    """Inverse of encode_scores; arrays are read-only views into ``data``."""
+    magic, version, flags, num_labels, num_rows, feature_dim, label_len = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a hybrid scores payload")
+    if version != VERSION:
+        raise ValueError(f"Unsupported hybrid scores version {version}")
+
+    offset = _HEADER.size
+    labels = data[offset:offset + label_len].decode("utf-8").split(",")
+    offset += label_len + _padding(label_len)
+
+    proba = np.frombuffer(data, dtype="<f4", count=num_rows * num_labels, offset=offset).reshape(num_rows, num_labels)
+    offset += proba.nbytes
+    features = None
+    if flags & FLAG_FEATURES:
+        features = np.frombuffer(data, dtype="<f4", count=num_rows * feature_dim, offset=offset).reshape(num_rows, feature_dim)
+    return labels, proba, features
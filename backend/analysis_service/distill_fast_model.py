@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Fast Model Distillation Script for Virtual Therapist Analysis Service
+
+Trains a layer-truncated DistilBERT_BiLSTM_Hybrid (the "fast" variant) to
+reproduce the full model's ``final_state`` features, so the existing
+xgboost_classifier.json keeps working on the student's features. Optionally
+refits a booster on the student features and reports speed-up and accuracy
+delta against the full model.
+
+Input is a JSONL file with a "text" field per line and an optional "label"
+field (Anxiety, Bipolar or Depression). Unlabelled lines are only used for
+distillation and agreement.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from transformers import DistilBertTokenizer
+
+from artifacts import record_artifact, served_path
+from hybrid_model import DistilBERT_BiLSTM_Hybrid
+
+LABELS = ["Anxiety", "Bipolar", "Depression"]
+
+
+def record_in_manifest(path, name):
+    """
+    Keep artifact_manifest.json in step when path is where HYBRID_VARIANT=fast
+    loads the artifact called name from; elsewhere it is never checked.
+    """
+    if os.path.abspath(path) == served_path(name):
+        record_artifact(path)
+        print(f"✅ Recorded {path} in the artifact manifest")
+    else:
+        print(f"⚠️ HYBRID_VARIANT=fast serves models/{name}; after copying {path} there run "
+              f"`python artifacts.py record models/{name}`")
+
+
+def load_examples(path):
+    """Read {"text", "label"?} records from a JSONL file."""
+    examples = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            label = record.get("label")
+            examples.append((record["text"], LABELS.index(label) if label in LABELS else None))
+    return examples
+
+
+def build_student(teacher, num_layers):
+    """
+    Create a truncated student initialised from the teacher.
+
+    The student's transformer layers are copied from evenly spaced teacher
+    layers (e.g. 0, 2, 4 for three layers); embeddings, BiLSTM and classifier
+    are copied as-is.
+    """
+    student = DistilBERT_BiLSTM_Hybrid(
+        num_labels=teacher.num_labels,
+        hidden_dim=teacher.hidden_dim,
+        num_transformer_layers=num_layers,
+    )
+    teacher_layers = teacher.distilbert.transformer.layer
+    picked = np.linspace(0, len(teacher_layers) - 1, num_layers).round().astype(int)
+
+    student.distilbert.embeddings.load_state_dict(teacher.distilbert.embeddings.state_dict())
+    for student_idx, teacher_idx in enumerate(picked):
+        student.distilbert.transformer.layer[student_idx].load_state_dict(teacher_layers[teacher_idx].state_dict())
+    student.lstm.load_state_dict(teacher.lstm.state_dict())
+    student.classifier.load_state_dict(teacher.classifier.state_dict())
+    print(f"✅ Student initialised from teacher layers {picked.tolist()}")
+    return student
+
+
+def encode(tokenizer, texts, max_length):
+    encoding = tokenizer(
+        texts,
+        add_special_tokens=True,
+        max_length=max_length,
+        padding="max_length",
+        truncation=True,
+        return_attention_mask=True,
+        return_tensors="pt",
+    )
+    return encoding["input_ids"], encoding["attention_mask"]
+
+
+def extract(model, tokenizer, texts, batch_size, max_length):
+    """Return (features, seconds spent in forward passes) for texts."""
+    model.eval()
+    features, elapsed = [], 0.0
+    with torch.no_grad():
+        for i in range(0, len(texts), batch_size):
+            input_ids, attention_mask = encode(tokenizer, texts[i:i + batch_size], max_length)
+            start = time.perf_counter()
+            final_state, _ = model(input_ids=input_ids, attention_mask=attention_mask)
+            elapsed += time.perf_counter() - start
+            features.append(final_state.numpy())
+    return np.concatenate(features), elapsed
+
+
+def distill(teacher, student, tokenizer, texts, args):
+    """Match the teacher's final_state (MSE) and classifier logits (KL)."""
+    optimizer = torch.optim.AdamW(student.parameters(), lr=args.lr)
+    teacher.eval()
+    for epoch in range(1, args.epochs + 1):
+        student.train()
+        random.shuffle(texts)
+        total = 0.0
+        for i in range(0, len(texts), args.batch_size):
+            input_ids, attention_mask = encode(tokenizer, texts[i:i + args.batch_size], args.max_length)
+            with torch.no_grad():
+                teacher_state, teacher_logits = teacher(input_ids=input_ids, attention_mask=attention_mask)
+            student_state, student_logits = student(input_ids=input_ids, attention_mask=attention_mask)
+
+            loss = F.mse_loss(student_state, teacher_state) + args.kl_weight * F.kl_div(
+                F.log_softmax(student_logits, dim=-1),
+                F.softmax(teacher_logits, dim=-1),
+                reduction="batchmean",
+            )
+            optimizer.zero_grad()
+            loss.backward()
+            nn.utils.clip_grad_norm_(student.parameters(), 1.0)
+            optimizer.step()
+            total += loss.item() * len(input_ids)
+        print(f"📉 Epoch {epoch}/{args.epochs}: loss {total / len(texts):.5f}")
+
+
+def accuracy(predictions, labels):
+    mask = labels >= 0
+    if not mask.any():
+        return None
+    return float((predictions[mask] == labels[mask]).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil a layer-truncated fast variant of the hybrid model")
+    parser.add_argument("--data", required=True, help="JSONL file with a 'text' field and optional 'label'")
+    parser.add_argument("--teacher-path", default="models/hybrid_model.pth")
+    parser.add_argument("--xgb-path", default="models/xgboost_classifier.json")
+    parser.add_argument("--output", default="models/hybrid_model_fast.pth")
+    parser.add_argument("--layers", type=int, default=3, help="Transformer layers kept in the student")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    parser.add_argument("--kl-weight", type=float, default=1.0)
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--eval-fraction", type=float, default=0.1)
+    parser.add_argument("--refit-xgb", action="store_true", help="Also fit xgboost_classifier_fast.json on student features")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+
+    print("🚀 Virtual Therapist Fast Model Distillation")
+    print("=" * 60)
+
+    examples = load_examples(args.data)
+    random.shuffle(examples)
+    n_eval = max(1, int(len(examples) * args.eval_fraction))
+    eval_examples, train_examples = examples[:n_eval], examples[n_eval:]
+    print(f"📚 {len(train_examples)} training texts, {len(eval_examples)} held-out texts")
+
+    tokenizer = DistilBertTokenizer.from_pretrained("distilbert-base-uncased")
+    teacher = DistilBERT_BiLSTM_Hybrid(num_labels=3, hidden_dim=256, lstm_layers=1, dropout_prob=0.3)
+    teacher.load_state_dict(torch.load(args.teacher_path, map_location="cpu"))
+    student = build_student(teacher, args.layers)
+
+    distill(teacher, student, tokenizer, [text for text, _ in train_examples], args)
+    torch.save(student.state_dict(), args.output)
+    print(f"✅ Fast model saved to: {args.output}")
+    record_in_manifest(args.output, "hybrid_model_fast.pth")
+
+    # Compare teacher and student on held-out texts
+    import xgboost as xgb
+    xgb_model = xgb.XGBClassifier()
+    xgb_model.load_model(args.xgb_path)
+
+    eval_texts = [text for text, _ in eval_examples]
+    eval_labels = np.array([-1 if label is None else label for _, label in eval_examples])
+    teacher_features, teacher_seconds = extract(teacher, tokenizer, eval_texts, args.batch_size, args.max_length)
+    student_features, student_seconds = extract(student, tokenizer, eval_texts, args.batch_size, args.max_length)
+    teacher_pred = xgb_model.predict(teacher_features)
+    student_pred = xgb_model.predict(student_features)
+
+    report = {
+        "layers": args.layers,
+        "eval_texts": len(eval_texts),
+        "teacher_forward_seconds": round(teacher_seconds, 4),
+        "student_forward_seconds": round(student_seconds, 4),
+        "speedup": round(teacher_seconds / student_seconds, 3) if student_seconds else None,
+        "feature_mse": float(np.mean((teacher_features - student_features) ** 2)),
+        "label_agreement": float((teacher_pred == student_pred).mean()),
+        "teacher_accuracy": accuracy(teacher_pred, eval_labels),
+        "student_accuracy": accuracy(student_pred, eval_labels),
+    }
+    if report["teacher_accuracy"] is not None:
+        report["accuracy_delta"] = report["student_accuracy"] - report["teacher_accuracy"]
+
+    if args.refit_xgb:
+        # Refit on student features, using gold labels where present and the
+        # teacher's XGBoost labels elsewhere
+        train_texts = [text for text, _ in train_examples]
+        train_features, _ = extract(student, tokenizer, train_texts, args.batch_size, args.max_length)
+        teacher_train_features, _ = extract(teacher, tokenizer, train_texts, args.batch_size, args.max_length)
+        targets = xgb_model.predict(teacher_train_features)
+        for i, (_, label) in enumerate(train_examples):
+            if label is not None:
+                targets[i] = label
+
+        refit = xgb.XGBClassifier(**xgb_model.get_params())
+        refit.fit(train_features, targets)
+        refit_path = os.path.join(os.path.dirname(args.output) or ".", "xgboost_classifier_fast.json")
+        refit.save_model(refit_path)
+        print(f"✅ Refit XGBoost model saved to: {refit_path}")
+        record_in_manifest(refit_path, "xgboost_classifier_fast.json")
+
+        refit_pred = refit.predict(student_features)
+        report["refit_label_agreement"] = float((teacher_pred == refit_pred).mean())
+        report["refit_accuracy"] = accuracy(refit_pred, eval_labels)
+
+    report_path = os.path.splitext(args.output)[0] + "_report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n📊 Distillation report")
+    print(json.dumps(report, indent=2))
+    print(f"\n🎉 Report saved to: {report_path}")
+    print("Serve it with HYBRID_VARIANT=fast HYBRID_FAST_LAYERS=%d python app.py" % args.layers)
+
+
+if __name__ == "__main__":
+    main()
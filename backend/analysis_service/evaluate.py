@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Labelled Evaluation Run for HybridModelInference
+
+Runs a labelled JSONL set (by default the bundled data/samples.jsonl) through
+the model in any serving configuration (XGBoost backend, precision,
+torch.compile, fast variant, degradation tier, early exit, token cache) and
+reports quality and cost together as one JSON report:
+
+  - overall accuracy, per-class precision/recall/F1 and the confusion matrix,
+    measured on predict() (what /api/analyze serves), plus how often
+    predict_batch() agrees with it
+  - throughput and p50/p95/p99 latency for single and batched calls
+  - resident memory after loading and the process peak
+  - the acceleration, token cache and startup details from get_model_info()
+
+    python evaluate.py --precision bf16 --compile --output eval_bf16.json
+    python evaluate.py --model-path models/hybrid_model_fast.pth --layers 3 --tier short
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+from hybrid_model import DEFAULT_PARITY_SAMPLES, PRECISIONS, TIERS, HybridMentalHealthModel
+from worker_pool import current_rss_mb
+
+
+def load_samples(path):
+    """(texts, labels) from a JSONL file with 'text' and 'label' fields."""
+    texts, labels = [], []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record["text"])
+                labels.append(record["label"])
+    return texts, labels
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def latency_summary(seconds, items):
+    """Throughput and latency percentiles for timed calls that together covered ``items`` texts."""
+    ms = np.asarray(seconds) * 1000
+    return {
+        "calls": len(ms),
+        "texts_per_second": round(items / float(np.sum(ms) / 1000), 2),
+        "latency_ms": {
+            "mean": round(float(ms.mean()), 3),
+            "p50": round(float(np.percentile(ms, 50)), 3),
+            "p95": round(float(np.percentile(ms, 95)), 3),
+            "p99": round(float(np.percentile(ms, 99)), 3),
+            "max": round(float(ms.max()), 3),
+        },
+    }
+
+
+def quality_report(expected, predicted, labels):
+    """Accuracy, per-class precision/recall/F1 and the confusion matrix (rows: true label)."""
+    from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_recall_fscore_support
+
+    precision, recall, f1, support = precision_recall_fscore_support(
+        expected, predicted, labels=labels, zero_division=0
+    )
+    per_class = {}
+    for i, label in enumerate(labels):
+        rows = [j for j, want in enumerate(expected) if want == label]
+        per_class[label] = {
+            "support": int(support[i]),
+            "accuracy": round(sum(predicted[j] == label for j in rows) / len(rows), 4) if rows else None,
+            "precision": round(float(precision[i]), 4),
+            "recall": round(float(recall[i]), 4),
+            "f1": round(float(f1[i]), 4),
+        }
+    return {
+        "samples": len(expected),
+        "accuracy": round(float(accuracy_score(expected, predicted)), 4),
+        "macro_f1": round(float(f1_score(expected, predicted, labels=labels, average="macro", zero_division=0)), 4),
+        "per_class": per_class,
+        "confusion_matrix": {
+            "labels": labels,
+            "rows": confusion_matrix(expected, predicted, labels=labels).tolist(),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate HybridModelInference on labelled texts: quality, latency and memory")
+    parser.add_argument("--data", default=DEFAULT_PARITY_SAMPLES, help="JSONL file with 'text' and 'label' fields")
+    parser.add_argument("--model-path", default="models/hybrid_model.pth")
+    parser.add_argument("--xgb-path", default="models/xgboost_classifier.json")
+    parser.add_argument("--xgb-backend", default="xgboost", choices=["xgboost", "compiled"])
+    parser.add_argument("--layers", type=int, help="Transformer layers of a fast-variant --model-path")
+    parser.add_argument("--precision", default="fp32", choices=list(PRECISIONS))
+    parser.add_argument("--compile", action="store_true", help="torch.compile the serving forward pass")
+    parser.add_argument("--compile-batch-buckets", default="1,4,16")
+    parser.add_argument("--parity-min-agreement", type=float, default=0.95)
+    parser.add_argument("--tier", default="full", choices=list(TIERS))
+    parser.add_argument("--degraded-max-length", type=int, default=64)
+    parser.add_argument("--early-exit-margin", type=float)
+    parser.add_argument("--early-exit-max-length", type=int, default=64)
+    parser.add_argument("--token-cache-mb", type=float, default=32.0, help="0 disables the token cache")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes over the data for each call style")
+    parser.add_argument("--threads", type=int, help="torch.set_num_threads before loading")
+    parser.add_argument("--verbose", action="store_true", help="Keep the model's per-request logging")
+    parser.add_argument("--output", help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    texts, expected = load_samples(args.data)
+    print(f"🚀 Evaluating on {len(texts)} labelled texts from {args.data}")
+    print("=" * 60)
+
+    rss_before_load = current_rss_mb()
+    start = time.perf_counter()
+    model = HybridMentalHealthModel(
+        transformer_model_path=args.model_path,
+        xgboost_model_path=args.xgb_path,
+        xgb_backend=args.xgb_backend,
+        num_transformer_layers=args.layers,
+        precision=args.precision,
+        compile=args.compile,
+        compile_batch_buckets=tuple(int(size) for size in args.compile_batch_buckets.split(",") if size.strip()),
+        parity_min_agreement=args.parity_min_agreement,
+        degradation_tiers=[args.tier] if args.tier != "full" else None,
+        degraded_max_length=args.degraded_max_length,
+        early_exit_margin=args.early_exit_margin,
+        early_exit_max_length=args.early_exit_max_length,
+        token_cache_mb=args.token_cache_mb,
+    )
+    model.warmup()
+    load_seconds = time.perf_counter() - start
+    rss_after_load = current_rss_mb()
+
+    unknown = sorted(set(expected) - set(model.labels))
+    if unknown:
+        print(f"❌ Labels not produced by the model: {unknown} (expected one of {model.labels})")
+        sys.exit(1)
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    # Labels come from the last pass (they are deterministic); passes after the first hit
+    # the token cache the way repeat traffic does
+    single_seconds, batch_seconds = [], []
+    with quiet:
+        for _ in range(args.repeats):
+            predicted = []
+            for text in texts:
+                start = time.perf_counter()
+                predicted.append(model.predict(text, tier=args.tier)["topPattern"])
+                single_seconds.append(time.perf_counter() - start)
+
+        for _ in range(args.repeats):
+            batched = []
+            for offset in range(0, len(texts), args.batch_size):
+                chunk = texts[offset:offset + args.batch_size]
+                start = time.perf_counter()
+                results = model.predict_batch(chunk, batch_size=args.batch_size, tier=args.tier)
+                batch_seconds.append(time.perf_counter() - start)
+                batched.extend(result["topPattern"] for result in results)
+
+    info = model.get_model_info()
+    report = {
+        "data": os.path.abspath(args.data),
+        "config": {
+            "model_path": model.model_path,
+            "xgb_path": model.xgb_path,
+            "xgb_backend": args.xgb_backend,
+            "transformer_layers": info["transformer_layers"],
+            "tier": args.tier,
+            "early_exit_margin": args.early_exit_margin,
+            "token_cache_mb": args.token_cache_mb,
+            "batch_size": args.batch_size,
+            "repeats": args.repeats,
+            "torch_threads": args.threads,
+        },
+        "quality": quality_report(expected, predicted, model.labels),
+        "batch_agreement": round(sum(a == b for a, b in zip(predicted, batched)) / len(texts), 4),
+        "performance": {
+            "load_seconds": round(load_seconds, 3),
+            "single": latency_summary(single_seconds, len(single_seconds)),
+            "batch": latency_summary(batch_seconds, len(texts) * args.repeats),
+        },
+        "memory": {
+            "rss_before_load_mb": round(rss_before_load, 1),
+            "rss_after_load_mb": round(rss_after_load, 1),
+            "rss_after_run_mb": round(current_rss_mb(), 1),
+            # ru_maxrss lags /proc by a page or so; the peak is never below the current RSS
+            "peak_rss_mb": round(max(peak_rss_mb(), current_rss_mb()), 1),
+        },
+        "acceleration": info["acceleration"],
+        "adaptive_stats": info["adaptive_stats"],
+        "token_cache": info["token_cache"],
+        "startup": info["startup"],
+    }
+
+    print("\n📊 Evaluation")
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to: {args.output}")
+
+    quality, single = report["quality"], report["performance"]["single"]
+    print(
+        f"\n🎯 accuracy {quality['accuracy']:.2%}, macro F1 {quality['macro_f1']:.3f}, "
+        f"p95 {single['latency_ms']['p95']:.1f} ms, peak RSS {report['memory']['peak_rss_mb']:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
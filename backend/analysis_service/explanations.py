@@ -0,0 +1,10 @@
+"""
+Options of HybridModelInference.explain() that the HTTP layer validates.
+
+Kept free of torch so app.py can check /api/explain requests without
+importing the model; in INFERENCE_WORKERS mode the HTTP process never loads
+torch.
+"""
+
+# Perturbations for explain(): replace a word's tokens with [MASK], or drop them
+EXPLAIN_PERTURBATIONS = ("occlusion", "leave_one_out")
@@ -0,0 +1,135 @@
+"""
+Classifier heads served on the shared DistilBERT backbone.
+
+HybridModelInference runs DistilBERT once per batch and feeds its last
+hidden state to every head a request selects, so an extra task costs its
+head rather than another encoder. The built-in "hybrid" head is the served
+model's own BiLSTM + XGBoost; extra heads are loaded from HeadSpecs:
+
+    bilstm  BiLSTM + classifier taken from a DistilBERT_BiLSTM_Hybrid state
+            dict (e.g. models/mental_health_model.pth); its DistilBERT
+            weights are ignored. Optionally scored by its own XGBoost model.
+    linear  Linear classifier on the [CLS] or mean-pooled hidden state,
+            saved with LinearHead.save().
+
+A head only reproduces its standalone model if it was trained on the same
+(frozen) encoder; BiLSTMHead.from_checkpoint reports whether that holds.
+"""
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import torch
+import torch.nn as nn
+
+from artifacts import ArtifactError, is_lfs_pointer
+
+HEAD_KINDS = ("bilstm", "linear")
+POOLINGS = ("cls", "mean")
+
+
+class HeadSpec(NamedTuple):
+    name: str
+    kind: str
+    path: str
+    xgb_path: Optional[str] = None
+
+
+class ServingHead(NamedTuple):
+    # (sequence_output, attention_mask) -> (features, logits)
+    module: Callable[[torch.Tensor, torch.Tensor], Tuple[torch.Tensor, torch.Tensor]]
+    labels: List[str]
+    # predict_proba over the features (XGBoost), or None for a softmax over the logits
+    scorer: Optional[object]
+    info: Dict[str, object]
+
+
+def _load_state(path: str) -> Dict[str, object]:
+    if is_lfs_pointer(path):
+        raise ArtifactError(f"{path} is a Git LFS pointer, not a checkpoint; run `git lfs pull`")
+    return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+
+class BiLSTMHead(nn.Module):
+    """The BiLSTM + classifier half of DistilBERT_BiLSTM_Hybrid (same parameter names)."""
+
+    def __init__(self, input_dim: int = 768, hidden_dim: int = 256, num_labels: int = 3, lstm_layers: int = 1):
+        super().__init__()
+        self.lstm = nn.LSTM(input_dim, hidden_dim, num_layers=lstm_layers, bidirectional=True, batch_first=True)
+        self.classifier = nn.Sequential(nn.Dropout(0.0), nn.Linear(hidden_dim * 2, num_labels))
+
+    def forward(self, sequence_output: torch.Tensor, attention_mask: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        _, (h_n, _) = self.lstm(sequence_output)
+        final_state = torch.cat((h_n[-2, :, :], h_n[-1, :, :]), dim=1)
+        return final_state, self.classifier(final_state)
+
+    @classmethod
+    def from_checkpoint(cls, path: str, backbone: nn.Module) -> Tuple["BiLSTMHead", bool]:
+        """
+        Build the head from a full hybrid state dict. Also returns whether the
+        checkpoint's DistilBERT weights equal ``backbone``'s, i.e. whether the
+        head sees the features it was trained on.
+        """
+        state = _load_state(path)
+        head_state = {k: v for k, v in state.items() if k.startswith(("lstm.", "classifier."))}
+        if "lstm.weight_ih_l0" not in head_state:
+            raise ArtifactError(f"{path} has no BiLSTM head weights")
+        head = cls(
+            input_dim=head_state["lstm.weight_ih_l0"].shape[1],
+            hidden_dim=head_state["lstm.weight_hh_l0"].shape[1],
+            num_labels=head_state["classifier.1.weight"].shape[0],
+            lstm_layers=sum(1 for k in head_state if k.startswith("lstm.weight_ih_l") and not k.endswith("_reverse")),
+        )
+        head.load_state_dict(head_state, assign=True)
+
+        backbone_state = backbone.state_dict()
+        shares_backbone = all(
+            f"distilbert.{k}" in state and torch.equal(state[f"distilbert.{k}"], v) for k, v in backbone_state.items()
+        )
+        return head.eval(), shares_backbone
+
+
+class LinearHead(nn.Module):
+    """Linear classifier on the [CLS] ("cls") or masked mean ("mean") hidden state."""
+
+    def __init__(self, input_dim: int, labels: Sequence[str], pooling: str = "cls"):
+        super().__init__()
+        if pooling not in POOLINGS:
+            raise ValueError(f"Unknown pooling {pooling!r}; expected one of {POOLINGS}")
+        self.labels = list(labels)
+        self.pooling = pooling
+        self.linear = nn.Linear(input_dim, len(self.labels))
+
+    def forward(self, sequence_output: torch.Tensor, attention_mask: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        if self.pooling == "mean":
+            mask = attention_mask.unsqueeze(-1).to(sequence_output.dtype)
+            pooled = (sequence_output * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        else:
+            pooled = sequence_output[:, 0]
+        return pooled, self.linear(pooled)
+
+    def save(self, path: str):
+        torch.save({"labels": self.labels, "pooling": self.pooling, "state_dict": self.state_dict()}, path)
+
+    @classmethod
+    def from_checkpoint(cls, path: str) -> "LinearHead":
+        checkpoint = _load_state(path)
+        state = checkpoint["state_dict"]
+        head = cls(state["linear.weight"].shape[1], checkpoint["labels"], checkpoint.get("pooling", "cls"))
+        head.load_state_dict(state)
+        return head.eval()
+
+
+def parse_head_specs(value: str) -> List[HeadSpec]:
+    """
+    Parse "name=kind:path[:xgb_path],..." (e.g. "standard=bilstm:models/mental_health_model.pth").
+    Raises ValueError on malformed entries.
+    """
+    specs = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, sep, rest = item.partition("=")
+        kind, _, paths = rest.partition(":")
+        path, _, xgb_path = paths.partition(":")
+        if not sep or not name or kind not in HEAD_KINDS or not path:
+            raise ValueError(f"Invalid head spec {item!r}; expected name=kind:path[:xgb_path] with kind in {HEAD_KINDS}")
+        specs.append(HeadSpec(name.strip(), kind, path, xgb_path or None))
+    return specs
@@ -5,24 +5,90 @@ This module contains the model architecture and inference logic for the hybrid m
 
 import torch
 import torch.nn as nn
+from torch.profiler import record_function
 import numpy as np
-import xgboost as xgb
-from transformers import DistilBertModel, DistilBertTokenizer
+import copy
+import json
 import os
+import random
+import threading
+from contextlib import contextmanager
 from typing import Dict, List, Tuple, Optional
-import joblib
+
+from artifacts import ArtifactError, is_lfs_pointer
+from explanations import EXPLAIN_PERTURBATIONS
+from startup_profile import StartupProfiler
+from token_cache import MAX_CONTENT_TOKENS, shared_token_cache
+
+# Serving tiers from most to least expensive. "full" is the normal path;
+# the others trade accuracy for latency when the service is overloaded:
+#   quantized - dynamic int8 copy of the model, 256 tokens, XGBoost scorer
+#   short     - full-precision model on degraded_max_length tokens, XGBoost scorer
+#   head      - degraded_max_length tokens, classifier head only (no XGBoost)
+TIERS = ("full", "quantized", "short", "head")
+
+# Name of the served model's own BiLSTM + XGBoost head in predict_heads()
+DEFAULT_HEAD = "hybrid"
+
+# Serving precisions for the full-precision model ("bf16" runs under CPU autocast)
+PRECISIONS = ("fp32", "bf16")
+
+# Labelled sample texts for the startup parity check of bf16 / compiled inference
+DEFAULT_PARITY_SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "samples.jsonl")
+
+def load_xgb_scorer(path: str, backend: str = "xgboost"):
+    """Load an XGBoost model for predict_proba: the library's classifier or the NumPy CompiledForest."""
+    if is_lfs_pointer(path):
+        raise ArtifactError(f"{path} is a Git LFS pointer, not an XGBoost model; run `git lfs pull`")
+    if backend == "compiled":
+        from xgb_forest import CompiledForest
+        return CompiledForest.from_json(path)
+    import xgboost as xgb
+    scorer = xgb.XGBClassifier()
+    scorer.load_model(path)
+    return scorer
 
 class DistilBERT_BiLSTM_Hybrid(nn.Module):
     """
     Hybrid model combining DistilBERT, BiLSTM, and XGBoost for mental health classification.
+
+    Pass ``num_transformer_layers`` to keep only the first N of DistilBERT's six
+    transformer layers. That is the fast variant trained by distill_fast_model.py
+    against the full model's ``final_state`` features.
+
+    Pass ``pretrained=False`` when a full state dict will be loaded afterwards:
+    DistilBERT is then built from its config alone instead of first loading
+    pretrained weights that would be overwritten.
     """
     
-    def __init__(self, num_labels: int = 3, hidden_dim: int = 256, lstm_layers: int = 1, dropout_prob: float = 0.3):
+    def __init__(
+        self,
+        num_labels: int = 3,
+        hidden_dim: int = 256,
+        lstm_layers: int = 1,
+        dropout_prob: float = 0.3,
+        num_transformer_layers: Optional[int] = None,
+        pretrained: bool = True,
+    ):
         super(DistilBERT_BiLSTM_Hybrid, self).__init__()
-        self.distilbert = DistilBertModel.from_pretrained('distilbert-base-uncased')
+        from transformers import DistilBertConfig, DistilBertModel
+
+        if pretrained:
+            self.distilbert = DistilBertModel.from_pretrained('distilbert-base-uncased')
+        else:
+            self.distilbert = DistilBertModel(DistilBertConfig.from_pretrained('distilbert-base-uncased'))
         self.hidden_dim = hidden_dim
         self.num_labels = num_labels
 
+        if num_transformer_layers is not None:
+            layers = self.distilbert.transformer.layer
+            if not 1 <= num_transformer_layers <= len(layers):
+                raise ValueError(f"num_transformer_layers must be between 1 and {len(layers)}")
+            self.distilbert.transformer.layer = nn.ModuleList(list(layers)[:num_transformer_layers])
+            self.distilbert.transformer.n_layers = num_transformer_layers
+            self.distilbert.config.n_layers = num_transformer_layers
+        self.num_transformer_layers = self.distilbert.config.n_layers
+
         self.lstm = nn.LSTM(
             input_size=self.distilbert.config.dim,
             hidden_size=hidden_dim,
@@ -42,55 +108,217 @@ class DistilBERT_BiLSTM_Hybrid(nn.Module):
         Forward pass through DistilBERT and BiLSTM layers.
         Returns both features (for XGBoost) and logits (for direct classification).
         """
-        distilbert_output = self.distilbert(input_ids=input_ids, attention_mask=attention_mask)
-        sequence_output = distilbert_output.last_hidden_state
+        # hybrid.* ranges label each stage in profiler traces (see profiling.py)
+        with record_function("hybrid.distilbert"):
+            distilbert_output = self.distilbert(input_ids=input_ids, attention_mask=attention_mask)
+            sequence_output = distilbert_output.last_hidden_state
+        return self.head_forward(sequence_output, attention_mask)
+
+    def head_forward(self, sequence_output, attention_mask):
+        """BiLSTM and classifier on DistilBERT's last hidden state; returns (final_state, logits)."""
+        with record_function("hybrid.bilstm"):
+            lstm_output, (h_n, c_n) = self.lstm(sequence_output)
+            final_state = torch.cat((h_n[-2, :, :], h_n[-1, :, :]), dim=1)
+
+        with record_function("hybrid.classifier"):
+            return final_state, self.classifier(final_state)
+
+class InputBufferPool:
+    """
+    Reusable input_ids / attention_mask tensors for the inference path.
+    Buffers are keyed by (batch bucket, max_length); batch sizes round up to a
+    power of two and smaller batches use a leading view of the bucket, so the
+    steady state makes no new input allocations.
+    """
+
+    def __init__(self, device: torch.device, max_free_per_shape: int = 4):
+        self.device = device
+        self.max_free_per_shape = max_free_per_shape
+        self._free: Dict[Tuple[int, int], List[Tuple[torch.Tensor, torch.Tensor]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "allocated": 0}
 
-        lstm_output, (h_n, c_n) = self.lstm(sequence_output)
-        final_state = torch.cat((h_n[-2, :, :], h_n[-1, :, :]), dim=1)
+    @staticmethod
+    def _bucket(batch_size: int) -> int:
+        return 1 << (batch_size - 1).bit_length()
+
+    def acquire(self, batch_size: int, max_length: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        shape = (self._bucket(batch_size), max_length)
+        with self._lock:
+            self.stats["acquired"] += 1
+            free = self._free.get(shape)
+            if free:
+                return free.pop()
+            self.stats["allocated"] += 1
+        # Buffers outlive the call that allocates them, so never make them inference
+        # tensors (compiled graphs guard on the difference and would recompile)
+        with torch.inference_mode(False):
+            return (
+                torch.zeros(shape, dtype=torch.long, device=self.device),
+                torch.zeros(shape, dtype=torch.long, device=self.device),
+            )
+
+    def release(self, buffers: Tuple[torch.Tensor, torch.Tensor]):
+        shape = tuple(buffers[0].shape)
+        with self._lock:
+            free = self._free.setdefault(shape, [])
+            if len(free) < self.max_free_per_shape:
+                free.append(buffers)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
 
-        return final_state, self.classifier(final_state)
 
 class HybridModelInference:
     """
     Inference class for the hybrid DistilBERT-BiLSTM-XGBoost model.
+
+    Safe for concurrent use by many threads (Flask threaded mode, gunicorn
+    gthread). After construction the model, XGBoost scorer and config are only
+    read: the forward pass runs under inference_mode in eval mode and XGBoost
+    prediction is thread-safe. Everything a call writes is private to it:
+    input tensors come from InputBufferPool (one buffer set per in-flight
+    call), fast tokenizers are copied per thread (see _thread_tokenizer),
+    and counters and the lazily built quantized model are guarded by locks.
+    stress_threads.py checks concurrent results against serial ones.
+
+    ``precision="bf16"`` and ``compile=True`` accelerate the serving forward
+    pass. Compiled graphs are built at startup for every batch bucket in
+    ``compile_batch_buckets`` at each serving length; other shapes run eager.
+    Either mode is only enabled if its XGBoost labels on the bundled parity
+    samples agree with fp32 eager inference on at least
+    ``parity_min_agreement`` of them, otherwise the model falls back to fp32
+    eager (see ``acceleration`` in get_model_info).
+
+    ``xgb_path=None`` builds a features-only model (no XGBoost scorer is
+    imported or loaded; predictions use the PyTorch classifier head), as the
+    refit_xgboost.py extraction workers do.
     """
     
-    def __init__(self, model_path: str, xgb_path: str, tokenizer_path: Optional[str] = None):
+    def __init__(
+        self,
+        model_path: str,
+        xgb_path: Optional[str],
+        tokenizer_path: Optional[str] = None,
+        early_exit_margin: Optional[float] = None,
+        early_exit_max_length: int = 64,
+        early_exit_audit_rate: float = 0.0,
+        num_transformer_layers: Optional[int] = None,
+        xgb_backend: str = "xgboost",
+        profiler: Optional[StartupProfiler] = None,
+        strict: bool = False,
+        degradation_tiers: Optional[List[str]] = None,
+        degraded_max_length: int = 64,
+        precision: str = "fp32",
+        compile: bool = False,
+        compile_batch_buckets: Tuple[int, ...] = (1, 4, 16),
+        parity_samples_path: Optional[str] = None,
+        parity_min_agreement: float = 0.95,
+        near_duplicate_key: Optional[str] = None,
+        near_duplicate_threshold: float = 0.95,
+        near_duplicate_capacity: int = 10000,
+        near_duplicate_backend: str = "auto",
+        near_duplicate_audit_rate: float = 0.0,
+        extra_heads: Optional[List["HeadSpec"]] = None,
+        token_cache_mb: float = 32.0,
+    ):
         self.device = torch.device("cpu")
         self.model_path = model_path
         self.xgb_path = xgb_path
+        # "xgboost" loads xgb.XGBClassifier; "compiled" scores with xgb_forest.CompiledForest
+        # and never imports xgboost
+        self.xgb_backend = xgb_backend
+        # Strict mode refuses to serve random weights or to fall back from a broken XGBoost model
+        self.strict = strict
+
+        # Adaptive inference: a truncated pass answers on its own when the
+        # classifier-head margin is at least early_exit_margin (None disables it).
+        # A sampled fraction of early exits is re-run on the full path to
+        # measure agreement.
+        self.early_exit_margin = early_exit_margin
+        self.early_exit_max_length = early_exit_max_length
+        self.early_exit_audit_rate = early_exit_audit_rate
+        self.adaptive_stats = {"requests": 0, "early_exits": 0, "escalations": 0, "audited": 0, "agreements": 0}
+        self.batch_stats = {"texts": 0, "deduplicated": 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self.input_pool = InputBufferPool(self.device)
+        self.profiler = profiler or StartupProfiler()
+
+        # Degraded tiers the service may request; warmup() prepares them
+        self.degradation_tiers = list(degradation_tiers or [])
+        for tier in self.degradation_tiers:
+            if tier not in TIERS:
+                raise ValueError(f"Unknown degradation tier {tier!r}; expected one of {TIERS}")
+        self.degraded_max_length = degraded_max_length
+        self._quantized_model = None
+        self._quantize_lock = threading.Lock()
+
+        # Accelerated serving; precision and _compiled hold what is active after the parity check
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+        self.precision = "fp32"
+        self.compile_batch_buckets = tuple(sorted(set(compile_batch_buckets)))
+        self.parity_samples_path = parity_samples_path or DEFAULT_PARITY_SAMPLES
+        self.parity_min_agreement = parity_min_agreement
+        self._compiled = None
+        self._compiled_shapes = set()
+        self.acceleration = {
+            "requested": {"precision": precision, "compile": compile},
+            "active": {"precision": "fp32", "compile": False},
+            "parity": None,
+            "fallback_reason": None,
+        }
         
+        # Near-duplicate short-circuit for predict(): "sketch" keys on hashed token
+        # n-grams, "truncated" on features of an early_exit_max_length pass (None disables it)
+        self.near_duplicate_key = near_duplicate_key
+        self.near_duplicates = None
+
         print(f"[HybridModel] Initializing with device: {self.device}")
         
         # Load tokenizer
         try:
-            if tokenizer_path and os.path.exists(tokenizer_path):
-                self.tokenizer = DistilBertTokenizer.from_pretrained(tokenizer_path)
-            else:
-                self.tokenizer = DistilBertTokenizer.from_pretrained('distilbert-base-uncased')
+            with self.profiler.phase("tokenizer_load"):
+                from transformers import DistilBertTokenizer
+                if tokenizer_path and os.path.exists(tokenizer_path):
+                    self.tokenizer = DistilBertTokenizer.from_pretrained(tokenizer_path)
+                else:
+                    self.tokenizer = DistilBertTokenizer.from_pretrained('distilbert-base-uncased')
             print("[HybridModel] ✅ Tokenizer loaded successfully")
+            # Token ids of recent texts, shared with any other model on the same vocabulary
+            self.token_cache = None
+            if token_cache_mb > 0:
+                self.token_cache = shared_token_cache(self.tokenizer, int(token_cache_mb * 1024 * 1024))
         except Exception as e:
             print(f"[HybridModel] ❌ Error loading tokenizer: {e}")
             raise
         
         # Initialize model
         try:
-            self.model = DistilBERT_BiLSTM_Hybrid(
-                num_labels=3,  # Based on your notebook: Anxiety, Bipolar, Depression
-                hidden_dim=256,
-                lstm_layers=1,
-                dropout_prob=0.3
-            )
-            print("[HybridModel] ✅ Model initialized successfully")
+            with self.profiler.phase("model_construction"):
+                self.model = DistilBERT_BiLSTM_Hybrid(
+                    num_labels=3,  # Based on your notebook: Anxiety, Bipolar, Depression
+                    hidden_dim=256,
+                    lstm_layers=1,
+                    dropout_prob=0.3,
+                    num_transformer_layers=num_transformer_layers,
+                    # Pretrained DistilBERT weights would be overwritten by the checkpoint anyway
+                    pretrained=not os.path.exists(self.model_path)
+                )
+            print(f"[HybridModel] ✅ Model initialized successfully ({self.model.num_transformer_layers} transformer layers)")
         except Exception as e:
             print(f"[HybridModel] ❌ Error initializing model: {e}")
             raise
         
         # Load PyTorch model weights
-        self._load_pytorch_model()
+        with self.profiler.phase("state_dict_load"):
+            self._load_pytorch_model()
         
         # Load XGBoost model
-        self._load_xgboost_model()
+        with self.profiler.phase("xgboost_load"):
+            self._load_xgboost_model()
         
         # Set model to evaluation mode
         self.model.eval()
@@ -98,146 +326,675 @@ class HybridModelInference:
         # Label mapping (based on your notebook)
         self.label_map = {0: 'Anxiety', 1: 'Bipolar', 2: 'Depression'}
         self.labels = ['Anxiety', 'Bipolar', 'Depression']
+
+        if near_duplicate_key is not None:
+            from near_duplicate import KEYS, SKETCH_DIM, NearDuplicateIndex
+            if near_duplicate_key not in KEYS:
+                raise ValueError(f"Unknown near-duplicate key {near_duplicate_key!r}; expected one of {KEYS}")
+            self.near_duplicates = NearDuplicateIndex(
+                dim=SKETCH_DIM if near_duplicate_key == "sketch" else 2 * self.model.hidden_dim,
+                num_labels=len(self.labels),
+                threshold=near_duplicate_threshold,
+                capacity=near_duplicate_capacity,
+                backend=near_duplicate_backend,
+                audit_rate=near_duplicate_audit_rate,
+            )
+
+        # Heads selectable per request in predict_heads(), all fed by one DistilBERT pass
+        self.heads: Dict[str, "ServingHead"] = {}
+        with self.profiler.phase("heads_load"):
+            self._load_heads(extra_heads or [])
+
+        if precision != "fp32" or compile:
+            with self.profiler.phase("acceleration"):
+                self._setup_acceleration(precision, compile)
     
     def _load_pytorch_model(self):
         """Load the PyTorch model weights."""
         try:
             if os.path.exists(self.model_path):
+                if is_lfs_pointer(self.model_path):
+                    raise ArtifactError(f"{self.model_path} is a Git LFS pointer, not model weights; run `git lfs pull`")
                 print(f"[debug] Loading state dict from {self.model_path}...")
-                state_dict = torch.load(self.model_path, map_location=self.device)
+                # mmap + assign: tensors are paged in from the file instead of
+                # being read into memory and then copied into the module
+                state_dict = torch.load(self.model_path, map_location=self.device, mmap=True, weights_only=True)
                 print(f"[debug] State dict loaded. Keys: {len(state_dict)}")
                 
                 print("[debug] Loading into model...")
-                self.model.load_state_dict(state_dict)
+                self.model.load_state_dict(state_dict, assign=True)
                 print(f"✅ Loaded PyTorch model from {self.model_path}")
+            elif self.strict:
+                raise ArtifactError(f"PyTorch model not found at {self.model_path}")
             else:
-                print(f"⚠️ PyTorch model not found at {self.model_path}")
+                print(f"⚠️ PyTorch model not found at {self.model_path}; serving untrained weights")
         except Exception as e:
             print(f"❌ Error loading PyTorch model: {e}")
             raise
     
+    def _load_heads(self, specs: List["HeadSpec"]):
+        """Register the built-in hybrid head and load the extra ones."""
+        from heads import BiLSTMHead, LinearHead, ServingHead
+
+        self.heads[DEFAULT_HEAD] = ServingHead(
+            self.model.head_forward, self.labels, self.xgb_model, {"kind": "bilstm", "xgboost": self.xgb_model is not None}
+        )
+        for spec in specs:
+            if spec.name in self.heads:
+                raise ValueError(f"Duplicate head name {spec.name!r}")
+            info = {"kind": spec.kind, "path": spec.path}
+            if spec.kind == "linear":
+                module = LinearHead.from_checkpoint(spec.path)
+                labels = module.labels
+            else:
+                module, info["shares_backbone"] = BiLSTMHead.from_checkpoint(spec.path, self.model.distilbert)
+                if not info["shares_backbone"]:
+                    print(f"[HybridModel] ⚠️ Head {spec.name!r} was trained with a different DistilBERT; "
+                          "its scores on the shared backbone will differ from its standalone model")
+                num_labels = module.classifier[-1].out_features
+                labels = self.labels if num_labels == len(self.labels) else [f"label_{i}" for i in range(num_labels)]
+            scorer = load_xgb_scorer(spec.xgb_path, self.xgb_backend) if spec.xgb_path else None
+            info["xgboost"] = scorer is not None
+            self.heads[spec.name] = ServingHead(module, labels, scorer, info)
+            print(f"[HybridModel] ✅ Loaded {spec.kind} head {spec.name!r} from {spec.path}")
+
     def _load_xgboost_model(self):
         """Load the XGBoost model."""
+        if self.xgb_path is None:
+            print("[HybridModel] Features only: no XGBoost scorer loaded")
+            self.xgb_model = None
+            return
         try:
             if os.path.exists(self.xgb_path):
-                self.xgb_model = xgb.XGBClassifier()
-                self.xgb_model.load_model(self.xgb_path)
-                print(f"✅ Loaded XGBoost model from {self.xgb_path}")
+                self.xgb_model = load_xgb_scorer(self.xgb_path, self.xgb_backend)
+                print(f"✅ Loaded XGBoost model from {self.xgb_path} ({self.xgb_backend} backend)")
+            elif self.strict:
+                raise ArtifactError(f"XGBoost model not found at {self.xgb_path}")
             else:
                 print(f"⚠️ XGBoost model not found at {self.xgb_path}")
                 self.xgb_model = None
         except Exception as e:
             print(f"❌ Error loading XGBoost model: {e}")
+            if self.strict:
+                raise
+            print("⚠️ Falling back to the PyTorch classifier head")
             self.xgb_model = None
     
     def preprocess_text(self, text: str, max_length: int = 256) -> Dict[str, torch.Tensor]:
         """Preprocess text for model input."""
-        encoding = self.tokenizer.encode_plus(
-            text,
-            add_special_tokens=True,
-            max_length=max_length,
-            return_token_type_ids=False,
-            padding='max_length',
-            truncation=True,
-            return_attention_mask=True,
-            return_tensors='pt'
-        )
-        
+        return self.preprocess_batch([text], max_length)
+
+    def preprocess_batch(self, texts: List[str], max_length: int = 256) -> Dict[str, torch.Tensor]:
+        """Preprocess a list of texts into one padded batch."""
+        rows = self._token_rows(texts, max_length)
+        input_ids = torch.full((len(rows), max_length), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), max_length), dtype=torch.long)
+        for row, ids in enumerate(rows):
+            input_ids[row, :len(ids)] = torch.as_tensor(ids, dtype=torch.long)
+            attention_mask[row, :len(ids)] = 1
+
         return {
-            'input_ids': encoding['input_ids'].to(self.device),
-            'attention_mask': encoding['attention_mask'].to(self.device)
+            'input_ids': input_ids.to(self.device),
+            'attention_mask': attention_mask.to(self.device)
         }
+
+    def _content_ids(self, texts: List[str]) -> List[np.ndarray]:
+        """Token ids of texts without special tokens, at most MAX_CONTENT_TOKENS each, via the token cache."""
+        tokenizer = self._thread_tokenizer()
+
+        def tokenize(missing: List[str]) -> List[List[int]]:
+            return tokenizer(
+                missing,
+                add_special_tokens=False,
+                max_length=MAX_CONTENT_TOKENS,
+                truncation=True,
+                return_token_type_ids=False,
+                return_attention_mask=False,
+            )["input_ids"]
+
+        if self.token_cache is None:
+            return [np.asarray(ids) for ids in tokenize(texts)]
+        return self.token_cache.content_ids(texts, tokenize)
+
+    def _token_rows(self, texts: List[str], max_length: int = 256):
+        """Token ids with [CLS] and [SEP] for texts, truncated to max_length like the tokenizer does."""
+        tokenizer = self._thread_tokenizer()
+        if self.token_cache is None or max_length > MAX_CONTENT_TOKENS + 2:
+            return tokenizer(
+                texts,
+                add_special_tokens=True,
+                max_length=max_length,
+                truncation=True,
+                return_token_type_ids=False,
+                return_attention_mask=False,
+            )["input_ids"]
+        cls, sep = [tokenizer.cls_token_id], [tokenizer.sep_token_id]
+        return [np.concatenate((cls, ids[:max_length - 2], sep)) for ids in self._content_ids(texts)]
     
-    def predict(self, text: str) -> Dict[str, any]:
+    def _thread_tokenizer(self):
+        """
+        Tokenizer for the calling thread. Fast (Rust) tokenizers reset their
+        truncation and padding state on every call and raise "Already borrowed"
+        when shared between threads, so each thread gets its own copy; the
+        pure-Python tokenizer is shared.
+        """
+        if not getattr(self.tokenizer, "is_fast", False):
+            return self.tokenizer
+        tokenizer = getattr(self._local, "tokenizer", None)
+        if tokenizer is None:
+            tokenizer = self._local.tokenizer = copy.deepcopy(self.tokenizer)
+        return tokenizer
+
+    @contextmanager
+    def _encoded(self, texts: List[str], max_length: int = 256):
+        """
+        Tokenize texts straight into pooled input buffers and yield the model inputs.
+        Equivalent to preprocess_batch (right padding to max_length) without
+        allocating new tensors; the buffers return to the pool on exit.
+        """
+        with record_function("hybrid.tokenize"):
+            token_ids = self._token_rows(texts, max_length)
+        with self._filled(token_ids, max_length) as inputs:
+            yield inputs
+
+    @contextmanager
+    def _filled(self, token_ids: List[List[int]], max_length: int = 256):
+        """Right-pad token id rows (special tokens included) into pooled input buffers and yield the model inputs."""
+        buffers = self.input_pool.acquire(len(token_ids), max_length)
+        try:
+            input_ids, attention_mask = buffers[0][:len(token_ids)], buffers[1][:len(token_ids)]
+            # numpy views share memory with the tensors, so these writes fill them in place
+            ids_np, mask_np = input_ids.numpy(), attention_mask.numpy()
+            ids_np.fill(self.tokenizer.pad_token_id)
+            mask_np.fill(0)
+            for row, ids in enumerate(token_ids):
+                ids_np[row, :len(ids)] = ids
+                mask_np[row, :len(ids)] = 1
+            yield {'input_ids': input_ids, 'attention_mask': attention_mask}
+        finally:
+            self.input_pool.release(buffers)
+
+    def _run_model(self, inputs: Dict[str, torch.Tensor], model: Optional[nn.Module] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Run the DistilBERT-BiLSTM forward pass and return float32 (features, logits).
+        Without an explicit ``model`` this is the serving path: the active
+        precision, on a compiled graph when one fits the input shape.
+        """
+        with torch.inference_mode():
+            if model is not None:
+                return model(**inputs)
+            with torch.autocast("cpu", dtype=torch.bfloat16, enabled=self.precision == "bf16"):
+                features, logits = self._accelerated_forward(**inputs)
+            return features.float(), logits.float()
+
+    def _accelerated_forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Forward pass on the compiled graph for the smallest batch bucket that
+        fits, padding the batch with dummy rows; eager if that shape was not
+        compiled at startup (compiling mid-request would stall it for minutes).
+        """
+        batch_size, length = input_ids.shape
+        bucket = next((b for b in self.compile_batch_buckets if b >= batch_size), None)
+        if self._compiled is None or (bucket, length) not in self._compiled_shapes:
+            return self.model(input_ids=input_ids, attention_mask=attention_mask)
+        if bucket == batch_size:
+            return self._compiled(input_ids=input_ids, attention_mask=attention_mask)
+
+        buffers = self.input_pool.acquire(bucket, length)
+        try:
+            ids, mask = buffers[0][:bucket], buffers[1][:bucket]
+            ids[:batch_size] = input_ids
+            ids[batch_size:] = self.tokenizer.pad_token_id
+            mask[:batch_size] = attention_mask
+            # Padding rows attend to one token so they stay finite; their outputs are dropped
+            mask[batch_size:] = 0
+            mask[batch_size:, 0] = 1
+            features, logits = self._compiled(input_ids=ids, attention_mask=mask)
+            return features[:batch_size], logits[:batch_size]
+        finally:
+            self.input_pool.release(buffers)
+
+    def _serving_lengths(self) -> List[int]:
+        """Token lengths the full-precision model is run at."""
+        lengths = {256}
+        if self.early_exit_margin is not None or self.near_duplicate_key == "truncated":
+            lengths.add(self.early_exit_max_length)
+        if {"short", "head"} & set(self.degradation_tiers):
+            lengths.add(self.degraded_max_length)
+        return sorted(lengths)
+
+    def _setup_acceleration(self, precision: str, compile: bool):
+        """
+        Enable the requested precision / compiled graphs, then keep them only
+        if they pass the parity check against fp32 eager inference.
+        """
+        print(f"[HybridModel] Enabling {precision} inference{' with torch.compile' if compile else ''}...")
+        buckets = self.compile_batch_buckets if compile else self.compile_batch_buckets[-1:]
+        shapes = [(bucket, length) for length in self._serving_lengths() for bucket in buckets]
+        try:
+            if precision == "bf16":
+                bf16_supported = getattr(torch.ops.mkldnn, "_is_mkldnn_bf16_supported", None)
+                if bf16_supported is not None and not bf16_supported():
+                    raise RuntimeError("this CPU has no native bf16 support")
+            with open(self.parity_samples_path) as f:
+                texts = [json.loads(line)["text"] for line in f if line.strip()]
+            if not texts:
+                raise RuntimeError(f"no parity samples in {self.parity_samples_path}")
+
+            self.precision = precision
+            if compile:
+                from torch._dynamo import config as dynamo_config
+                # One graph per shape; the default limit would recompile the oldest away
+                dynamo_config.cache_size_limit = max(dynamo_config.cache_size_limit, len(shapes))
+                self._compiled = torch.compile(self.model, dynamic=False)
+                for bucket, length in shapes:
+                    ids, mask = self.input_pool.acquire(bucket, length)
+                    with torch.inference_mode(), torch.autocast("cpu", dtype=torch.bfloat16, enabled=precision == "bf16"):
+                        self._compiled(input_ids=ids[:bucket], attention_mask=mask[:bucket].fill_(1))
+                    self.input_pool.release((ids, mask))
+                    self._compiled_shapes.add((bucket, length))
+
+            parity = self._check_parity(texts, shapes)
+            self.acceleration["parity"] = parity
+            if parity["agreement"] < self.parity_min_agreement:
+                raise RuntimeError(
+                    f"label agreement {parity['agreement']:.3f} with fp32 is below {self.parity_min_agreement}"
+                )
+        except Exception as e:
+            print(f"[HybridModel] ⚠️ Accelerated inference disabled, serving fp32 eager: {e}")
+            self.precision = "fp32"
+            self._compiled = None
+            self._compiled_shapes = set()
+            self.acceleration["fallback_reason"] = f"{type(e).__name__}: {e}"
+            return
+
+        self.acceleration["active"] = {"precision": precision, "compile": compile}
+        print(f"[HybridModel] ✅ {precision}{' compiled' if compile else ''} inference enabled "
+              f"(parity agreement {parity['agreement']:.3f})")
+
+    def _check_parity(self, texts: List[str], shapes: List[Tuple[int, int]]) -> Dict[str, any]:
+        """
+        Compare labels on the serving path against fp32 eager inference for
+        every (batch bucket, length) shape. Batches are one short of the bucket
+        (where possible) so the padded-row path is the one checked.
+        """
+        def sample_proba(length: int, batch_size: int, model: Optional[nn.Module]) -> np.ndarray:
+            chunks = []
+            for start in range(0, len(texts), batch_size):
+                with self._encoded(texts[start:start + batch_size], max_length=length) as inputs:
+                    features, logits = self._run_model(inputs, model)
+                chunks.append(self._score(features, logits))
+            return np.concatenate(chunks)
+
+        agreement, max_diff = 1.0, 0.0
+        for length in sorted({length for _, length in shapes}):
+            reference = sample_proba(length, self.compile_batch_buckets[-1], self.model)
+            for bucket in sorted(bucket for bucket, l in shapes if l == length):
+                proba = sample_proba(length, max(bucket - 1, 1), None)
+                agreement = min(agreement, float(np.mean(np.argmax(proba, axis=1) == np.argmax(reference, axis=1))))
+                max_diff = max(max_diff, float(np.max(np.abs(proba - reference))))
+        return {"samples": len(texts), "shapes": len(shapes), "agreement": agreement, "max_proba_diff": max_diff}
+
+    def quantized_model(self) -> nn.Module:
+        """Dynamic int8 copy of the model (Linear and LSTM weights), built on first use."""
+        with self._quantize_lock:
+            if self._quantized_model is None:
+                from torch.ao.quantization import quantize_dynamic
+                print("[HybridModel] Building int8 model for the quantized tier...")
+                self._quantized_model = quantize_dynamic(self.model, {nn.Linear, nn.LSTM}, dtype=torch.qint8)
+        return self._quantized_model
+
+    def _tier_forward(self, texts: List[str], tier: str) -> Tuple[torch.Tensor, np.ndarray]:
+        """Run one batch on a serving tier and return (features, per-label probabilities)."""
+        if tier not in TIERS:
+            raise ValueError(f"Unknown tier {tier!r}; expected one of {TIERS}")
+        max_length = 256 if tier in ("full", "quantized") else self.degraded_max_length
+        model = self.quantized_model() if tier == "quantized" else None
+        with self._encoded(texts, max_length=max_length) as inputs:
+            features, logits = self._run_model(inputs, model)
+        if tier == "head":
+            return features, torch.softmax(logits, dim=-1).numpy()
+        return features, self._score(features, logits)
+
+    def _format_prediction(self, proba: np.ndarray, tier: str = "full", labels: Optional[List[str]] = None) -> Dict[str, any]:
+        """Build the API response from a vector of per-label probabilities (in ``labels`` order, default self.labels)."""
+        labels = labels or self.labels
+        predicted_label = labels[int(np.argmax(proba))]
+
+        # Create confidence scores
+        confidence_scores = []
+        for i, label in enumerate(labels):
+            confidence_scores.append({
+                "label": label,
+                "score": float(proba[i])
+            })
+
+        # Sort by confidence
+        confidence_scores.sort(key=lambda x: x["score"], reverse=True)
+
+        return {
+            "topPattern": predicted_label,
+            "confidenceScores": confidence_scores,
+            "tier": tier
+        }
+
+    @staticmethod
+    def _classifier_margin(probs: np.ndarray) -> float:
+        """Gap between the two most likely labels of a probability vector."""
+        top_two = np.sort(probs)[-2:]
+        return float(top_two[1] - top_two[0])
+
+    def _predict_full(self, text: str) -> Dict[str, any]:
+        """Full hybrid path: 256-token DistilBERT-BiLSTM features scored by XGBoost."""
+        # Get features from DistilBERT-BiLSTM
+        print("[HybridModel] Running model forward pass...")
+        _, proba = self._tier_forward([text], "full")
+        print("[HybridModel] Model forward pass completed")
+
+        return self._format_prediction(proba[0])
+
+    def _score(self, features: torch.Tensor, logits: torch.Tensor) -> np.ndarray:
+        """Per-label probabilities for a batch: XGBoost on the features, or the classifier head."""
+        # Use XGBoost for final prediction if available
+        if self.xgb_model is not None:
+            # CPU tensor -> numpy view, no copy before XGBoost
+            with record_function("hybrid.xgboost"):
+                return self.xgb_model.predict_proba(features.numpy())
+
+        # Fallback to PyTorch model only
+        return torch.softmax(logits, dim=-1).numpy()
+
+    def predict_scores(
+        self, texts: List[str], batch_size: int = 16, include_features: bool = False, tier: str = "full"
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Score a list of texts on a serving tier (the full hybrid path by default).
+        Returns (probabilities, features): a float32 (n, num_labels) array in
+        ``self.labels`` order and, if requested, the float32 (n, 512) final_state
+        features the scorer ran on. Duplicate texts are computed once.
+        """
+        unique_texts = list(dict.fromkeys(texts))
+        print(f"[HybridModel] Batch of {len(texts)} texts ({len(unique_texts)} unique)")
+
+        row_of = {text: i for i, text in enumerate(unique_texts)}
+        proba = np.empty((len(unique_texts), len(self.labels)), dtype=np.float32)
+        feats = None
+        for start in range(0, len(unique_texts), batch_size):
+            chunk = unique_texts[start:start + batch_size]
+            features, proba[start:start + len(chunk)] = self._tier_forward(chunk, tier)
+            if include_features:
+                if feats is None:
+                    feats = np.empty((len(unique_texts), features.shape[1]), dtype=np.float32)
+                feats[start:start + len(chunk)] = features.numpy()
+
+        with self._stats_lock:
+            self.batch_stats["texts"] += len(texts)
+            self.batch_stats["deduplicated"] += len(texts) - len(unique_texts)
+
+        if len(unique_texts) < len(texts):
+            rows = np.fromiter((row_of[text] for text in texts), dtype=np.int64, count=len(texts))
+            proba = proba[rows]
+            feats = feats[rows] if feats is not None else None
+        return proba, feats
+
+    def predict_heads(self, texts: List[str], heads: List[str], batch_size: int = 16) -> Dict[str, List[Dict[str, any]]]:
+        """
+        Predict texts with several heads at once: DistilBERT runs once per
+        batch and its hidden state feeds every requested head. Returns
+        {head name: one result per text}. Always the full 256-token path.
+        """
+        unknown = [name for name in heads if name not in self.heads]
+        if unknown:
+            raise ValueError(f"Unknown heads {unknown}; available: {list(self.heads)}")
+        heads = list(dict.fromkeys(heads))
+
+        results: Dict[str, List[Dict[str, any]]] = {name: [] for name in heads}
+        for start in range(0, len(texts), batch_size):
+            with self._encoded(texts[start:start + batch_size]) as inputs:
+                with torch.inference_mode(), torch.autocast("cpu", dtype=torch.bfloat16, enabled=self.precision == "bf16"):
+                    with record_function("hybrid.distilbert"):
+                        sequence_output = self.model.distilbert(**inputs).last_hidden_state
+                    outputs = {name: self.heads[name].module(sequence_output, inputs["attention_mask"]) for name in heads}
+            for name, (features, logits) in outputs.items():
+                head = self.heads[name]
+                if head.scorer is not None:
+                    with record_function("hybrid.xgboost"):
+                        proba = head.scorer.predict_proba(features.float().numpy())
+                else:
+                    proba = torch.softmax(logits.float(), dim=-1).numpy()
+                results[name].extend(self._format_prediction(row, "full", head.labels) for row in proba)
+        return results
+
+    def predict_batch(self, texts: List[str], batch_size: int = 16, tier: str = "full") -> List[Dict[str, any]]:
+        """
+        Predict a list of texts on a serving tier (the full hybrid path by default).
+        Duplicate texts are computed once and the result is fanned out to every occurrence.
+        """
+        proba, _ = self.predict_scores(texts, batch_size, tier=tier)
+        return [self._format_prediction(row, tier) for row in proba]
+
+    def explain(
+        self,
+        text: str,
+        label: Optional[str] = None,
+        perturbation: str = "occlusion",
+        max_perturbations: int = 64,
+        batch_size: int = 32,
+    ) -> Dict[str, any]:
+        """
+        Word attributions for the full hybrid path. Each word is occluded (or
+        left out) in its own copy of the text; when there are more words than
+        max_perturbations, runs of adjacent words are perturbed together. The
+        original and every copy go through ceil((copies + 1) / batch_size)
+        forward passes and one XGBoost call. A word's attribution is how much
+        perturbing it lowers each label's probability.
+
+        Each entry of "tokens" is one perturbation unit; "wordsPerUnit" is how
+        many adjacent words a unit holds (1 unless the text has more words
+        than max_perturbations; the last unit may hold fewer).
+        """
+        if perturbation not in EXPLAIN_PERTURBATIONS:
+            raise ValueError(f"Unknown perturbation {perturbation!r}; expected one of {EXPLAIN_PERTURBATIONS}")
+        if label is not None and label not in self.labels:
+            raise ValueError(f"Unknown label {label!r}; expected one of {self.labels}")
+
+        tokenizer = self._thread_tokenizer()
+        # One token over the 254 that fit beside [CLS] and [SEP] tells whether the text was cut
+        ids = tokenizer(text, add_special_tokens=False, max_length=255, truncation=True)["input_ids"]
+        truncated, ids = len(ids) > 254, ids[:254]
+        pieces = tokenizer.convert_ids_to_tokens(ids)
+        starts = [i for i, piece in enumerate(pieces) if not piece.startswith("##")] or [0]
+        words = list(zip(starts, starts[1:] + [len(ids)]))
+
+        group = -(-len(words) // max(1, max_perturbations))
+        units = [(words[i][0], words[min(i + group, len(words)) - 1][1]) for i in range(0, len(words), group)]
+
+        cls, sep = [tokenizer.cls_token_id], [tokenizer.sep_token_id]
+        rows = [cls + ids + sep]
+        for start, end in units:
+            if perturbation == "occlusion":
+                rows.append(cls + ids[:start] + [tokenizer.mask_token_id] * (end - start) + ids[end:] + sep)
+            else:
+                rows.append(cls + ids[:start] + ids[end:] + sep)
+
+        features, logits = [], []
+        for start in range(0, len(rows), batch_size):
+            with self._filled(rows[start:start + batch_size]) as inputs:
+                batch_features, batch_logits = self._run_model(inputs)
+            features.append(batch_features)
+            logits.append(batch_logits)
+        proba = self._score(torch.cat(features), torch.cat(logits))
+
+        result = self._format_prediction(proba[0])
+        target = self.labels.index(label or result["topPattern"])
+        deltas = proba[0] - proba[1:]
+        result.update({
+            "explainedLabel": self.labels[target],
+            "method": perturbation,
+            "tokens": [
+                {
+                    "text": tokenizer.convert_tokens_to_string(pieces[start:end]),
+                    "attribution": float(delta[target]),
+                    "attributions": {name: float(value) for name, value in zip(self.labels, delta)},
+                }
+                for (start, end), delta in zip(units, deltas)
+            ],
+            "wordsPerUnit": group,
+            "truncated": truncated,
+            "perturbations": len(units),
+            "forwardPasses": -(-len(rows) // batch_size),
+        })
+        return result
+
+    def _predict_adaptive(self, text: str) -> Dict[str, any]:
+        """
+        Early-exit path: run a truncated pass and return the classifier-head result
+        when its margin clears ``early_exit_margin``; otherwise escalate to the full path.
+        """
+        with self._encoded([text], max_length=self.early_exit_max_length) as inputs:
+            _, logits = self._run_model(inputs)
+        probs = torch.softmax(logits, dim=-1).numpy()[0]
+        margin = self._classifier_margin(probs)
+
+        if margin < self.early_exit_margin:
+            print(f"[HybridModel] Escalating to full path (margin {margin:.3f})")
+            with self._stats_lock:
+                self.adaptive_stats["requests"] += 1
+                self.adaptive_stats["escalations"] += 1
+            return self._predict_full(text)
+
+        result = self._format_prediction(probs, "early_exit")
+        print(f"[HybridModel] Early exit (margin {margin:.3f})")
+
+        audited = agreed = False
+        if self.early_exit_audit_rate > 0 and random.random() < self.early_exit_audit_rate:
+            full_result = self._predict_full(text)
+            audited = True
+            agreed = full_result["topPattern"] == result["topPattern"]
+
+        with self._stats_lock:
+            self.adaptive_stats["requests"] += 1
+            self.adaptive_stats["early_exits"] += 1
+            self.adaptive_stats["audited"] += int(audited)
+            self.adaptive_stats["agreements"] += int(agreed)
+        return result
+
+    def _near_duplicate_vector(self, text: str) -> np.ndarray:
+        """Index key for a text: its token n-gram sketch or its truncated-pass features."""
+        if self.near_duplicate_key == "sketch":
+            from near_duplicate import token_sketch
+            with record_function("hybrid.tokenize"):
+                token_ids = self._content_ids([text])[0]
+            return token_sketch(token_ids)
+        with self._encoded([text], max_length=self.early_exit_max_length) as inputs:
+            features, _ = self._run_model(inputs)
+        return features[0].numpy()
+
+    def _predict_near_duplicate(self, text: str) -> Dict[str, any]:
+        """
+        Reuse the XGBoost output of a stored near-duplicate when one is within
+        the similarity threshold; otherwise run the normal path and store its
+        result if it came from the full hybrid path.
+        """
+        index = self.near_duplicates
+        key = self._near_duplicate_vector(text)
+        neighbour = index.nearest(key)
+
+        if index.is_hit(neighbour):
+            result = self._format_prediction(neighbour.proba, "near_duplicate")
+            print(f"[HybridModel] Near-duplicate hit (similarity {neighbour.similarity:.3f})")
+            agreed = None
+            if index.audit_rate > 0 and random.random() < index.audit_rate:
+                agreed = self._predict_full(text)["topPattern"] == result["topPattern"]
+            index.record(neighbour, hit=True, agreed=agreed)
+            return result
+
+        result = self._predict_adaptive(text) if self.early_exit_margin is not None else self._predict_full(text)
+        agreed = None
+        if result["tier"] == "full":
+            scores = {item["label"]: item["score"] for item in result["confidenceScores"]}
+            index.add(key, np.array([scores[label] for label in self.labels], dtype=np.float32))
+            if neighbour is not None:
+                agreed = self.label_map[int(np.argmax(neighbour.proba))] == result["topPattern"]
+        index.record(neighbour, hit=False, agreed=agreed)
+        return result
+
+    def get_adaptive_stats(self) -> Dict[str, any]:
+        """Escalation rate and audited early-exit agreement with the full hybrid path."""
+        with self._stats_lock:
+            stats = dict(self.adaptive_stats)
+        stats["escalation_rate"] = stats["escalations"] / stats["requests"] if stats["requests"] else None
+        stats["agreement_rate"] = stats["agreements"] / stats["audited"] if stats["audited"] else None
+        return stats
+
+    def predict(self, text: str, tier: str = "full") -> Dict[str, any]:
         """
         Make prediction using the hybrid model.
-        Returns prediction results in the format expected by the API.
+        Returns prediction results in the format expected by the API; "tier"
+        names the path that produced them. Errors are raised, not masked.
         """
         try:
             print(f"[HybridModel] Making prediction for text: {text[:50]}...")
-            
-            # Preprocess text
-            inputs = self.preprocess_text(text)
-            print("[HybridModel] Text preprocessed successfully")
-            
-            # Get features from DistilBERT-BiLSTM
-            with torch.no_grad():
-                print("[HybridModel] Running model forward pass...")
-                features, logits = self.model(**inputs)
-                print("[HybridModel] Model forward pass completed")
-                
-                # Convert to numpy safely
-                features_np = features.cpu().numpy()
-                print("[HybridModel] Features converted to numpy")
-            
-            # Use XGBoost for final prediction if available
-            if self.xgb_model is not None:
-                print("[HybridModel] Using XGBoost for prediction...")
-                # Get XGBoost predictions
-                xgb_pred = self.xgb_model.predict(features_np)[0]
-                xgb_proba = self.xgb_model.predict_proba(features_np)[0]
-                print("[HybridModel] XGBoost prediction completed")
-                
-                # Map to labels
-                predicted_label = self.label_map[xgb_pred]
-                
-                # Create confidence scores
-                confidence_scores = []
-                for i, label in enumerate(self.labels):
-                    confidence_scores.append({
-                        "label": label,
-                        "score": float(xgb_proba[i])
-                    })
-                
-                # Sort by confidence
-                confidence_scores.sort(key=lambda x: x["score"], reverse=True)
-                
+
+            if tier != "full":
+                _, proba = self._tier_forward([text], tier)
+                result = self._format_prediction(proba[0], tier)
+            elif self.near_duplicates is not None:
+                result = self._predict_near_duplicate(text)
+            elif self.early_exit_margin is not None:
+                result = self._predict_adaptive(text)
             else:
-                print("[HybridModel] Using PyTorch model only...")
-                # Fallback to PyTorch model only
-                probs = torch.softmax(logits, dim=-1).cpu().numpy()[0]
-                predicted_idx = np.argmax(probs)
-                predicted_label = self.label_map[predicted_idx]
-                
-                # Create confidence scores
-                confidence_scores = []
-                for i, label in enumerate(self.labels):
-                    confidence_scores.append({
-                        "label": label,
-                        "score": float(probs[i])
-                    })
-                
-                # Sort by confidence
-                confidence_scores.sort(key=lambda x: x["score"], reverse=True)
-            
-            print(f"[HybridModel] Prediction completed: {predicted_label}")
-            return {
-                "topPattern": predicted_label,
-                "confidenceScores": confidence_scores
-            }
+                result = self._predict_full(text)
+
+            print(f"[HybridModel] Prediction completed: {result['topPattern']} ({result['tier']} tier)")
+            return result
             
         except Exception as e:
             print(f"❌ Error during prediction: {e}")
-            import traceback
-            traceback.print_exc()
-            # Return fallback prediction
-            return {
-                "topPattern": "Anxiety",
-                "confidenceScores": [
-                    {"label": "Anxiety", "score": 0.4},
-                    {"label": "Bipolar", "score": 0.3},
-                    {"label": "Depression", "score": 0.3}
-                ]
-            }
+            raise
     
+    def warmup(self):
+        """Run dummy inputs through every configured path so the first real request is not a cold one."""
+        with self.profiler.phase("warmup"):
+            with self._encoded(["warm up"]) as inputs:
+                features, logits = self._run_model(inputs)
+            self._score(features, logits)
+            if self.early_exit_margin is not None:
+                with self._encoded(["warm up"], max_length=self.early_exit_max_length) as inputs:
+                    self._run_model(inputs)
+            for tier in self.degradation_tiers:
+                self._tier_forward(["warm up"], tier)
+
+    def start_profile(self, mode: str, seconds: float, out_dir: str) -> Dict[str, any]:
+        """Profile this process for ``seconds`` on live traffic in the background (see profiling.py)."""
+        from profiling import start_capture
+        return start_capture(mode, seconds, out_dir)
+
     def get_model_info(self) -> Dict[str, any]:
         """Get information about the loaded model."""
+        with self._stats_lock:
+            batch_stats = dict(self.batch_stats)
         return {
             "model_type": "DistilBERT-BiLSTM-XGBoost Hybrid",
             "pytorch_model_loaded": os.path.exists(self.model_path),
             "xgboost_model_loaded": self.xgb_model is not None,
+            "xgb_backend": self.xgb_backend,
+            "strict": self.strict,
             "labels": self.labels,
-            "device": str(self.device)
+            "device": str(self.device),
+            "transformer_layers": self.model.num_transformer_layers,
+            "early_exit_margin": self.early_exit_margin,
+            "degradation_tiers": self.degradation_tiers,
+            "degraded_max_length": self.degraded_max_length,
+            "precision": self.precision,
+            "acceleration": self.acceleration,
+            "adaptive_stats": self.get_adaptive_stats(),
+            "heads": {name: {**head.info, "labels": head.labels} for name, head in self.heads.items()},
+            "near_duplicates": self.near_duplicates.get_stats() if self.near_duplicates is not None else None,
+            "batch_stats": batch_stats,
+            "startup": self.profiler.report(),
+            "input_pool": self.input_pool.get_stats(),
+            "token_cache": self.token_cache.get_stats() if self.token_cache is not None else None,
         }
 
 
@@ -251,6 +1008,8 @@ class HybridMentalHealthModel(HybridModelInference):
         transformer_model_path: str = "models/mental_health_model.pth",
         xgboost_model_path: str = "models/xgboost_classifier.json",
         tokenizer_path: Optional[str] = None,
+        extra_heads=None,
+        **inference_kwargs,
     ):
         base_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -259,12 +1018,24 @@ class HybridMentalHealthModel(HybridModelInference):
                 return path
             return os.path.join(base_dir, path)
 
+        # extra_heads may also be an EXTRA_HEADS-style string (see heads.parse_head_specs)
+        if extra_heads:
+            from heads import parse_head_specs
+            if isinstance(extra_heads, str):
+                extra_heads = parse_head_specs(extra_heads)
+            extra_heads = [
+                spec._replace(path=resolve_path(spec.path), xgb_path=spec.xgb_path and resolve_path(spec.xgb_path))
+                for spec in extra_heads
+            ]
+
         super().__init__(
             model_path=resolve_path(transformer_model_path),
             xgb_path=resolve_path(xgboost_model_path),
             tokenizer_path=tokenizer_path if (tokenizer_path and os.path.isabs(tokenizer_path)) else (
                 os.path.join(base_dir, tokenizer_path) if tokenizer_path else None
             ),
+            extra_heads=extra_heads,
+            **inference_kwargs,
         )
 
 
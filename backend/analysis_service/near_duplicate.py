@@ -0,0 +1,203 @@
+"""
+Near-duplicate short-circuit for the analysis service.
+
+Paraphrases of earlier submissions miss the exact-text paths (coalescing,
+batch dedup) but score almost identically. NearDuplicateIndex keeps a ring
+of key vectors for texts that went through the full hybrid path together
+with their XGBoost probabilities; a new text whose key is within
+``threshold`` cosine similarity of a stored one reuses that output.
+
+Keys are either a hashed unigram/bigram sketch of the token ids (no model
+call at all) or the final_state features of a truncated forward pass.
+Nearest-neighbour search is a vectorized NumPy scan, or an hnswlib HNSW
+graph for large capacities when hnswlib is installed.
+
+Every lookup that also has a fresh full-path result (misses, and the
+sampled audits of hits) records whether the nearest neighbour's label
+agreed, bucketed by similarity, so get_stats() shows how safe a lower or
+higher threshold would be.
+"""
+
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+KEYS = ("sketch", "truncated")
+BACKENDS = ("auto", "numpy", "hnsw")
+
+SKETCH_DIM = 256
+# Above this many entries "auto" prefers HNSW (when hnswlib is installed) over a brute-force scan
+BRUTE_FORCE_MAX = 20000
+# Similarity bands for the agreement report
+BAND_EDGES = (0.0, 0.5, 0.7, 0.8, 0.9, 0.95, 0.98, 0.99, 1.0)
+
+_HASH_MUL = np.uint64(0x9E3779B97F4A7C15)
+
+
+def token_sketch(token_ids: Sequence[int], dim: int = SKETCH_DIM) -> np.ndarray:
+    """Hashed counts of a text's token unigrams and bigrams."""
+    ids = np.asarray(token_ids, dtype=np.uint64)
+    grams = np.concatenate([ids, ids[:-1] * np.uint64(1000003) + ids[1:] + np.uint64(1)])
+    buckets = (grams * _HASH_MUL) >> np.uint64(40)
+    return np.bincount((buckets % np.uint64(dim)).astype(np.int64), minlength=dim).astype(np.float32)
+
+
+def _normalize(vector: np.ndarray) -> Optional[np.ndarray]:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else None
+
+
+class Neighbour(NamedTuple):
+    similarity: float
+    proba: np.ndarray
+
+
+class NumpyIndex:
+    """Brute-force cosine search over a fixed-capacity matrix."""
+
+    name = "numpy"
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.size = 0
+
+    def set(self, slot: int, vector: np.ndarray):
+        self.vectors[slot] = vector
+        self.size = max(self.size, slot + 1)
+
+    def nearest(self, vector: np.ndarray):
+        if not self.size:
+            return None
+        sims = self.vectors[:self.size] @ vector
+        slot = int(np.argmax(sims))
+        return slot, float(sims[slot])
+
+
+class HnswIndex:
+    """hnswlib inner-product graph; ring slots are hnswlib labels, so reusing one updates it in place."""
+
+    name = "hnsw"
+
+    def __init__(self, dim: int, capacity: int, ef: int = 64, m: int = 16):
+        import hnswlib
+        self.index = hnswlib.Index(space="ip", dim=dim)
+        self.index.init_index(max_elements=capacity, ef_construction=200, M=m)
+        self.index.set_ef(ef)
+        self.size = 0
+
+    def set(self, slot: int, vector: np.ndarray):
+        self.index.add_items(vector[None, :], np.array([slot]))
+        self.size = max(self.size, slot + 1)
+
+    def nearest(self, vector: np.ndarray):
+        if not self.size:
+            return None
+        slots, distances = self.index.knn_query(vector[None, :], k=1)
+        return int(slots[0, 0]), 1.0 - float(distances[0, 0])
+
+
+def _make_backend(backend: str, dim: int, capacity: int):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown near-duplicate backend {backend!r}; expected one of {BACKENDS}")
+    if backend == "numpy" or (backend == "auto" and capacity <= BRUTE_FORCE_MAX):
+        return NumpyIndex(dim, capacity)
+    try:
+        return HnswIndex(dim, capacity)
+    except ImportError:
+        if backend == "hnsw":
+            raise
+        print("[NearDuplicate] ⚠️ hnswlib not installed; using brute-force search")
+        return NumpyIndex(dim, capacity)
+
+
+class NearDuplicateIndex:
+    """
+    Fixed-capacity map of key vector -> probabilities; the oldest entry is
+    overwritten once ``capacity`` is reached.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        num_labels: int,
+        threshold: float = 0.95,
+        capacity: int = 10000,
+        backend: str = "auto",
+        audit_rate: float = 0.0,
+    ):
+        self.dim = dim
+        self.threshold = threshold
+        self.capacity = capacity
+        self.audit_rate = audit_rate
+        self._index = _make_backend(backend, dim, capacity)
+        self._proba = np.zeros((capacity, num_labels), dtype=np.float32)
+        self._next = 0
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "inserts": 0, "audited": 0, "audit_agreements": 0}
+        self._band_compared = np.zeros(len(BAND_EDGES) - 1, dtype=np.int64)
+        self._band_agreed = np.zeros(len(BAND_EDGES) - 1, dtype=np.int64)
+
+    def nearest(self, key: np.ndarray) -> Optional[Neighbour]:
+        """The closest stored entry, whatever its similarity; None if the index is empty."""
+        vector = _normalize(key)
+        if vector is None:
+            return None
+        with self._lock:
+            found = self._index.nearest(vector)
+            if found is None:
+                return None
+            slot, similarity = found
+            return Neighbour(similarity, self._proba[slot].copy())
+
+    def is_hit(self, neighbour: Optional[Neighbour]) -> bool:
+        return neighbour is not None and neighbour.similarity >= self.threshold
+
+    def add(self, key: np.ndarray, proba: np.ndarray):
+        vector = _normalize(key)
+        if vector is None:
+            return
+        with self._lock:
+            slot = self._next
+            self._index.set(slot, vector)
+            self._proba[slot] = proba
+            self._next = (slot + 1) % self.capacity
+            self.stats["inserts"] += 1
+
+    def record(self, neighbour: Optional[Neighbour], hit: bool, agreed: Optional[bool] = None):
+        """
+        Count one lookup. ``agreed`` is whether the neighbour's top label
+        matched a fresh full-path result (None when there was nothing to compare).
+        """
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.stats["hits"] += int(hit)
+            if agreed is None or neighbour is None:
+                return
+            if hit:
+                self.stats["audited"] += 1
+                self.stats["audit_agreements"] += int(agreed)
+            band = int(np.clip(np.searchsorted(BAND_EDGES, neighbour.similarity, side="right") - 1, 0, len(BAND_EDGES) - 2))
+            self._band_compared[band] += 1
+            self._band_agreed[band] += int(agreed)
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats: Dict[str, object] = dict(self.stats)
+            bands: List[Dict[str, object]] = [
+                {
+                    "min_similarity": BAND_EDGES[i],
+                    "max_similarity": BAND_EDGES[i + 1],
+                    "compared": int(compared),
+                    "agreement_rate": float(self._band_agreed[i] / compared) if compared else None,
+                }
+                for i, compared in enumerate(self._band_compared)
+            ]
+            stats["size"] = self._index.size
+        stats["backend"] = self._index.name
+        stats["threshold"] = self.threshold
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else None
+        stats["agreement_rate"] = stats["audit_agreements"] / stats["audited"] if stats["audited"] else None
+        stats["similarity_bands"] = bands
+        return stats
@@ -0,0 +1,168 @@
+"""
+On-demand profiling of a live analysis service process.
+
+A capture runs in a background thread for ``seconds`` while the process keeps
+serving traffic, then writes two files to ``out_dir``: the trace and a
+``<name>.summary.json`` with a per-stage breakdown. Two modes:
+
+    torch     torch.profiler over all threads (needs a torch with
+              profile_all_threads); writes a Chrome trace and breaks out
+              the hybrid.* record_function ranges (tokenize, distilbert,
+              bilstm, classifier, xgboost) plus the top aten ops.
+    sampling  samples every thread's Python stack every ``interval`` seconds
+              (works on any torch); writes folded stacks for flamegraph
+              tools, counts samples per stage and the hottest frames
+              inside inference.
+
+Only one capture runs per process at a time.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+MODES = ("torch", "sampling")
+
+# Python frames that identify each inference stage in sampled stacks
+STAGE_FRAMES = {
+    "HybridModelInference._encoded": "tokenize",
+    "DistilBERT_BiLSTM_Hybrid.forward": "forward",
+    "HybridModelInference._score": "xgboost",
+}
+
+_capture_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """A capture is already running in this process."""
+
+
+def _write_json(path: str, data: Dict[str, object]):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _capture_torch(seconds: float, trace_path: str) -> Dict[str, object]:
+    import torch
+    from torch.profiler import ProfilerActivity, profile
+
+    try:
+        config = torch._C._profiler._ExperimentalConfig(profile_all_threads=True)
+    except TypeError:
+        raise RuntimeError("This torch version cannot profile request threads; use mode=sampling")
+
+    with profile(activities=[ProfilerActivity.CPU], record_shapes=True, experimental_config=config) as prof:
+        time.sleep(seconds)
+    prof.export_chrome_trace(trace_path)
+
+    events = prof.key_averages()
+    stages = {
+        e.key[len("hybrid."):]: {
+            "count": e.count,
+            "cpu_ms_total": round(e.cpu_time_total / 1000, 3),
+            "cpu_ms_mean": round(e.cpu_time_total / 1000 / e.count, 3),
+        }
+        for e in events
+        if e.key.startswith("hybrid.")
+    }
+    ops = sorted((e for e in events if not e.key.startswith("hybrid.")), key=lambda e: e.self_cpu_time_total, reverse=True)
+    return {
+        "stages": stages,
+        "top_ops": [
+            {"op": e.key, "count": e.count, "self_cpu_ms": round(e.self_cpu_time_total / 1000, 3)}
+            for e in ops[:25]
+        ],
+    }
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return getattr(code, "co_qualname", code.co_name)
+
+
+def _capture_sampling(seconds: float, trace_path: str, interval: float) -> Dict[str, object]:
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    leaves: Counter = Counter()
+    stages: Counter = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            names = []
+            stage = None
+            while frame is not None:
+                name = _frame_name(frame)
+                names.append(f"{name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno})")
+                if stage is None and name in STAGE_FRAMES:
+                    stage = STAGE_FRAMES[name]
+                frame = frame.f_back
+            stacks[";".join(reversed(names))] += 1
+            if stage:
+                # Idle threads would dominate the leaf counts, so only inference samples count
+                stages[stage] += 1
+                leaves[names[0]] += 1
+        samples += 1
+        time.sleep(interval)
+
+    with open(trace_path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return {
+        "interval_seconds": interval,
+        "sweeps": samples,
+        "stages": {stage: {"samples": n, "seconds_est": round(n * interval, 3)} for stage, n in stages.items()},
+        "top_frames": [{"frame": name, "samples": n} for name, n in leaves.most_common(25)],
+    }
+
+
+def start_capture(mode: str, seconds: float, out_dir: str, interval: float = 0.005) -> Dict[str, object]:
+    """
+    Start a background capture and return where its files will appear.
+    Raises ProfilerBusy if a capture is already running in this process.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode {mode!r}; expected one of {MODES}")
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile capture is already running")
+
+    os.makedirs(out_dir, exist_ok=True)
+    name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{mode}"
+    trace_path = os.path.join(out_dir, name + (".trace.json" if mode == "torch" else ".folded"))
+    summary_path = os.path.join(out_dir, f"{name}.summary.json")
+
+    def run():
+        summary: Dict[str, object] = {"mode": mode, "seconds": seconds, "pid": os.getpid(), "trace": os.path.basename(trace_path)}
+        try:
+            if mode == "torch":
+                summary.update(_capture_torch(seconds, trace_path))
+            else:
+                summary.update(_capture_sampling(seconds, trace_path, interval))
+        except Exception as e:
+            summary["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            _write_json(summary_path, summary)
+            _capture_lock.release()
+
+    threading.Thread(target=run, name="profile-capture", daemon=True).start()
+    return {"name": name, "pid": os.getpid(), "summary": os.path.basename(summary_path)}
+
+
+def wait_for_summary(out_dir: str, summary_name: str, timeout: float) -> Optional[Dict[str, object]]:
+    """Poll for a capture's summary file; None if it does not appear within timeout."""
+    path = os.path.join(out_dir, summary_name)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        time.sleep(0.2)
+    return None
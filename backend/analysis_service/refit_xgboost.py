@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+XGBoost Refit Pipeline for Virtual Therapist Analysis Service
+
+Refits the XGBoost stage (xgboost_classifier.json) on new labelled data
+without retraining DistilBERT-BiLSTM. The input is a JSONL file with a
+"text" and a "label" field (Anxiety, Bipolar or Depression) per line; lines
+with another or no label are skipped.
+
+The file is streamed in chunks to a pool of worker processes. Each worker
+holds a HybridModelInference (weights memory-mapped, so the page cache is
+shared) and extracts ``final_state`` features through the serving path
+itself (same tokenizer, _encoded padding to 256 tokens, fp32 _run_model),
+so the booster is fit on exactly the features it will score. Features go
+straight into a shared .npy memmap, so only texts and row counts cross the
+process boundary. A new booster is then fit on the memmap and saved next to
+a model_info.json in the format of save_hybrid_model.py.
+
+--reuse-features skips extraction when features_meta.json shows the cached
+features came from the same texts, labels and checkpoint.
+
+    python refit_xgboost.py --data labelled.jsonl --workers 8
+    python refit_xgboost.py --data labelled.jsonl --reuse-features --max-depth 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing as mp
+
+import numpy as np
+
+from artifacts import ArtifactError, is_lfs_pointer, record_artifact, served_path, sha256_file
+
+LABELS = ["Anxiety", "Bipolar", "Depression"]
+HIDDEN_DIM = 256
+MAX_LENGTH = 256
+# Tree hyperparameters carried over from the served booster's training config
+CARRIED_PARAMS = {
+    "max_depth": int,
+    "learning_rate": float,
+    "subsample": float,
+    "colsample_bytree": float,
+    "min_child_weight": float,
+    "gamma": float,
+    "reg_alpha": float,
+    "reg_lambda": float,
+}
+
+
+def iter_records(path):
+    """Yield (text, label index) for every line with a known label."""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            label = record.get("label")
+            if label in LABELS and record.get("text"):
+                yield record["text"], LABELS.index(label)
+
+
+def iter_chunks(path, chunk_size):
+    """Yield (first row, texts, labels) chunks of the labelled records, in file order."""
+    start, texts, labels = 0, [], []
+    for text, label in iter_records(path):
+        texts.append(text)
+        labels.append(label)
+        if len(texts) == chunk_size:
+            yield start, texts, labels
+            start, texts, labels = start + len(texts), [], []
+    if texts:
+        yield start, texts, labels
+
+
+# Worker process state, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, num_transformer_layers, features_path, threads, batch_size):
+    import torch
+    torch.set_num_threads(threads)
+    from hybrid_model import HybridModelInference
+
+    # The serving class, so tokenization and padding cannot drift from production; features
+    # only, so workers never import or load XGBoost
+    model = HybridModelInference(
+        model_path=model_path,
+        xgb_path=None,
+        num_transformer_layers=num_transformer_layers,
+        token_cache_mb=0,
+    )
+    _worker.update(
+        model=model,
+        features=np.load(features_path, mmap_mode="r+"),
+        batch_size=batch_size,
+    )
+
+
+def _extract_chunk(start, texts):
+    """Write the final_state features of texts to rows start.. of the memmap; returns (rows, seconds)."""
+    model, features, batch_size = _worker["model"], _worker["features"], _worker["batch_size"]
+    began = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        with model._encoded(texts[i:i + batch_size], max_length=MAX_LENGTH) as inputs:
+            final_state, _ = model._run_model(inputs)
+        features[start + i:start + i + len(final_state)] = final_state.numpy()
+    return len(texts), time.perf_counter() - began
+
+
+def features_fingerprint(args):
+    """(row count, fingerprint) of the labelled records and the checkpoint the features come from."""
+    digest = hashlib.sha256()
+    rows = 0
+    for text, label in iter_records(args.data):
+        digest.update(f"{label}\t{len(text)}\t".encode())
+        digest.update(text.encode("utf-8"))
+        rows += 1
+    return rows, {
+        "records_sha256": digest.hexdigest(),
+        "model_sha256": sha256_file(args.model_path),
+        "transformer_layers": args.layers,
+        "max_length": MAX_LENGTH,
+    }
+
+
+def extract_features(args, num_rows, features_path, labels_path):
+    """Fill features_path and labels_path (.npy memmaps) for the num_rows labelled records."""
+    features = np.lib.format.open_memmap(features_path, mode="w+", dtype=np.float32, shape=(num_rows, HIDDEN_DIM * 2))
+    labels = np.lib.format.open_memmap(labels_path, mode="w+", dtype=np.int8, shape=(num_rows,))
+    del features  # workers write through their own mappings
+
+    # spawn: workers must not inherit the parent's torch thread pool
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(args.model_path, args.layers, features_path, args.threads, args.batch_size),
+    )
+    done_rows, worker_seconds, next_report = 0, 0.0, 0.1
+    start = time.perf_counter()
+
+    def collect(futures):
+        nonlocal done_rows, worker_seconds, next_report
+        for future in futures:
+            rows, seconds = future.result()
+            done_rows += rows
+            worker_seconds += seconds
+        if done_rows >= next_report * num_rows:
+            rate = done_rows / (time.perf_counter() - start)
+            print(f"⚙️  {done_rows}/{num_rows} texts ({rate:.1f} texts/s)")
+            next_report = done_rows / num_rows + 0.1
+
+    with executor:
+        # At most two chunks per worker in flight, so the file is streamed rather than queued whole
+        pending = set()
+        for first, texts, chunk_labels in iter_chunks(args.data, args.chunk_size):
+            labels[first:first + len(chunk_labels)] = chunk_labels
+            if len(pending) >= 2 * args.workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending.add(executor.submit(_extract_chunk, first, texts))
+        collect(pending)
+
+    labels.flush()
+    seconds = time.perf_counter() - start
+    return {
+        "texts": done_rows,
+        "workers": args.workers,
+        "threads_per_worker": args.threads,
+        "seconds": round(seconds, 2),
+        "texts_per_second": round(done_rows / seconds, 1) if seconds else None,
+        "worker_busy_fraction": round(worker_seconds / (seconds * args.workers), 3) if seconds else None,
+    }
+
+
+def served_params(path):
+    """n_estimators and CARRIED_PARAMS of a saved booster."""
+    import xgboost as xgb
+
+    booster = xgb.Booster()
+    booster.load_model(path)
+    tree_params = json.loads(booster.save_config())["learner"]["gradient_booster"].get("tree_train_param", {})
+    params = {name: cast(tree_params[name]) for name, cast in CARRIED_PARAMS.items() if name in tree_params}
+    params["n_estimators"] = booster.num_boosted_rounds()
+    return params
+
+
+def fit_booster(features, labels, args):
+    """Fit an XGBClassifier on a shuffled split; returns (model, params, eval rows)."""
+    import xgboost as xgb
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(labels))
+    n_eval = int(len(labels) * args.eval_fraction)
+    eval_rows, train_rows = np.sort(order[:n_eval]), np.sort(order[n_eval:])
+
+    params = {"objective": "multi:softprob", "tree_method": "hist", "random_state": args.seed}
+    if os.path.exists(args.xgb_path) and not args.fresh_params:
+        # Keep the served booster's hyperparameters unless overridden below
+        params.update(served_params(args.xgb_path))
+    for name in ("n_estimators", "max_depth", "learning_rate"):
+        if getattr(args, name) is not None:
+            params[name] = getattr(args, name)
+
+    model = xgb.XGBClassifier(n_jobs=args.workers, **params)
+    print(f"🌲 Fitting XGBoost on {len(train_rows)} texts ({len(eval_rows)} held out)...")
+    start = time.perf_counter()
+    model.fit(features[train_rows], labels[train_rows])
+    print(f"✅ Fit in {time.perf_counter() - start:.1f}s")
+    return model, params, eval_rows
+
+
+def evaluate_booster(path_or_model, features, labels):
+    """Accuracy and per-class F1 of a booster (or a path to one) on the given rows."""
+    import xgboost as xgb
+    from sklearn.metrics import accuracy_score, f1_score
+
+    model = path_or_model
+    if isinstance(path_or_model, str):
+        model = xgb.XGBClassifier()
+        model.load_model(path_or_model)
+    predictions = model.predict(features)
+    f1 = f1_score(labels, predictions, labels=list(range(len(LABELS))), average=None, zero_division=0)
+    return {
+        "accuracy": float(accuracy_score(labels, predictions)),
+        "f1": {label: float(score) for label, score in zip(LABELS, f1)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refit the XGBoost stage of the hybrid model on labelled data")
+    parser.add_argument("--data", required=True, help="JSONL file with 'text' and 'label' fields")
+    parser.add_argument("--model-path", default="models/hybrid_model.pth")
+    parser.add_argument("--xgb-path", default="models/xgboost_classifier.json", help="Served booster (baseline and hyperparameters)")
+    parser.add_argument("--layers", type=int, help="Transformer layers of a fast-variant --model-path")
+    parser.add_argument("--output-dir", default="models/refit")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads per worker")
+    parser.add_argument("--chunk-size", type=int, default=512, help="Texts per worker task")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per forward pass")
+    parser.add_argument("--reuse-features", action="store_true", help="Skip extraction if features.npy came from the same data and checkpoint")
+    parser.add_argument("--eval-fraction", type=float, default=0.1)
+    parser.add_argument("--fresh-params", action="store_true", help="Ignore the served booster's hyperparameters")
+    parser.add_argument("--n-estimators", type=int)
+    parser.add_argument("--max-depth", type=int)
+    parser.add_argument("--learning-rate", type=float)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("🚀 Virtual Therapist XGBoost Refit")
+    print("=" * 60)
+
+    if not os.path.exists(args.model_path):
+        raise ArtifactError(f"PyTorch model not found at {args.model_path}")
+    if is_lfs_pointer(args.model_path):
+        raise ArtifactError(f"{args.model_path} is a Git LFS pointer, not model weights; run `git lfs pull`")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    features_path = os.path.join(args.output_dir, "features.npy")
+    labels_path = os.path.join(args.output_dir, "labels.npy")
+    meta_path = os.path.join(args.output_dir, "features_meta.json")
+
+    # Counting first lets the memmap be sized up front; the texts are not kept
+    num_rows, fingerprint = features_fingerprint(args)
+    if not num_rows:
+        raise SystemExit(f"❌ No lines in {args.data} have a label in {LABELS}")
+    print(f"📚 {num_rows} labelled texts in {args.data}")
+
+    cached = None
+    if args.reuse_features and all(os.path.exists(p) for p in (features_path, labels_path, meta_path)):
+        with open(meta_path) as f:
+            cached = json.load(f)
+    if cached == fingerprint:
+        print(f"♻️  Reusing features from {features_path}")
+        extraction = None
+    else:
+        if args.reuse_features:
+            print("⚠️ Cached features do not match the data or checkpoint; extracting again")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        print(f"⚙️  Extracting features with {args.workers} worker(s) x {args.threads} thread(s)...")
+        extraction = extract_features(args, num_rows, features_path, labels_path)
+        # Written last, so interrupted extractions are never reused
+        with open(meta_path, "w") as f:
+            json.dump(fingerprint, f, indent=2)
+        print(f"✅ Features written to: {features_path}")
+
+    features = np.load(features_path, mmap_mode="r")
+    labels = np.load(labels_path)
+    model, params, eval_rows = fit_booster(features, labels, args)
+
+    xgb_path = os.path.join(args.output_dir, "xgboost_classifier.json")
+    model.save_model(xgb_path)
+    print(f"✅ XGBoost model saved to: {xgb_path}")
+
+    report = {
+        "data": args.data,
+        "texts": num_rows,
+        "label_counts": {label: int((labels == i).sum()) for i, label in enumerate(LABELS)},
+        "extraction": extraction,
+        "xgboost_params": params,
+    }
+    if len(eval_rows):
+        eval_features, eval_labels = features[eval_rows], labels[eval_rows]
+        report["eval"] = {"texts": len(eval_rows), "refit": evaluate_booster(model, eval_features, eval_labels)}
+        if os.path.exists(args.xgb_path):
+            report["eval"]["current"] = evaluate_booster(args.xgb_path, eval_features, eval_labels)
+
+    model_info = {
+        "pytorch_path": args.model_path,
+        "xgb_path": xgb_path,
+        "labels": LABELS,
+        "model_type": "DistilBERT-BiLSTM-XGBoost Hybrid",
+        "num_labels": len(LABELS),
+        "hidden_dim": HIDDEN_DIM,
+        "lstm_layers": 1,
+        "dropout_prob": 0.3,
+        "refit": report,
+    }
+    info_path = os.path.join(args.output_dir, "model_info.json")
+    with open(info_path, "w") as f:
+        json.dump(model_info, f, indent=2)
+    print(f"✅ Model info saved to: {info_path}")
+
+    print("\n📊 Refit report")
+    print(json.dumps(report, indent=2))
+    # Only the served path has a manifest entry the service checks; anything else
+    # (the default models/refit/) is a candidate to compare before deploying
+    if os.path.abspath(xgb_path) == served_path("xgboost_classifier.json"):
+        record_artifact(xgb_path)
+        print(f"✅ Recorded {xgb_path} in the artifact manifest")
+        print(f"\n🎉 {xgb_path} is ready to serve")
+    else:
+        print(
+            f"\n🎉 Copy {xgb_path} to models/ and run "
+            "`python artifacts.py record models/xgboost_classifier.json` to deploy it"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 """
 Script to save your hybrid DistilBERT-BiLSTM-XGBoost model for Virtual Therapist
 Run this in your Colab notebook after training your model.
+To refit only the XGBoost stage locally on new labelled data, use refit_xgboost.py.
 """
 
 import torch
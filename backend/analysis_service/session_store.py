@@ -0,0 +1,193 @@
+"""
+Incremental per-session analysis state for the analysis service.
+
+Each session keeps the per-turn features and probabilities it has already
+scored plus running sums over them, so appending turns scores only the new
+turns and updates the session aggregate in O(new turns). Sessions live in
+memory, are evicted least-recently-used beyond ``max_sessions`` or after
+``ttl_seconds`` idle, and hold at most ``max_turns`` turns (the oldest turn
+drops out of the aggregate when a new one arrives). Clients send only the
+turns they add plus the index of the first one ({"turns": [...], "start": n});
+only those turns are hashed, so a call costs O(new turns) however long the
+conversation is. A retried call scores nothing twice, and when this process
+has lost the state (restart, expiry, eviction) the caller is told which turn
+to resend from so the state can be rebuilt.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _turn_digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class MissingTurns(LookupError):
+    """The turns sent cannot bring the session up to date; resend from turn ``start``."""
+
+    def __init__(self, start: int):
+        super().__init__(f"Session state needs the turns from {start}")
+        self.start = start
+
+
+class SessionState:
+    """Cached turns of one session and the running aggregate over them."""
+
+    def __init__(self, max_turns: int):
+        self.lock = threading.Lock()
+        self.max_turns = max_turns
+        self.turns_seen = 0
+        self.digests: Deque[bytes] = deque()
+        self.proba: Deque[np.ndarray] = deque()
+        self.features: Deque[Optional[np.ndarray]] = deque()
+        self.proba_sum: Optional[np.ndarray] = None
+        self.feature_sum: Optional[np.ndarray] = None
+        self.feature_count = 0
+        self.last_access = time.monotonic()
+
+    def reset(self):
+        self.turns_seen = 0
+        self.digests.clear()
+        self.proba.clear()
+        self.features.clear()
+        self.proba_sum = self.feature_sum = None
+        self.feature_count = 0
+
+    def pending(self, turns: List[str], start: int) -> Tuple[List[str], bool]:
+        """
+        Which of ``turns`` (turn ``start`` onwards of the session) still need
+        scoring, and whether the cached state has to be dropped first. Only the
+        sent turns that overlap the retained ones are hashed and compared; if
+        they differ, or the session has more turns than the caller, the state
+        is rebuilt from ``turns`` when they start at 0 or fill the ``max_turns``
+        window, and MissingTurns is raised otherwise. Only the last
+        ``max_turns`` turns are ever scored. Only reads the state: score the
+        turns, then apply them with extend().
+        """
+        end = start + len(turns)
+        if start > self.turns_seen:
+            consistent = None
+        else:
+            # Positions [first, turns_seen) are both retained here and sent by the caller; they
+            # end at the newest retained turn, so walk both backwards from there
+            first = max(start, self.turns_seen - len(self.digests))
+            overlap = turns[first - start:self.turns_seen - start]
+            consistent = end >= self.turns_seen and all(
+                digest == _turn_digest(text) for text, digest in zip(reversed(overlap), reversed(self.digests))
+            )
+
+        if consistent:
+            new, reset = turns[self.turns_seen - start:], False
+        elif start == 0 or len(turns) >= self.max_turns:
+            new, reset = turns, True
+        else:
+            # A gap after the turns seen here can be filled from there; a mismatch needs everything
+            raise MissingTurns(self.turns_seen if consistent is None else 0)
+
+        skipped = len(new) - self.max_turns
+        if skipped > 0:
+            # These turns, and every cached one, would leave the window before the call returns
+            new, reset = new[skipped:], True
+        return new, reset
+
+    def extend(self, end: int, new: List[str], reset: bool, proba: np.ndarray, features: Optional[np.ndarray] = None):
+        """Apply a pending() result once its ``new`` turns are scored; ``end`` is the caller's turn count."""
+        if reset:
+            self.reset()
+            self.turns_seen = end - len(new)
+        if new:
+            self.append(new, proba, features)
+
+    def append(self, texts: List[str], proba: np.ndarray, features: Optional[np.ndarray] = None):
+        """
+        Add scored turns and update the running sums. ``features`` may be None
+        for turns answered without a full forward pass (early exit,
+        near-duplicate reuse); the feature aggregate skips those turns.
+        """
+        if self.proba_sum is None:
+            self.proba_sum = np.zeros(proba.shape[1], dtype=np.float64)
+        rows = features if features is not None else [None] * len(texts)
+        for text, p, f in zip(texts, proba, rows):
+            if len(self.digests) == self.max_turns:
+                self.digests.popleft()
+                self.proba_sum -= self.proba.popleft()
+                old = self.features.popleft()
+                if old is not None:
+                    self.feature_sum -= old
+                    self.feature_count -= 1
+            self.digests.append(_turn_digest(text))
+            self.proba.append(p)
+            self.features.append(f)
+            self.proba_sum += p
+            if f is not None:
+                if self.feature_sum is None:
+                    self.feature_sum = np.zeros(f.shape[0], dtype=np.float64)
+                self.feature_sum += f
+                self.feature_count += 1
+        self.turns_seen += len(texts)
+
+    def aggregate(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Mean probabilities over the retained turns, and mean features over those that have them."""
+        if not self.proba:
+            return None, None
+        proba = (self.proba_sum / len(self.proba)).astype(np.float32)
+        if not self.feature_count:
+            return proba, None
+        return proba, (self.feature_sum / self.feature_count).astype(np.float32)
+
+
+class SessionStore:
+    """LRU map of session id -> SessionState with idle expiry."""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600.0, max_turns: int = 200):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"turns_scored": 0, "turns_reused": 0, "resets": 0, "evicted": 0}
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, state = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - state.last_access <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.stats["evicted"] += 1
+
+    def get(self, session_id: str) -> SessionState:
+        """The session's state, created on first use."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = SessionState(self.max_turns)
+                self._sessions[session_id] = state
+            else:
+                self._sessions.move_to_end(session_id)
+            state.last_access = now
+            self._expire(now)
+        return state
+
+    def peek(self, session_id: str) -> Optional[SessionState]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def record(self, scored: int, reused: int, reset: bool):
+        with self._lock:
+            self.stats["turns_scored"] += scored
+            self.stats["turns_reused"] += reused
+            self.stats["resets"] += int(reset)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, "sessions": len(self._sessions)}
@@ -0,0 +1,66 @@
+"""
+Startup phase timing for the analysis service.
+Records how long each cold-start phase takes (imports, tokenizer load, model
+construction, state-dict load, XGBoost load, warm-up) so the report can be
+logged at boot and served from /model-info.
+
+Run directly to profile a cold start without Flask:
+    python startup_profile.py [--model-path ...] [--xgb-backend compiled]
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+
+class StartupProfiler:
+    """Ordered list of (phase, seconds) measured with a context manager."""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases},
+            "total_seconds": round(sum(seconds for _, seconds in self.phases), 4),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Profile a cold start of the hybrid model")
+    parser.add_argument("--model-path", default="models/hybrid_model.pth")
+    parser.add_argument("--xgb-path", default="models/xgboost_classifier.json")
+    parser.add_argument("--xgb-backend", default="xgboost", choices=["xgboost", "compiled"])
+    args = parser.parse_args()
+
+    profiler = StartupProfiler()
+    with profiler.phase("import_torch"):
+        import torch  # noqa: F401
+    with profiler.phase("import_transformers"):
+        import transformers  # noqa: F401
+    with profiler.phase("import_hybrid_model"):
+        from hybrid_model import HybridMentalHealthModel
+
+    model = HybridMentalHealthModel(
+        transformer_model_path=args.model_path,
+        xgboost_model_path=args.xgb_path,
+        xgb_backend=args.xgb_backend,
+        profiler=profiler,
+    )
+    model.warmup()
+
+    report = profiler.report()
+    report["xgboost_imported"] = "xgboost" in sys.modules
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Thread-Safety Stress Test for HybridModelInference
+
+Computes reference results serially, then replays the same calls (single
+predictions on every requested tier plus batches) from many threads against
+one shared model instance and checks every concurrent result against its
+serial reference. Exits non-zero on any mismatch or exception.
+
+    python stress_threads.py --threads 16 --iterations 50 --tiers full,head
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hybrid_model import HybridMentalHealthModel
+
+SAMPLE_TEXTS = [
+    "I feel really anxious about my upcoming presentation. My heart is racing.",
+    "I've been feeling really down lately and nothing brings me joy anymore.",
+    "Some days I have endless energy and barely sleep, then I crash for a week.",
+    "Work has been fine, I just worry constantly that something will go wrong.",
+    "I can't get out of bed and I've stopped answering my friends' messages.",
+    "My thoughts race so fast at night that I start three projects before dawn.",
+    "What if I fail and everyone finds out I was never good enough?",
+    "I haven't felt like myself for months, everything feels grey and heavy.",
+]
+
+
+def score_map(result):
+    return {item["label"]: item["score"] for item in result["confidenceScores"]}
+
+
+def compare(expected, actual, tolerance):
+    """None if the results agree, else a short description of the difference."""
+    pairs = zip(expected, actual) if isinstance(expected, list) else [(expected, actual)]
+    for want, got in pairs:
+        if want["topPattern"] != got["topPattern"]:
+            return f"topPattern {got['topPattern']} != {want['topPattern']}"
+        want_scores, got_scores = score_map(want), score_map(got)
+        diff = max(abs(want_scores[label] - got_scores[label]) for label in want_scores)
+        if diff > tolerance:
+            return f"score differs by {diff:.2e}"
+    return None
+
+
+def build_calls(tiers, batch_size):
+    """(key, method, kwargs) for every distinct call the stress phase issues."""
+    calls = [(f"predict/{tier}/{i}", "predict", {"text": text, "tier": tier})
+             for tier in tiers for i, text in enumerate(SAMPLE_TEXTS)]
+    for start in range(0, len(SAMPLE_TEXTS), batch_size):
+        chunk = SAMPLE_TEXTS[start:start + batch_size]
+        calls.append((f"batch/{start}", "predict_batch", {"texts": chunk}))
+    return calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress HybridModelInference from many threads")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=50, help="Calls per thread")
+    parser.add_argument("--tiers", default="full", help="Comma-separated tiers for predict calls")
+    parser.add_argument("--batch-size", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model-path", default="models/hybrid_model.pth")
+    parser.add_argument("--xgb-path", default="models/xgboost_classifier.json")
+    parser.add_argument("--xgb-backend", default="xgboost", choices=["xgboost", "compiled"])
+    parser.add_argument("--early-exit-margin", type=float)
+    parser.add_argument("--verbose", action="store_true", help="Keep the model's per-request logging")
+    parser.add_argument("--output", help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    tiers = [tier.strip() for tier in args.tiers.split(",") if tier.strip()]
+    model = HybridMentalHealthModel(
+        transformer_model_path=args.model_path,
+        xgboost_model_path=args.xgb_path,
+        xgb_backend=args.xgb_backend,
+        early_exit_margin=args.early_exit_margin,
+        degradation_tiers=[tier for tier in tiers if tier != "full"],
+    )
+    model.warmup()
+
+    calls = build_calls(tiers, args.batch_size)
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with quiet:
+        start = time.perf_counter()
+        reference = {key: getattr(model, method)(**kwargs) for key, method, kwargs in calls}
+        serial_seconds = time.perf_counter() - start
+
+    rng = random.Random(args.seed)
+    schedule = [rng.choice(calls) for _ in range(args.threads * args.iterations)]
+
+    def run(call):
+        key, method, kwargs = call
+        try:
+            return key, compare(reference[key], getattr(model, method)(**kwargs), args.tolerance)
+        except Exception as e:
+            return key, f"{type(e).__name__}: {e}"
+
+    print(f"🧵 {len(schedule)} calls on {args.threads} threads ({len(calls)} distinct)...")
+    with quiet:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            outcomes = list(pool.map(run, schedule))
+        threaded_seconds = time.perf_counter() - start
+
+    failures = {}
+    for key, problem in outcomes:
+        if problem:
+            failures.setdefault(key, []).append(problem)
+
+    report = {
+        "threads": args.threads,
+        "calls": len(schedule),
+        "distinct_calls": len(calls),
+        "failures": sum(len(problems) for problems in failures.values()),
+        "failed_calls": {key: problems[:3] for key, problems in failures.items()},
+        "serial_calls_per_second": round(len(calls) / serial_seconds, 2),
+        "threaded_calls_per_second": round(len(schedule) / threaded_seconds, 2),
+    }
+
+    print("\n📊 Thread-safety stress test")
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to: {args.output}")
+
+    if failures:
+        print(f"❌ {report['failures']} concurrent results differed from the serial run")
+        sys.exit(1)
+    print("✅ All concurrent results match the serial run")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,7 @@ def test_model_loading():
     """Test loading the saved model weights."""
     print("Testing model weights loading...")
     try:
-        model_path = "model/mental_health_model.pth"
+        model_path = "models/mental_health_model.pth"
         if not os.path.exists(model_path):
             print(f"❌ Model file not found: {model_path}")
             return False
@@ -43,7 +43,7 @@ def test_xgboost_loading():
     print("Testing XGBoost model loading...")
     try:
         import xgboost as xgb
-        xgb_path = "model/xgboost_classifier.json"
+        xgb_path = "models/xgboost_classifier.json"
         if not os.path.exists(xgb_path):
             print(f"❌ XGBoost file not found: {xgb_path}")
             return False
@@ -86,7 +86,7 @@ def test_hybrid_model_step_by_step():
         print("✅ Hybrid model class initialized successfully")
         
         # Test loading weights
-        model_path = "model/mental_health_model.pth"
+        model_path = "models/mental_health_model.pth"
         state_dict = torch.load(model_path, map_location='cpu')
         model.load_state_dict(state_dict)
         print("✅ Hybrid model weights loaded successfully")
@@ -11,7 +11,7 @@ import time
 import sys
 
 def test_analysis_service(base_url="http://localhost:5001"):
-    """Test the analysis service with sample texts."""
+    """Test the analysis service with sample texts (evaluate.py measures the full labelled set)."""
     
     test_cases = [
         {
@@ -23,12 +23,8 @@ def test_analysis_service(base_url="http://localhost:5001"):
             "expected": "Depression"
         },
         {
-            "text": "I'm so overwhelmed with work. The deadlines are piling up and I feel stressed all the time.",
-            "expected": "Stress"
-        },
-        {
-            "text": "Today was a normal day. I went to work, had lunch with a friend, and watched a movie.",
-            "expected": "Neutral"
+            "text": "Some days I have endless energy and barely sleep, then I crash for a week and can't get up.",
+            "expected": "Bipolar"
         }
     ]
     
@@ -37,7 +33,7 @@ def test_analysis_service(base_url="http://localhost:5001"):
     
     # Test health endpoint
     try:
-        response = requests.get(f"{base_url}/health", timeout=5)
+        response = requests.get(f"{base_url}/", timeout=5)
         if response.status_code == 200:
             print("✅ Health check passed")
         else:
@@ -55,7 +51,7 @@ def test_analysis_service(base_url="http://localhost:5001"):
     for i, test_case in enumerate(test_cases, 1):
         try:
             response = requests.post(
-                f"{base_url}/predict",
+                f"{base_url}/api/analyze",
                 json={"text": test_case["text"]},
                 headers={"Content-Type": "application/json"},
                 timeout=10
@@ -112,7 +108,7 @@ def test_custom_text():
         
         try:
             response = requests.post(
-                "http://localhost:5001/predict",
+                "http://localhost:5001/api/analyze",
                 json={"text": text},
                 headers={"Content-Type": "application/json"},
                 timeout=10
@@ -0,0 +1,126 @@
+"""
+Tokenization cache shared by every model that uses the same vocabulary.
+
+Entries map a BLAKE2b hash of a text to its wordpiece ids without special
+tokens, cut at MAX_CONTENT_TOKENS (what fits beside [CLS] and [SEP] in the
+256-token serving window). Ids are stored as int16 when the vocabulary fits
+(DistilBERT's 30522 ids do), int32 otherwise. Every shorter window is
+derived from the same entry: [CLS] + ids[:max_length - 2] + [SEP] is what
+the tokenizer returns with truncation, so the full, short and early-exit
+tiers share one entry per text.
+
+Each entry is charged its array, key and bookkeeping overhead; least
+recently used entries are evicted past ``max_bytes``. shared_token_cache()
+returns one cache per vocabulary fingerprint, so model versions served
+side by side (A/B runs, weight swaps, the fast variant) reuse each other's
+entries.
+"""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+MAX_CONTENT_TOKENS = 254
+
+# OrderedDict node and bookkeeping per entry, on top of the key and array objects
+ENTRY_OVERHEAD_BYTES = 100
+
+
+def vocab_fingerprint(tokenizer) -> str:
+    """Identifies a tokenizer's vocabulary and casing; equal fingerprints produce equal ids."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{type(tokenizer).__name__}|{getattr(tokenizer, 'do_lower_case', None)}\n".encode())
+    for token, index in sorted(tokenizer.get_vocab().items(), key=lambda item: item[1]):
+        digest.update(f"{index}:{token}\n".encode())
+    return digest.hexdigest()
+
+
+class TokenCache:
+    """Bounded, memory-accounted LRU map of text hash -> compact token-id array."""
+
+    def __init__(self, max_bytes: int, vocab_size: int):
+        self.max_bytes = max_bytes
+        self.dtype = np.int16 if vocab_size <= np.iinfo(np.int16).max + 1 else np.int32
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def _entry_bytes(key: bytes, ids: np.ndarray) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(ids) + ENTRY_OVERHEAD_BYTES
+
+    def content_ids(self, texts: Sequence[str], tokenize: Callable[[List[str]], List[List[int]]]) -> List[np.ndarray]:
+        """
+        Ids without special tokens for each text. Misses are tokenized in one
+        tokenize(texts) call, which must return at most MAX_CONTENT_TOKENS ids per text.
+        """
+        keys = [self._key(text) for text in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                ids = self._entries.get(key)
+                if ids is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = ids
+            self.stats["hits"] += sum(key in found for key in keys)
+            self.stats["misses"] += sum(key not in found for key in keys)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            # Tokenized outside the lock; a text raced in by another thread is simply stored twice
+            for key, ids in zip(missing, tokenize(list(missing.values()))):
+                found[key] = np.asarray(ids[:MAX_CONTENT_TOKENS], dtype=self.dtype)
+            with self._lock:
+                for key in missing:
+                    self._store(key, found[key])
+        return [found[key] for key in keys]
+
+    def _store(self, key: bytes, ids: np.ndarray):
+        """Caller holds self._lock."""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= self._entry_bytes(key, old)
+        size = self._entry_bytes(key, ids)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = ids
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            old_key, old_ids = self._entries.popitem(last=False)
+            self._bytes -= self._entry_bytes(old_key, old_ids)
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats: Dict[str, object] = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["max_bytes"] = self.max_bytes
+        stats["dtype"] = np.dtype(self.dtype).name
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+
+_shared: Dict[str, TokenCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_token_cache(tokenizer, max_bytes: int) -> TokenCache:
+    """The process-wide cache for tokenizer's vocabulary, grown to at least max_bytes."""
+    fingerprint = vocab_fingerprint(tokenizer)
+    with _shared_lock:
+        cache = _shared.get(fingerprint)
+        if cache is None:
+            cache = _shared[fingerprint] = TokenCache(max_bytes, len(tokenizer))
+        cache.max_bytes = max(cache.max_bytes, max_bytes)
+        return cache
@@ -0,0 +1,199 @@
+"""
+Per-patient prediction log and trend queries for the psychologist dashboard.
+
+Every prediction for a patient is appended as one fixed-size record
+(timestamp, top label, per-label probabilities) to ``<directory>/<patient>.bin``
+and kept in memory as NumPy columns. Trend queries (rolling means, label
+transitions, time buckets) are vectorized over those columns, so a patient
+with thousands of notes is answered in milliseconds without re-running the
+model.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+PATIENT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+BUCKETS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+
+
+def record_dtype(num_labels: int) -> np.dtype:
+    return np.dtype([("ts", "<f8"), ("label", "u1"), ("proba", "<f4", (num_labels,))])
+
+
+class PatientSeries:
+    """Growable timestamp / label / probability columns for one patient."""
+
+    def __init__(self, num_labels: int, records: Optional[np.ndarray] = None):
+        n = 0 if records is None else len(records)
+        capacity = max(16, 1 << max(n - 1, 0).bit_length())
+        self.ts = np.empty(capacity, dtype=np.float64)
+        self.label = np.empty(capacity, dtype=np.uint8)
+        self.proba = np.empty((capacity, num_labels), dtype=np.float32)
+        self.n = 0
+        self.sorted = True
+        if n:
+            self.extend(records["ts"], records["proba"])
+
+    def extend(self, ts: np.ndarray, proba: np.ndarray):
+        new_n = self.n + len(ts)
+        if new_n > len(self.ts):
+            capacity = 1 << (new_n - 1).bit_length()
+            self.ts = np.resize(self.ts, capacity)
+            self.label = np.resize(self.label, capacity)
+            self.proba = np.resize(self.proba, (capacity, self.proba.shape[1]))
+        if len(ts) and self.n and ts[0] < self.ts[self.n - 1]:
+            self.sorted = False
+        self.ts[self.n:new_n] = ts
+        self.label[self.n:new_n] = np.argmax(proba, axis=1)
+        self.proba[self.n:new_n] = proba
+        self.n = new_n
+        if len(ts) > 1 and np.any(np.diff(ts) < 0):
+            self.sorted = False
+
+    def columns(self):
+        """(ts, label, proba) views in timestamp order."""
+        if not self.sorted:
+            # Backfilled records can arrive out of order; sort once, in place
+            order = np.argsort(self.ts[:self.n], kind="stable")
+            self.ts[:self.n] = self.ts[:self.n][order]
+            self.label[:self.n] = self.label[:self.n][order]
+            self.proba[:self.n] = self.proba[:self.n][order]
+            self.sorted = True
+        return self.ts[:self.n], self.label[:self.n], self.proba[:self.n]
+
+
+def rolling_mean(proba: np.ndarray, window: int) -> np.ndarray:
+    """Mean of each column over the last ``window`` rows (fewer at the start)."""
+    csum = np.concatenate([np.zeros((1, proba.shape[1])), np.cumsum(proba, axis=0, dtype=np.float64)])
+    end = np.arange(1, len(proba) + 1)
+    start = np.maximum(end - window, 0)
+    return (csum[end] - csum[start]) / (end - start)[:, None]
+
+
+class PredictionLog:
+    """
+    Append-only prediction log for every patient. Series are loaded from
+    disk on first use and the ``max_cached_patients`` most recent stay in memory.
+    Pass ``directory=None`` to keep everything in memory only: a patient evicted
+    from the cache, or any patient after a restart, then comes back empty.
+    Trend results carry the patient's unfiltered ``total`` so a client holding
+    the full history can detect the loss and re-import it.
+    """
+
+    def __init__(self, labels: Sequence[str], directory: Optional[str] = None, max_cached_patients: int = 1000):
+        self.labels = list(labels)
+        self.directory = directory
+        self.max_cached_patients = max_cached_patients
+        self.dtype = record_dtype(len(self.labels))
+        self._series: "OrderedDict[str, PatientSeries]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, patient_id: str) -> str:
+        if not PATIENT_ID_RE.match(patient_id):
+            raise ValueError(f"Invalid patient id: {patient_id!r}")
+        return os.path.join(self.directory, f"{patient_id}.bin") if self.directory else None
+
+    def _load(self, patient_id: str) -> PatientSeries:
+        """Caller holds self._lock."""
+        series = self._series.get(patient_id)
+        if series is not None:
+            self._series.move_to_end(patient_id)
+            return series
+        path = self._path(patient_id)
+        records = np.fromfile(path, dtype=self.dtype) if path and os.path.exists(path) else None
+        series = PatientSeries(len(self.labels), records)
+        self._series[patient_id] = series
+        while len(self._series) > self.max_cached_patients:
+            self._series.popitem(last=False)
+        return series
+
+    def record(self, patient_id: str, proba: np.ndarray, timestamps: Optional[Sequence[float]] = None):
+        """Append predictions: an (n, num_labels) probability array and n epoch timestamps (default now)."""
+        proba = np.asarray(proba, dtype=np.float32).reshape(-1, len(self.labels))
+        ts = np.full(len(proba), time.time()) if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+        if len(ts) != len(proba):
+            raise ValueError(f"{len(ts)} timestamps for {len(proba)} predictions")
+
+        records = np.empty(len(proba), dtype=self.dtype)
+        records["ts"] = ts
+        records["label"] = np.argmax(proba, axis=1)
+        records["proba"] = proba
+        with self._lock:
+            path = self._path(patient_id)
+            series = self._load(patient_id)
+            if path:
+                with open(path, "ab") as f:
+                    f.write(records.tobytes())
+            series.extend(ts, proba)
+
+    def delete(self, patient_id: str) -> bool:
+        with self._lock:
+            path = self._path(patient_id)
+            cached = self._series.pop(patient_id, None) is not None
+            if path and os.path.exists(path):
+                os.remove(path)
+                return True
+            return cached
+
+    def trends(
+        self,
+        patient_id: str,
+        window: int = 10,
+        bucket_seconds: int = 86400,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        max_changes: int = 100,
+    ) -> Dict[str, object]:
+        """Rolling means, time buckets and label transitions over [start, end]."""
+        with self._lock:
+            ts, label, proba = self._load(patient_id).columns()
+            total = len(ts)
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="right"))
+            ts, label, proba = ts[lo:hi].copy(), label[lo:hi].copy(), proba[lo:hi].copy()
+
+        num_labels = len(self.labels)
+        result: Dict[str, object] = {"labels": self.labels, "count": int(len(ts)), "total": total}
+        if not len(ts):
+            return result
+
+        rolling = rolling_mean(proba, window)
+        result["rolling"] = {
+            "window": window,
+            "timestamps": ts.tolist(),
+            "means": {name: rolling[:, i].round(4).tolist() for i, name in enumerate(self.labels)},
+        }
+
+        bucket = np.floor(ts / bucket_seconds).astype(np.int64)
+        keys, inverse = np.unique(bucket, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(keys))
+        sums = np.stack([np.bincount(inverse, weights=proba[:, i], minlength=len(keys)) for i in range(num_labels)], axis=1)
+        label_counts = np.bincount(inverse * num_labels + label, minlength=len(keys) * num_labels).reshape(len(keys), num_labels)
+        result["buckets"] = {
+            "seconds": bucket_seconds,
+            "start": (keys * bucket_seconds).tolist(),
+            "count": counts.tolist(),
+            "mean": {name: (sums[:, i] / counts).round(4).tolist() for i, name in enumerate(self.labels)},
+            "topCounts": {name: label_counts[:, i].tolist() for i, name in enumerate(self.labels)},
+        }
+
+        matrix = np.bincount(label[:-1].astype(np.int64) * num_labels + label[1:], minlength=num_labels * num_labels)
+        changes = np.flatnonzero(label[1:] != label[:-1]) + 1
+        result["transitions"] = {
+            "matrix": matrix.reshape(num_labels, num_labels).tolist(),
+            "changes": len(changes),
+            "recent": [
+                {"timestamp": float(ts[i]), "from": self.labels[label[i - 1]], "to": self.labels[label[i]]}
+                for i in changes[-max_changes:]
+            ],
+        }
+        return result
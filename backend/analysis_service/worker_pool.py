@@ -0,0 +1,445 @@
+"""
+Multi-process inference pool for the analysis service.
+
+The HTTP process does not load the model. Requests are put on one shared
+queue in the HTTP process and handed to a pool of worker processes that each
+hold a HybridMentalHealthModel. Each worker is driven over its own pipe by a
+dispatcher thread, so a crashed worker cannot leave a shared IPC lock held.
+Request and response payloads are pickled into fixed-size slots of a
+shared-memory buffer, so only small control messages cross the pipes.
+Payloads that do not fit in a slot are sent inline instead. Workers that
+crash are restarted and their in-flight request fails; a replacement that
+fails to start is retried with exponential backoff (failed_restarts in the
+stats). Workers retire themselves after max_requests or when their RSS
+passes max_rss_mb.
+
+A watchdog thread samples every worker's RSS and rolling p95 latency. A
+worker over recycle_rss_mb or recycle_p95_ms is recycled gracefully: a
+replacement is started and warmed up first, then the dispatcher finishes
+the old worker's in-flight request, swaps the replacement in and stops the
+old process. One worker is recycled at a time, so at most one extra model
+is in memory.
+"""
+
+import ctypes
+import itertools
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker processing a request exited before returning a result."""
+
+
+def current_rss_mb(pid: Optional[int] = None) -> float:
+    """Resident set size of a process in MB (Linux /proc; 0.0 where unavailable)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _worker_main(conn, model_kwargs, shared, slot_bytes, max_requests, max_rss_mb, torch_threads):
+    """Worker process: load the model, then serve (method, kwargs) calls sent over conn."""
+    import torch
+    torch.set_num_threads(torch_threads)
+    from hybrid_model import HybridMentalHealthModel
+
+    model = HybridMentalHealthModel(**model_kwargs)
+    model.warmup()
+    buffer = memoryview(shared).cast("B")
+    conn.send(("ready", os.getpid(), model.labels))
+
+    served = 0
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        slot, nbytes, inline = message
+
+        start = time.perf_counter()
+        offset = slot * slot_bytes
+        method, kwargs = pickle.loads(inline if inline is not None else buffer[offset:offset + nbytes])
+        try:
+            payload = pickle.dumps((True, getattr(model, method)(**kwargs)), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            payload = pickle.dumps((False, f"{type(e).__name__}: {e}"), protocol=pickle.HIGHEST_PROTOCOL)
+
+        served += 1
+        retire = None
+        if max_requests and served >= max_requests:
+            retire = f"served {served} requests"
+        elif max_rss_mb and current_rss_mb() > max_rss_mb:
+            retire = f"RSS {current_rss_mb():.0f} MB > {max_rss_mb} MB"
+
+        if len(payload) <= slot_bytes:
+            buffer[offset:offset + len(payload)] = payload
+            conn.send(("done", len(payload), None, time.perf_counter() - start, retire))
+        else:
+            conn.send(("done", len(payload), payload, time.perf_counter() - start, retire))
+        if retire:
+            break
+
+
+def _p95(samples) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class _Request:
+    __slots__ = ("id", "slot", "nbytes", "inline", "future")
+
+    def __init__(self, request_id, slot, nbytes, inline):
+        self.id = request_id
+        self.slot = slot
+        self.nbytes = nbytes
+        self.inline = inline
+        self.future: Future = Future()
+
+
+class InferencePool:
+    """
+    Pool of inference worker processes behind a shared request queue.
+    Exposes predict / predict_batch / get_model_info like HybridModelInference,
+    so app.py can use either one.
+    """
+
+    def __init__(
+        self,
+        model_kwargs: Dict[str, Any],
+        num_workers: int = 2,
+        slots_per_worker: int = 4,
+        slot_bytes: int = 1 << 20,
+        max_requests: Optional[int] = None,
+        max_rss_mb: Optional[float] = None,
+        torch_threads: int = 1,
+        request_timeout: float = 60.0,
+        ready_timeout: float = 600.0,
+        recycle_rss_mb: Optional[float] = None,
+        recycle_p95_ms: Optional[float] = None,
+        latency_window: int = 100,
+        watchdog_interval: float = 10.0,
+        restart_backoff: float = 1.0,
+        restart_backoff_max: float = 60.0,
+    ):
+        self.model_kwargs = model_kwargs
+        self.num_workers = num_workers
+        self.slot_bytes = slot_bytes
+        self.max_requests = max_requests
+        self.max_rss_mb = max_rss_mb
+        self.torch_threads = torch_threads
+        self.request_timeout = request_timeout
+        self.ready_timeout = ready_timeout
+        self.recycle_rss_mb = recycle_rss_mb
+        self.recycle_p95_ms = recycle_p95_ms
+        self.watchdog_interval = watchdog_interval
+        self.restart_backoff = restart_backoff
+        self.restart_backoff_max = restart_backoff_max
+
+        # spawn: workers must not inherit the HTTP process's threads or locks
+        self._ctx = mp.get_context("spawn")
+        num_slots = num_workers * slots_per_worker
+        self._shared = self._ctx.RawArray(ctypes.c_uint8, num_slots * slot_bytes)
+        self._buffer = memoryview(self._shared).cast("B")
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(num_slots):
+            self._free_slots.put(slot)
+
+        self._requests: "queue.Queue[_Request]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._workers: Dict[int, Any] = {}
+        self._dispatchers: List[threading.Thread] = []
+        self._closed = False
+        self.stats = {"requests": 0, "crashes": 0, "restarts": 0, "failed_restarts": 0, "retirements": 0, "recycles": 0}
+        self.last_restart_error: Optional[Dict[str, Any]] = None
+        self.labels: List[str] = []
+        # Watchdog state: per-worker latencies (seconds) over the last latency_window requests,
+        # warmed replacements waiting for their dispatcher to swap them in, recent recycle events
+        self._latencies: Dict[int, deque] = {worker_id: deque(maxlen=latency_window) for worker_id in range(num_workers)}
+        self._replacements: Dict[int, Any] = {}
+        self.recycle_events: deque = deque(maxlen=20)
+
+        print(f"[InferencePool] Starting {num_workers} worker(s)...")
+        started = [self._start_worker(worker_id) for worker_id in range(num_workers)]
+        for worker_id, (process, conn) in enumerate(started):
+            self._wait_ready(worker_id, process, conn)
+            thread = threading.Thread(target=self._dispatch, args=(worker_id,), name=f"pool-dispatch-{worker_id}", daemon=True)
+            thread.start()
+            self._dispatchers.append(thread)
+
+        self._watchdog = None
+        if recycle_rss_mb or recycle_p95_ms:
+            self._watchdog = threading.Thread(target=self._watch, name="pool-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def _start_worker(self, worker_id: int):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_kwargs, self._shared, self.slot_bytes,
+                  self.max_requests, self.max_rss_mb, self.torch_threads),
+            name=f"inference-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        print(f"[InferencePool] Started worker {worker_id} (pid {process.pid})")
+        return process, parent_conn
+
+    def _wait_ready(self, worker_id: int, process, conn, register: bool = True):
+        """Wait for a started worker's ready message; register=False leaves it out of self._workers."""
+        if register:
+            with self._lock:
+                self._workers[worker_id] = (process, conn)
+        deadline = time.monotonic() + self.ready_timeout
+        while not conn.poll(0.5):
+            if self._closed:
+                return
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f"Inference worker {worker_id} did not become ready")
+        try:
+            _, _, self.labels = conn.recv()
+        except EOFError:
+            process.join(timeout=5)
+            raise RuntimeError(f"Inference worker {worker_id} exited during startup (code {process.exitcode})")
+        print(f"[InferencePool] ✅ Worker {worker_id} ready (pid {process.pid})")
+
+    def _restart(self, worker_id: int, reason: str):
+        """Replace worker_id with a new process, retrying with exponential backoff until one is ready."""
+        print(f"[InferencePool] Restarting worker {worker_id}: {reason}")
+        delay = self.restart_backoff
+        while not self._closed:
+            with self._lock:
+                self.stats["restarts"] += 1
+            process, conn = self._start_worker(worker_id)
+            try:
+                self._wait_ready(worker_id, process, conn)
+                return
+            except RuntimeError as e:
+                process.join(timeout=1)
+                conn.close()
+                with self._lock:
+                    self.stats["failed_restarts"] += 1
+                    self.last_restart_error = {"worker": worker_id, "error": str(e), "time": time.time()}
+                print(f"[InferencePool] ❌ Restart of worker {worker_id} failed, retrying in {delay:g}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, self.restart_backoff_max)
+
+    def _stop(self, process, conn):
+        """Ask an idle worker to exit, terminating it if it does not."""
+        try:
+            conn.send(None)
+        except (OSError, ValueError):
+            pass
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+    def _swap_replacement(self, worker_id: int) -> bool:
+        """Put a warmed replacement in place of worker_id (called by its dispatcher between requests)."""
+        with self._lock:
+            replacement = self._replacements.pop(worker_id, None)
+            if replacement is None:
+                return False
+            old_process, old_conn = self._workers[worker_id]
+            self._workers[worker_id] = replacement
+            self._latencies[worker_id].clear()
+        self._stop(old_process, old_conn)
+        print(f"[InferencePool] ✅ Worker {worker_id} recycled (pid {old_process.pid} -> {replacement[0].pid})")
+        return True
+
+    def worker_metrics(self, worker_id: int) -> Dict[str, Any]:
+        """RSS and rolling latency of one worker (p95 is None until its latency window is full)."""
+        with self._lock:
+            process, _ = self._workers[worker_id]
+            latencies = list(self._latencies[worker_id])
+            window = self._latencies[worker_id].maxlen
+        return {
+            "pid": process.pid,
+            "alive": process.is_alive(),
+            "rss_mb": round(current_rss_mb(process.pid), 1),
+            "p95_ms": round(_p95(latencies) * 1000, 1) if len(latencies) == window else None,
+            "samples": len(latencies),
+        }
+
+    def _recycle_reason(self, metrics: Dict[str, Any]) -> Optional[str]:
+        if self.recycle_rss_mb and metrics["rss_mb"] > self.recycle_rss_mb:
+            return f"RSS {metrics['rss_mb']:.0f} MB > {self.recycle_rss_mb} MB"
+        if self.recycle_p95_ms and metrics["p95_ms"] is not None and metrics["p95_ms"] > self.recycle_p95_ms:
+            return f"p95 {metrics['p95_ms']:.0f} ms > {self.recycle_p95_ms} ms"
+        return None
+
+    def _watch(self):
+        """Watchdog: recycle workers whose RSS or rolling p95 latency crossed its threshold."""
+        while not self._closed:
+            time.sleep(self.watchdog_interval)
+            for worker_id in range(self.num_workers):
+                if self._closed or self._replacements:
+                    # The previous replacement has not been swapped in yet
+                    break
+                metrics = self.worker_metrics(worker_id)
+                reason = metrics["alive"] and self._recycle_reason(metrics)
+                if reason:
+                    self._recycle(worker_id, reason, metrics)
+
+    def _recycle(self, worker_id: int, reason: str, metrics: Dict[str, Any]):
+        event = {"worker": worker_id, "reason": reason, "time": time.time(), **metrics}
+        print(f"[InferencePool] ⚠️ Recycling worker {worker_id}: {reason} (metrics: {event})")
+        process, conn = self._start_worker(worker_id)
+        try:
+            self._wait_ready(worker_id, process, conn, register=False)
+        except RuntimeError as e:
+            print(f"[InferencePool] ❌ Replacement for worker {worker_id} failed, keeping the old one: {e}")
+            process.terminate()
+            return
+        if self._closed:
+            self._stop(process, conn)
+            return
+        with self._lock:
+            self._replacements[worker_id] = (process, conn)
+            self.stats["recycles"] += 1
+            self.recycle_events.append(event)
+
+    def _release(self, request: _Request):
+        self._free_slots.put(request.slot)
+
+    def _dispatch(self, worker_id: int):
+        """Feed one worker from the shared queue, restarting it if it dies."""
+        while not self._closed:
+            self._swap_replacement(worker_id)
+            process, conn = self._workers[worker_id]
+            if not process.is_alive():
+                with self._lock:
+                    self.stats["crashes"] += 1
+                self._restart(worker_id, f"exited with code {process.exitcode}")
+                continue
+
+            try:
+                request = self._requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if request.future.done():
+                # Caller timed out before a worker picked the request up
+                self._release(request)
+                continue
+
+            try:
+                conn.send((request.slot, request.nbytes, request.inline))
+                while not conn.poll(0.5):
+                    if not process.is_alive():
+                        raise EOFError
+                _, nbytes, inline, latency, retire = conn.recv()
+            except (EOFError, OSError):
+                process.join(timeout=1)
+                with self._lock:
+                    self.stats["crashes"] += 1
+                self._release(request)
+                if not request.future.done():
+                    request.future.set_exception(WorkerCrashed(f"Worker {worker_id} exited with code {process.exitcode}"))
+                if not self._swap_replacement(worker_id):
+                    self._restart(worker_id, f"crashed with code {process.exitcode}")
+                continue
+
+            if inline is None:
+                offset = request.slot * self.slot_bytes
+                ok, value = pickle.loads(self._buffer[offset:offset + nbytes])
+            else:
+                ok, value = pickle.loads(inline)
+            self._release(request)
+            with self._lock:
+                self._latencies[worker_id].append(latency)
+            if not request.future.done():
+                if ok:
+                    request.future.set_result(value)
+                else:
+                    request.future.set_exception(RuntimeError(value))
+
+            if retire:
+                process.join(timeout=5)
+                with self._lock:
+                    self.stats["retirements"] += 1
+                # A replacement the watchdog already warmed up saves the cold restart
+                if not self._swap_replacement(worker_id):
+                    self._restart(worker_id, f"retired ({retire})")
+
+    def call(self, method: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run model.<method>(**kwargs) in a worker and return its result."""
+        timeout = self.request_timeout if timeout is None else timeout
+        payload = pickle.dumps((method, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            slot = self._free_slots.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No free inference slot")
+
+        if len(payload) <= self.slot_bytes:
+            offset = slot * self.slot_bytes
+            self._buffer[offset:offset + len(payload)] = payload
+            request = _Request(next(self._ids), slot, len(payload), None)
+        else:
+            request = _Request(next(self._ids), slot, len(payload), payload)
+        with self._lock:
+            self.stats["requests"] += 1
+        self._requests.put(request)
+
+        try:
+            return request.future.result(timeout)
+        except FutureTimeout:
+            # Marks the request abandoned; its slot is released by whoever holds it
+            request.future.cancel()
+            raise TimeoutError(f"Inference did not finish within {timeout}s")
+
+    def predict(self, text: str, tier: str = "full") -> Dict[str, Any]:
+        return self.call("predict", text=text, tier=tier)
+
+    def predict_batch(self, texts: List[str], tier: str = "full") -> List[Dict[str, Any]]:
+        return self.call("predict_batch", texts=texts, tier=tier)
+
+    def predict_scores(self, texts: List[str], include_features: bool = False, tier: str = "full"):
+        return self.call("predict_scores", texts=texts, include_features=include_features, tier=tier)
+
+    def predict_heads(self, texts: List[str], heads: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        return self.call("predict_heads", texts=texts, heads=heads)
+
+    def explain(self, text: str, **options) -> Dict[str, Any]:
+        return self.call("explain", text=text, **options)
+
+    def start_profile(self, mode: str, seconds: float, out_dir: str) -> Dict[str, Any]:
+        """Starts a capture in whichever worker picks up the call; the result names its pid."""
+        return self.call("start_profile", mode=mode, seconds=seconds, out_dir=out_dir)
+
+    def warmup(self):
+        """Workers warm up before reporting ready."""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool counters (including failed_restarts), queue depth, recycle events and per-worker metrics."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.stats)
+            stats["queued"] = self._requests.qsize()
+            stats["recycle_events"] = list(self.recycle_events)
+            stats["last_restart_error"] = self.last_restart_error
+        stats["workers"] = {worker_id: self.worker_metrics(worker_id) for worker_id in range(self.num_workers)}
+        return stats
+
+    def get_model_info(self) -> Dict[str, Any]:
+        info = self.call("get_model_info")
+        info["worker_pool"] = self.get_stats()
+        return info
+
+    def shutdown(self):
+        """Stop dispatching (in-flight requests finish), then stop the workers."""
+        self._closed = True
+        for thread in self._dispatchers:
+            thread.join(timeout=self.request_timeout)
+        for process, conn in list(self._workers.values()) + list(self._replacements.values()):
+            self._stop(process, conn)
@@ -0,0 +1,158 @@
+"""
+Array-backed XGBoost tree ensemble for the analysis service.
+Compiles an XGBoost JSON model (xgboost_classifier.json) once into flat NumPy
+node arrays and scores batches with vectorized traversal, so workers can
+serve predictions without importing xgboost or going through its sklearn
+wrapper.
+"""
+
+import json
+from typing import List
+
+import numpy as np
+
+
+def _parse_base_score(raw: str) -> np.ndarray:
+    """base_score is a scalar ("5E-1") in older models and a vector ("[a,b,c]") in newer ones."""
+    return np.array([float(v) for v in raw.strip("[]").split(",")], dtype=np.float64)
+
+
+class CompiledForest:
+    """
+    Drop-in for the parts of xgb.XGBClassifier used at inference time
+    (predict_proba / predict) on numerical gbtree models.
+
+    Every tree is packed into shared node arrays. Leaves point back to
+    themselves, so a batch is scored by stepping all (row, tree) cursors
+    max_depth times and summing the reached leaf values per class.
+    """
+
+    def __init__(self, model: dict):
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in ("multi:softprob", "multi:softmax", "binary:logistic"):
+            raise ValueError(f"Unsupported XGBoost objective: {objective}")
+        booster = learner["gradient_booster"]
+        if booster["name"] != "gbtree":
+            raise ValueError(f"Unsupported XGBoost booster: {booster['name']}")
+
+        params = learner["learner_model_param"]
+        self.objective = objective
+        self.num_features = int(params["num_feature"])
+        self.n_classes_ = max(int(params.get("num_class", "0")), 2)
+        num_groups = 1 if objective == "binary:logistic" else self.n_classes_
+
+        base_score = _parse_base_score(params["base_score"])
+        if objective == "binary:logistic":
+            # Stored as a probability; convert to margin
+            base_score = np.log(base_score / (1.0 - base_score))
+        self.base_margin = np.broadcast_to(base_score, (num_groups,)).astype(np.float64)
+
+        trees = booster["model"]["trees"]
+        tree_info = booster["model"]["tree_info"]
+        self.num_trees = len(trees)
+
+        left: List[np.ndarray] = []
+        right: List[np.ndarray] = []
+        roots = np.zeros(self.num_trees, dtype=np.int64)
+        offset = 0
+        for i, tree in enumerate(trees):
+            if any(tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported by CompiledForest")
+            n = int(tree["tree_param"]["num_nodes"])
+            tree_left = np.asarray(tree["left_children"], dtype=np.int64)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int64)
+            own = np.arange(n, dtype=np.int64)
+            leaf = tree_left == -1
+            left.append(np.where(leaf, own, tree_left) + offset)
+            right.append(np.where(leaf, own, tree_right) + offset)
+            roots[i] = offset
+            offset += n
+
+        self.left = np.concatenate(left)
+        self.right = np.concatenate(right)
+        self.feature = np.concatenate([np.asarray(t["split_indices"], dtype=np.int64) for t in trees])
+        # XGBoost compares float32 feature values against float32 thresholds
+        self.threshold = np.concatenate([np.asarray(t["split_conditions"], dtype=np.float32) for t in trees])
+        self.default_left = np.concatenate([np.asarray(t["default_left"], dtype=bool) for t in trees])
+        is_leaf = self.left == np.arange(offset)
+        self.leaf_value = np.where(is_leaf, self.threshold, 0).astype(np.float64)
+        self.feature[is_leaf] = 0
+        self.roots = roots
+
+        # Leaf values for tree t land in output group tree_info[t]
+        self.tree_to_group = np.zeros((self.num_trees, num_groups), dtype=np.float64)
+        self.tree_to_group[np.arange(self.num_trees), np.asarray(tree_info, dtype=np.int64)] = 1.0
+
+        self.max_depth = self._max_depth(trees)
+
+    @staticmethod
+    def _max_depth(trees) -> int:
+        depth = 0
+        for tree in trees:
+            left, right = tree["left_children"], tree["right_children"]
+            stack = [(0, 0)]
+            while stack:
+                node, d = stack.pop()
+                if left[node] == -1:
+                    depth = max(depth, d)
+                else:
+                    stack.append((left[node], d + 1))
+                    stack.append((right[node], d + 1))
+        return depth
+
+    @classmethod
+    def from_json(cls, path: str) -> "CompiledForest":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.num_features:
+            raise ValueError(f"Expected {self.num_features} features, got {X.shape[1]}")
+
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.num_trees))
+        for _ in range(self.max_depth):
+            value = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(value), self.default_left[node], value < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        return self.leaf_value[node] @ self.tree_to_group + self.base_margin
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        margin = self.predict_margin(X)
+        if self.objective == "binary:logistic":
+            positive = 1.0 / (1.0 + np.exp(-margin[:, 0]))
+            return np.stack([1.0 - positive, positive], axis=1).astype(np.float32)
+        margin -= margin.max(axis=1, keepdims=True)
+        exp = np.exp(margin)
+        return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return np.argmax(self.predict_proba(X), axis=1)
+
+
+if __name__ == "__main__":
+    # Parity and timing check against xgboost: python xgb_forest.py models/xgboost_classifier.json
+    import sys
+    import time
+
+    import xgboost as xgb
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "models/xgboost_classifier.json"
+    forest = CompiledForest.from_json(path)
+    reference = xgb.XGBClassifier()
+    reference.load_model(path)
+
+    X = np.random.default_rng(0).normal(scale=0.1, size=(256, forest.num_features)).astype(np.float32)
+    print(f"Max |Δp| over 256 rows: {np.abs(forest.predict_proba(X) - reference.predict_proba(X)).max():.2e}")
+
+    row = X[:1]
+    for name, scorer in (("xgboost", reference), ("compiled", forest)):
+        start = time.perf_counter()
+        for _ in range(1000):
+            scorer.predict_proba(row)
+        print(f"{name}: {(time.perf_counter() - start) * 1000:.1f} µs per single-row call")
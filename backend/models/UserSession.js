@@ -17,6 +17,25 @@ const userSessionSchema = new mongoose.Schema(
         createdAt: { type: Date, default: Date.now },
       },
     ],
+    // Every turn in order (analyses keeps only the latest 50); resent to the model
+    // service from the turn it asks for when it has lost the session state
+    turns: [
+      {
+        text: { type: String, required: true },
+        createdAt: { type: Date, default: Date.now },
+      },
+    ],
+    // Session-level aggregate over all analysed turns (from the model service)
+    summary: {
+      topPattern: { type: String },
+      confidenceScores: [
+        {
+          label: { type: String, required: true },
+          score: { type: Number, required: true },
+        },
+      ],
+      turns: { type: Number },
+    },
     lastAccessed: { type: Date, default: Date.now },
   },
   { timestamps: true },
@@ -17,6 +17,9 @@ const resolveAnalysisUrl = () => {
   return `${raw.replace(/\/$/, "")}/api/analyze`
 }
 
+// Base URL of the analysis service for the patient trend endpoints
+const analysisBaseUrl = () => resolveAnalysisUrl().replace(/\/(api\/)?(analyze|predict)\/?$/i, "")
+
 router.post("/", async (req, res) => {
   try {
     const { name } = req.body
@@ -44,6 +47,8 @@ router.delete("/:id", async (req, res) => {
     const { id } = req.params
     const patient = await Patient.findOneAndDelete({ _id: id, createdBy: req.userId })
     if (!patient) return res.status(404).json({ error: "Patient not found" })
+    fetch(`${analysisBaseUrl()}/api/patients/${id}/predictions`, { method: "DELETE" })
+      .catch(err => console.warn("[patients DELETE] analysis service:", err.message))
     return res.json({ message: "Patient deleted", id })
   } catch (err) {
     console.error("[patients DELETE] error:", err)
@@ -59,11 +64,12 @@ router.post("/:id/analyze", async (req, res) => {
     const patient = await Patient.findOne({ _id: req.params.id, createdBy: req.userId })
     if (!patient) return res.status(404).json({ error: "Patient not found" })
 
-    const analysisUrl = resolveAnalysisUrl()
-    const resp = await fetch(analysisUrl, {
+    // Scores the note and appends it to the patient's trend log in one call
+    const createdAt = new Date()
+    const resp = await fetch(`${analysisBaseUrl()}/api/patients/${patient._id}/analyze`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ text }),
+      body: JSON.stringify({ text, timestamp: createdAt.toISOString() }),
     })
     if (!resp.ok) {
       const t = await resp.text()
@@ -75,7 +81,7 @@ router.post("/:id/analyze", async (req, res) => {
       text,
       topPattern: result.topPattern,
       confidenceScores: result.confidenceScores,
-      createdAt: new Date(),
+      createdAt,
     }
     patient.history = [entry, ...(patient.history || [])]
     await patient.save()
@@ -86,4 +92,134 @@ router.post("/:id/analyze", async (req, res) => {
   }
 })
 
+// Word attributions for why a note got its label. Body: { text } or { entryIndex } into the
+// patient's history, plus optional label, method and maxPerturbations (see /api/explain)
+router.post("/:id/explain", async (req, res) => {
+  try {
+    const patient = await Patient.findOne({ _id: req.params.id, createdBy: req.userId })
+    if (!patient) return res.status(404).json({ error: "Patient not found" })
+
+    const { entryIndex, label, method, maxPerturbations } = req.body
+    const text = entryIndex !== undefined ? patient.history?.[entryIndex]?.text : req.body.text
+    if (!text || text.trim().length < 5) return res.status(400).json({ error: "Text is too short or entry not found" })
+
+    const resp = await fetch(`${analysisBaseUrl()}/api/explain`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ text, label, method, maxPerturbations }),
+    })
+    if (resp.status === 503) {
+      const retryAfter = resp.headers.get("retry-after") || "1"
+      res.set("Retry-After", retryAfter)
+      return res.status(503).json({ error: "Analysis service is busy, please retry", retryAfter: Number(retryAfter) })
+    }
+    if (resp.status === 400) return res.status(400).json(await resp.json())
+    if (!resp.ok) {
+      console.error("[patients explain] analysis service error:", resp.status)
+      return res.status(502).json({ error: "Analysis service failed" })
+    }
+    return res.json({ patientId: patient._id, ...(await resp.json()) })
+  } catch (err) {
+    console.error("[patients explain] error:", err)
+    return res.status(500).json({ error: "Server error" })
+  }
+})
+
+// The analysis service's MAX_BATCH_TEXTS
+const REANALYZE_BATCH_TEXTS = 256
+
+// Re-scores every stored note (e.g. after a model update) and rebuilds the trend log.
+// Sent as bulk traffic so live analyze/chat requests are scheduled ahead of it.
+router.post("/:id/reanalyze", async (req, res) => {
+  try {
+    const patient = await Patient.findOne({ _id: req.params.id, createdBy: req.userId })
+    if (!patient) return res.status(404).json({ error: "Patient not found" })
+    const history = patient.history || []
+    if (!history.length) return res.json({ patientId: patient._id, reanalyzed: 0 })
+
+    const results = []
+    for (let start = 0; start < history.length; start += REANALYZE_BATCH_TEXTS) {
+      const texts = history.slice(start, start + REANALYZE_BATCH_TEXTS).map(h => h.text)
+      const resp = await fetch(`${analysisBaseUrl()}/api/analyze/batch`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json", "X-Priority": "bulk" },
+        body: JSON.stringify({ texts }),
+      })
+      if (resp.status === 503) {
+        const retryAfter = resp.headers.get("retry-after") || "1"
+        res.set("Retry-After", retryAfter)
+        return res.status(503).json({ error: "Analysis service is busy, please retry", retryAfter: Number(retryAfter) })
+      }
+      if (!resp.ok) {
+        console.error("[patients reanalyze] analysis service error:", resp.status)
+        return res.status(502).json({ error: "Analysis service failed" })
+      }
+      results.push(...(await resp.json()).results)
+    }
+
+    history.forEach((entry, i) => {
+      entry.topPattern = results[i].topPattern
+      entry.confidenceScores = results[i].confidenceScores
+    })
+    await patient.save()
+
+    const predictionsUrl = `${analysisBaseUrl()}/api/patients/${patient._id}/predictions`
+    const records = history.map(h => ({ createdAt: h.createdAt, confidenceScores: h.confidenceScores }))
+    await fetch(predictionsUrl, { method: "DELETE" })
+    await fetch(predictionsUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ records }),
+    })
+    return res.json({ patientId: patient._id, reanalyzed: history.length })
+  } catch (err) {
+    console.error("[patients reanalyze] error:", err)
+    return res.status(500).json({ error: "Server error" })
+  }
+})
+
+// Confidence trends for the dashboard, computed by the analysis service from its prediction log
+router.get("/:id/trends", async (req, res) => {
+  try {
+    const patient = await Patient.findOne({ _id: req.params.id, createdBy: req.userId })
+    if (!patient) return res.status(404).json({ error: "Patient not found" })
+
+    const query = new URLSearchParams()
+    for (const key of ["window", "bucket", "start", "end"]) {
+      if (req.query[key]) query.set(key, req.query[key])
+    }
+    const trendsUrl = `${analysisBaseUrl()}/api/patients/${patient._id}/trends?${query}`
+    let resp = await fetch(trendsUrl)
+    let trends = resp.ok ? await resp.json() : null
+
+    // patient.history is the source of truth: every note is logged once, so a log that holds a
+    // different number of predictions (history from before the trend log existed, or a log
+    // kept in memory only and lost) is replaced with the stored history
+    const history = patient.history || []
+    if (trends && trends.total !== history.length) {
+      const predictionsUrl = `${analysisBaseUrl()}/api/patients/${patient._id}/predictions`
+      const records = history.map(h => ({ createdAt: h.createdAt, confidenceScores: h.confidenceScores }))
+      await fetch(predictionsUrl, { method: "DELETE" })
+      if (records.length) {
+        await fetch(predictionsUrl, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ records }),
+        })
+      }
+      resp = await fetch(trendsUrl)
+      trends = resp.ok ? await resp.json() : null
+    }
+
+    if (!trends) {
+      console.error("[patients trends] analysis service error:", resp.status)
+      return res.status(502).json({ error: "Analysis service failed" })
+    }
+    return res.json(trends)
+  } catch (err) {
+    console.error("[patients trends] error:", err)
+    return res.status(500).json({ error: "Server error" })
+  }
+})
+
 export default router
@@ -4,6 +4,8 @@ import fetch from "node-fetch"
 
 const router = Router()
 
+const analysisBaseUrl = () => (process.env.ANALYSIS_SERVICE_URL || "http://localhost:5002").replace(/\/(api\/)?analyze\/?$/i, "").replace(/\/$/, "")
+
 // Create or get session
 router.post("/", async (req, res) => {
   try {
@@ -41,14 +43,30 @@ router.post("/:sessionId/analyze", async (req, res) => {
       return res.status(404).json({ error: "Session not found" })
     }
 
-    // Call model service; treat env as base and append /api/analyze
-    const analysisBase = process.env.ANALYSIS_SERVICE_URL || "http://localhost:5002"
-    const analysisUrl = `${analysisBase.replace(/\/$/, '')}/api/analyze`
-    const response = await fetch(analysisUrl, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ text }),
-    })
+    // Incremental session analysis: only the new turn and its index are sent, so the model
+    // service hashes and scores O(1) turns per message and a retry scores nothing twice.
+    // If it has lost the session (restart, expiry, eviction) it answers 409 with the turn
+    // to resend from. Sessions from before turns were stored start from their
+    // (newest-first) analyses.
+    const previous = session.turns?.length ? session.turns.map(t => t.text) : session.analyses.map(a => a.text).reverse()
+    const analysisUrl = `${analysisBaseUrl()}/api/sessions/${encodeURIComponent(sessionId)}/analyze`
+    const sendTurns = (turns, start) =>
+      fetch(analysisUrl, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ turns, start }),
+      })
+    let response = await sendTurns([text], previous.length)
+    if (response.status === 409) {
+      const { resumeFrom = 0 } = await response.json()
+      response = await sendTurns([...previous, text].slice(resumeFrom), resumeFrom)
+    }
+
+    if (response.status === 503) {
+      const retryAfter = response.headers.get("retry-after") || "1"
+      res.set("Retry-After", retryAfter)
+      return res.status(503).json({ error: "Analysis service is busy, please retry", retryAfter: Number(retryAfter) })
+    }
 
     if (!response.ok) {
       console.error("[session analyze] analysis service error:", response.status)
@@ -56,13 +74,21 @@ router.post("/:sessionId/analyze", async (req, res) => {
     }
 
     const result = await response.json()
+    // Nothing new is scored when a retried call already reached the model service
+    const turn = result.newTurns[result.newTurns.length - 1] || result.lastTurn
     
     // Store analysis in session
+    const createdAt = new Date()
     const analysis = {
       text,
-      topPattern: result.topPattern,
-      confidenceScores: result.confidenceScores,
-      createdAt: new Date(),
+      topPattern: turn.topPattern,
+      confidenceScores: turn.confidenceScores,
+      createdAt,
+    }
+    if (!session.turns?.length) session.turns = previous.map(t => ({ text: t }))
+    session.turns.push({ text, createdAt })
+    if (result.session) {
+      session.summary = { ...result.session, turns: result.turns }
     }
     
     session.analyses.unshift(analysis)
@@ -75,7 +101,7 @@ router.post("/:sessionId/analyze", async (req, res) => {
     
     await session.save()
     
-    return res.json({ analysis, sessionId: session.sessionId })
+    return res.json({ analysis, summary: session.summary, sessionId: session.sessionId })
   } catch (err) {
     console.error("[session analyze] error:", err)
     return res.status(500).json({ error: "Server error" })
@@ -96,7 +122,7 @@ router.get("/:sessionId/history", async (req, res) => {
     session.lastAccessed = new Date()
     await session.save()
     
-    return res.json({ analyses: session.analyses })
+    return res.json({ analyses: session.analyses, summary: session.summary })
   } catch (err) {
     console.error("[session history] error:", err)
     return res.status(500).json({ error: "Server error" })
@@ -108,6 +134,9 @@ router.delete("/:sessionId", async (req, res) => {
   try {
     const { sessionId } = req.params
     await UserSession.deleteOne({ sessionId })
+    // Drop the model service's cached turns too; it expires them on its own if this fails
+    fetch(`${analysisBaseUrl()}/api/sessions/${encodeURIComponent(sessionId)}`, { method: "DELETE" })
+      .catch(err => console.warn("[session delete] analysis service:", err.message))
     return res.json({ message: "Session cleared" })
   } catch (err) {
     console.error("[session delete] error:", err)
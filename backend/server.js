@@ -11,6 +11,7 @@ import authRoutes from "./routes/auth.js"
 import patientRoutes from "./routes/patients.js"
 import sessionRoutes from "./routes/sessions.js"
 import { callGroq } from "./services/groqClient.js"
+import { SCORES_MIME_TYPE, decodeScores, toAnalysisResult } from "./services/analysisScores.js"
 
 const __filename = fileURLToPath(import.meta.url)
 const __dirname = path.dirname(__filename)
@@ -65,18 +66,35 @@ app.post("/api/analyze", async (req, res) => {
     }
 
     const analysisUrl = resolveAnalysisUrl()
+    // ANALYSIS_BINARY=1 asks the analysis service for the compact binary format instead of JSON
+    const binary = process.env.ANALYSIS_BINARY === "1"
     const response = await fetch(analysisUrl, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: {
+        "Content-Type": "application/json",
+        Accept: binary ? SCORES_MIME_TYPE : "application/json",
+      },
       body: JSON.stringify({ text }),
     })
 
+    if (response.status === 503) {
+      // Analysis service shed the request; pass its back-off hint on to the client
+      const retryAfter = response.headers.get("retry-after") || "1"
+      res.set("Retry-After", retryAfter)
+      return res.status(503).json({ error: "Analysis service is busy, please retry", retryAfter: Number(retryAfter) })
+    }
+
     if (!response.ok) {
       console.error("[analyze] analysis service error:", response.status)
       return res.status(502).json({ error: "Analysis service unavailable" })
     }
 
-    const result = await response.json()
+    const result = binary
+      ? {
+          ...toAnalysisResult(decodeScores(Buffer.from(await response.arrayBuffer()))),
+          tier: response.headers.get("x-analysis-tier") || "full",
+        }
+      : await response.json()
 
     // ---------------------------------------------------------
     // HYBRID ROUTING LOGIC (Node.js Gateway)
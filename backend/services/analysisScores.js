@@ -0,0 +1,78 @@
+/**
+ * Decoder for the analysis service's compact binary response
+ * (application/x-hybrid-scores, see analysis_service/compact_format.py).
+ */
+
+export const SCORES_MIME_TYPE = "application/x-hybrid-scores";
+
+const HEADER_SIZE = 18;
+const FLAG_FEATURES = 0x1;
+
+/**
+ * Decodes a compact scores payload.
+ * @param {Buffer} buffer - Response body.
+ * @returns {{labels: string[], rows: number, probabilities: Float32Array[], features: Float32Array[]|null}}
+ */
+export const decodeScores = (buffer) => {
+    if (buffer.toString("latin1", 0, 4) !== "HMS1") {
+        throw new Error("Not a hybrid scores payload");
+    }
+    const version = buffer.readUInt8(4);
+    if (version !== 1) {
+        throw new Error(`Unsupported hybrid scores version ${version}`);
+    }
+    const flags = buffer.readUInt8(5);
+    const numLabels = buffer.readUInt16LE(6);
+    const rows = buffer.readUInt32LE(8);
+    const featureDim = buffer.readUInt32LE(12);
+    const labelBytes = buffer.readUInt16LE(16);
+
+    const labels = buffer.toString("utf8", HEADER_SIZE, HEADER_SIZE + labelBytes).split(",");
+    let offset = HEADER_SIZE + labelBytes;
+    offset += (4 - (offset % 4)) % 4;
+
+    // Copy once into an aligned buffer; the float views below share it
+    const floatCount = rows * numLabels + ((flags & FLAG_FEATURES) ? rows * featureDim : 0);
+    const floats = new Float32Array(floatCount);
+    Buffer.from(floats.buffer).set(buffer.subarray(offset, offset + floatCount * 4));
+
+    const probabilities = [];
+    for (let i = 0; i < rows; i++) {
+        probabilities.push(floats.subarray(i * numLabels, (i + 1) * numLabels));
+    }
+
+    let features = null;
+    if (flags & FLAG_FEATURES) {
+        const base = rows * numLabels;
+        features = [];
+        for (let i = 0; i < rows; i++) {
+            features.push(floats.subarray(base + i * featureDim, base + (i + 1) * featureDim));
+        }
+    }
+
+    return { labels, rows, probabilities, features };
+};
+
+/**
+ * Top label and score of one decoded row, without building the JSON confidenceScores list.
+ * @returns {{topPattern: string, topScore: number}}
+ */
+export const topPrediction = (decoded, row = 0) => {
+    const probs = decoded.probabilities[row];
+    let best = 0;
+    for (let i = 1; i < probs.length; i++) {
+        if (probs[i] > probs[best]) best = i;
+    }
+    return { topPattern: decoded.labels[best], topScore: probs[best] };
+};
+
+/**
+ * JSON-shaped result ({topPattern, confidenceScores}) for one decoded row.
+ */
+export const toAnalysisResult = (decoded, row = 0) => {
+    const probs = decoded.probabilities[row];
+    const confidenceScores = decoded.labels
+        .map((label, i) => ({ label, score: probs[i] }))
+        .sort((a, b) => b.score - a.score);
+    return { topPattern: confidenceScores[0].label, confidenceScores };
+};
@@ -6,6 +6,8 @@ const getGroqClient = () => {
     if (!groq) {
         groq = new Groq({
             apiKey: process.env.GROQ_API_KEY,
+            // Set GROQ_BASE_URL to a local stand-in (load_test.py --groq-stub) for load tests
+            baseURL: process.env.GROQ_BASE_URL || undefined,
         });
     }
     return groq;
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Load test for the Virtual Therapist analysis path.
+
+Replays texts with a realistic length distribution at a target request rate
+against the Flask /api/analyze endpoint, and optionally through the Node
+proxy. A local Groq stand-in can be started so the Node routing logic runs
+without calling the real API:
+
+    python load_test.py --groq-stub-port 5099 --rps 20 --duration 60 --node
+    # start Node with GROQ_BASE_URL=http://127.0.0.1:5099
+    # and Flask with GROQ_API_URL=http://127.0.0.1:5099/openai/v1/chat/completions
+
+Throughput, latency percentiles and error rates are printed and saved as JSON.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+PYTHON_URL = "http://127.0.0.1:5001/api/analyze"
+NODE_URL = "http://127.0.0.1:4000/api/analyze"
+
+PHRASES = [
+    "I feel anxious about everything lately",
+    "my heart races before every meeting",
+    "I can't sleep and my thoughts keep spinning",
+    "nothing seems to bring me joy anymore",
+    "I have been feeling down and hopeless",
+    "some weeks I have endless energy and barely sleep",
+    "then I crash and can't get out of bed",
+    "my mood swings are hard on my family",
+    "I worry that something bad will happen",
+    "work has been overwhelming this month",
+    "I stopped seeing my friends",
+    "today was an ordinary day",
+]
+
+
+class GroqStubHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Groq chat completions API."""
+
+    delay = 0.2
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        time.sleep(self.delay)
+        body = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "model": "stub",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Thank you for sharing. That sounds difficult."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_groq_stub(port, delay):
+    GroqStubHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), GroqStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🧪 Groq stub listening on http://127.0.0.1:{port}")
+    print(f"   Node:  GROQ_BASE_URL=http://127.0.0.1:{port}")
+    print(f"   Flask: GROQ_API_URL=http://127.0.0.1:{port}/openai/v1/chat/completions")
+    return server
+
+
+def text_generator(corpus_path, median_words, sigma, seed):
+    """Yield texts from a corpus file, or synthetic texts with log-normal word counts."""
+    rng = random.Random(seed)
+    if corpus_path:
+        with open(corpus_path) as f:
+            corpus = [line.strip() for line in f if len(line.strip()) >= 5]
+        while True:
+            yield rng.choice(corpus)
+
+    while True:
+        target = max(5, int(rng.lognormvariate(0, sigma) * median_words))
+        words = []
+        while len(words) < target:
+            words.extend(rng.choice(PHRASES).split())
+        yield " ".join(words[:target]) + "."
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def run_load(name, url, texts, rps, duration, concurrency, timeout):
+    """Open-loop load: request i is due at start + i / rps, and latency counts from that time."""
+    print(f"\n--- {name}: {rps} rps for {duration}s against {url} ---")
+    local = threading.local()
+    results = []
+    lock = threading.Lock()
+
+    def send(text, due):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            resp = session.post(url, json={"text": text}, timeout=timeout)
+            outcome = resp.status_code
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        with lock:
+            results.append((outcome, time.perf_counter() - due, len(text)))
+
+    total = int(rps * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(total):
+            due = start + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, next(texts), due)
+    elapsed = time.perf_counter() - start
+
+    ok_latencies = sorted(latency for outcome, latency, _ in results if outcome == 200)
+    outcomes = Counter(str(outcome) for outcome, _, _ in results)
+    errors = len(results) - len(ok_latencies)
+    report = {
+        "target": name,
+        "url": url,
+        "target_rps": rps,
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ok_latencies) / elapsed, 3) if elapsed else None,
+        "error_rate": round(errors / len(results), 4) if results else None,
+        "outcomes": dict(outcomes),
+        "mean_text_chars": round(sum(chars for _, _, chars in results) / len(results), 1) if results else None,
+        "latency_ms": {
+            "p50": percentile(ok_latencies, 50),
+            "p90": percentile(ok_latencies, 90),
+            "p95": percentile(ok_latencies, 95),
+            "p99": percentile(ok_latencies, 99),
+            "max": percentile(ok_latencies, 100),
+            "mean": round(1000 * sum(ok_latencies) / len(ok_latencies), 2) if ok_latencies else None,
+        },
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the analysis service (and optionally the Node proxy)")
+    parser.add_argument("--python-url", default=PYTHON_URL)
+    parser.add_argument("--node-url", default=NODE_URL)
+    parser.add_argument("--node", action="store_true", help="Also drive the Node proxy")
+    parser.add_argument("--skip-python", action="store_true", help="Only drive the Node proxy")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per target")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--corpus", help="Replay texts from this file (one per line) instead of synthetic ones")
+    parser.add_argument("--median-words", type=int, default=40)
+    parser.add_argument("--sigma", type=float, default=0.8, help="Log-normal spread of text length")
+    parser.add_argument("--groq-stub-port", type=int, help="Start a local Groq stand-in on this port")
+    parser.add_argument("--groq-stub-delay", type=float, default=0.2, help="Seconds the stub waits before replying")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_test_report.json")
+    args = parser.parse_args()
+
+    stub = start_groq_stub(args.groq_stub_port, args.groq_stub_delay) if args.groq_stub_port else None
+    texts = text_generator(args.corpus, args.median_words, args.sigma, args.seed)
+
+    reports = []
+    if not args.skip_python:
+        reports.append(run_load("python", args.python_url, texts, args.rps, args.duration, args.concurrency, args.timeout))
+    if args.node or args.skip_python:
+        reports.append(run_load("node", args.node_url, texts, args.rps, args.duration, args.concurrency, args.timeout))
+
+    with open(args.output, "w") as f:
+        json.dump({"config": vars(args), "results": reports}, f, indent=2)
+    print(f"\n✅ Report saved to: {args.output}")
+
+    if stub:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()